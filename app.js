@@ -2,7 +2,8 @@
 // 전역 변수
 let scannedFiles = [];
 let maskedFiles = [];
-let personalInfoData = [];
+let personalInfoData = [];  // 화면 미리보기용 첫 페이지
+let personalInfoTotal = 0;
 let fileMappingData = [];
 let currentJobId = null;
 let ocrJobId = null;
@@ -19,7 +20,8 @@ const resultsSection = document.getElementById('resultsSection');
 // API 호출 클래스
 class APIClient {
     static async scanPDFs() {
-        const response = await fetch(`${API_BASE_URL}/scan-pdfs`);
+        // 화면에는 최대 20개만 표시하므로 첫 페이지만 요청 (count/total_size는 전체 기준)
+        const response = await fetch(`${API_BASE_URL}/scan-pdfs?limit=20`);
         if (!response.ok) {
             throw new Error(`서버 오류: ${response.status}`);
         }
@@ -52,12 +54,14 @@ class APIClient {
         return await response.json();
     }
     
-    static async extractInfo() {
+    // options: { after, limit, code, number } - 페이지 단위 조회 (limit 없으면 전체)
+    static async extractInfo(options = {}) {
         const response = await fetch(`${API_BASE_URL}/extract-info`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
-            }
+            },
+            body: JSON.stringify(options)
         });
         if (!response.ok) {
             throw new Error(`서버 오류: ${response.status}`);
@@ -181,13 +185,15 @@ async function handleExcelGeneration() {
     UIController.showStepMessage(4, '개인정보를 추출하여 엑셀을 생성하는 중...', 'info');
 
     try {
-        const result = await APIClient.extractInfo();
+        // 미리보기에는 20개만 쓰므로 첫 페이지만 요청 (전체는 엑셀 다운로드 시 페이지 단위로 조회)
+        const result = await APIClient.extractInfo({ limit: 20 });
         
         if (result.success) {
             personalInfoData = result.personal_info;
+            personalInfoTotal = result.total_extracted;
             UIController.updateProgress('excelProgress', 100);
             
-            if (personalInfoData.length > 0) {
+            if (personalInfoTotal > 0) {
                 UIController.completeStep(4);
                 displayResults();
                 
@@ -195,7 +201,7 @@ async function handleExcelGeneration() {
                 const downloadDirectBtn = document.getElementById('downloadExcelDirectBtn');
                 downloadDirectBtn.style.display = 'block';
                 
-                UIController.showStepMessage(4, `${personalInfoData.length}개 항목의 개인정보 엑셀이 생성되었습니다!`, 'success');
+                UIController.showStepMessage(4, `${personalInfoTotal}개 항목의 개인정보 엑셀이 생성되었습니다!`, 'success');
             } else {
                 UIController.showStepMessage(4, '올바른 형식의 파일이 없습니다. 파일명이 "성명_생년월일.pdf" 형태인지 확인해주세요.', 'error');
             }
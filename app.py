@@ -1,8 +1,6 @@
 from flask import Flask, request, jsonify, send_file, send_from_directory, Response
 from flask_cors import CORS
 import os
-import tempfile
-import zipfile
 import uuid
 from datetime import datetime
 import threading
@@ -11,7 +9,9 @@ import subprocess
 import json
 import queue
 
-from pdf_processor import PDFProcessor
+from pdf_processor import PDFProcessor, is_masked_output, FILE_MAPPING_NAME
+from zip_stream import ZipArchiveCache, archive_manifest_key
+from source_hashes import DuplicateUpload
 
 app = Flask(__name__, static_folder='.', static_url_path='')
 CORS(app)
@@ -27,13 +27,32 @@ log.setLevel(logging.WARNING)
 # 설정
 PDF_SOURCE_FOLDER = 'pdfs'
 MASKED_PDF_FOLDER = 'masked-pdfs'
-MAX_WORKERS = 4
-BATCH_SIZE = 50
+DOWNLOAD_CACHE_FOLDER = 'download-cache'  # /download-masked ZIP 캐시 (최신 1개만 유지)
+MAX_WORKERS = 4  # 마스킹 프로세스 풀 크기
+BATCH_SIZE = 50  # 첫 배치 파일 수 (이후 메모리 측정값에 따라 자동 조정)
+MASKING_RSS_BUDGET_MB = 1024  # 마스킹 워커 전체 RSS 예산
+COMPACT_OUTPUT = False  # True: 첫 페이지만 추출 후 압축/정리하여 저장
+MASKING_STRATEGY = 'fixed'  # 'fixed': 고정 좌표, 'anchor': 텍스트 라벨 위치 기준으로 좌표 보정
+MASKED_OUTPUT_FORMAT = 'pdf'  # 'pdf': 벡터 PDF, 'image-pdf' / 'png' / 'jpeg': 흑백 래스터 (OCR 요청 크기 축소)
+RASTER_DPI = 150  # 래스터 출력 해상도
+PAGE_SELECTION = 'first'  # 'first': 첫 페이지만, 'target': 사업장별 수입금액 표/요약 필드가 있는 페이지 모두
+SCAN_PAGE_SIZE = 100  # /scan-pdfs 기본 페이지 크기
+SCAN_MAX_PAGE_SIZE = 5000
+EXTRACT_MAX_PAGE_SIZE = 5000  # /extract-info 한 번에 반환하는 최대 항목 수
+OCR_CONCURRENCY = 8  # OCR 스크립트의 Vertex AI 동시 요청 수 (시트에는 파일 번호 순으로 기록)
+OCR_REQUESTS_PER_MINUTE = 60  # Vertex AI 분당 요청 수 한도 (모든 작업자 공유, 0이면 제한 없음)
+OCR_TOKENS_PER_MINUTE = 0  # Vertex AI 분당 토큰 수 한도 (0이면 제한 없음)
+WATCH_STABLE_SECONDS = 2  # 감시 모드: 크기/수정 시각이 이 시간(초) 동안 그대로인 파일만 처리
+WATCH_MAX_IN_FLIGHT = 4  # 감시 모드: 동시에 진행하는 Vertex AI 요청 수
 
 # 작업 상태 추적
 job_status = {}
 job_lock = threading.Lock()
 
+# 실행 중인 OCR 프로세스 (job_id → Popen) 와 감시 모드 작업 ID
+ocr_processes = {}
+watch_job_id = None
+
 # 실시간 로그 스트리밍을 위한 큐
 log_queues = {}
 log_queues_lock = threading.Lock()
@@ -43,7 +62,10 @@ os.makedirs(PDF_SOURCE_FOLDER, exist_ok=True)
 os.makedirs(MASKED_PDF_FOLDER, exist_ok=True)
 
 # PDF 프로세서 초기화
-pdf_processor = PDFProcessor(PDF_SOURCE_FOLDER, MASKED_PDF_FOLDER, BATCH_SIZE)
+pdf_processor = PDFProcessor(PDF_SOURCE_FOLDER, MASKED_PDF_FOLDER, BATCH_SIZE, MAX_WORKERS, COMPACT_OUTPUT,
+                             MASKING_STRATEGY, MASKED_OUTPUT_FORMAT, RASTER_DPI, MASKING_RSS_BUDGET_MB,
+                             PAGE_SELECTION)
+download_cache = ZipArchiveCache(DOWNLOAD_CACHE_FOLDER)
 
 def update_job_status(job_id, status, progress=0, message="", error=None, log_output=None):
     """작업 상태 업데이트"""
@@ -57,6 +79,11 @@ def update_job_status(job_id, status, progress=0, message="", error=None, log_ou
             'timestamp': datetime.now().isoformat()
         }
 
+def is_watch_running():
+    """감시 모드 작업이 대기/실행 중인지"""
+    with job_lock:
+        return watch_job_id is not None and job_status.get(watch_job_id, {}).get('status') in ('pending', 'running')
+
 def add_log_to_queue(job_id, log_line):
     """실시간 로그 큐에 새 로그 추가"""
     with log_queues_lock:
@@ -83,23 +110,81 @@ def static_files(filename):
 
 @app.route('/scan-pdfs', methods=['GET'])
 def scan_pdfs():
-    """pdfs 폴더의 파일 목록 스캔"""
+    """pdfs 폴더의 파일 목록 스캔
+    
+    쿼리 파라미터: cursor (이전 응답의 next_cursor), limit, sort (name|size|mtime), order (asc|desc)
+    count/total_size 는 항상 폴더 전체 기준
+    """
     try:
-        result = pdf_processor.scan_pdf_files()
+        limit = max(1, min(int(request.args.get('limit', SCAN_PAGE_SIZE)), SCAN_MAX_PAGE_SIZE))
+        result = pdf_processor.scan_pdf_files(
+            cursor=request.args.get('cursor'),
+            limit=limit,
+            sort=request.args.get('sort', 'name'),
+            order=request.args.get('order', 'asc')
+        )
         return jsonify({
             'success': True,
             'files': result['files'],
             'count': result['count'],
             'total_size': result['total_size'],
+            'next_cursor': result['next_cursor'],
             'folder': PDF_SOURCE_FOLDER
         })
+    except ValueError as e:
+        return jsonify({'error': f'잘못된 요청: {str(e)}'}), 400
     except Exception as e:
         return jsonify({'error': f'폴더 스캔 중 오류: {str(e)}'}), 500
 
+@app.route('/upload-pdf', methods=['POST'])
+def upload_pdf():
+    """원본 PDF 업로드 - 요청 본문을 그대로 pdfs 폴더에 스트리밍 저장
+    
+    파일명은 ?filename= 또는 X-Filename 헤더로 전달 (본문은 PDF 바이트 그대로).
+    이미 같은 내용의 원본이 있으면 저장하지 않고 duplicate 로 응답함
+    """
+    filename = request.args.get('filename') or request.headers.get('X-Filename')
+    if not filename:
+        return jsonify({'error': '파일명(filename)이 필요합니다.'}), 400
+    
+    try:
+        uploaded = pdf_processor.receive_upload(request.stream, filename)
+        return jsonify({
+            'success': True,
+            'duplicate': False,
+            'filename': uploaded['filename'],
+            'size': uploaded['size'],
+            'sha256': uploaded['sha256']
+        })
+    except DuplicateUpload as e:
+        return jsonify({
+            'success': True,
+            'duplicate': True,
+            'filename': filename,
+            'duplicate_of': e.duplicate_of,
+            'size': e.size,
+            'sha256': e.sha256
+        })
+    except ValueError as e:
+        return jsonify({'error': f'잘못된 요청: {str(e)}'}), 400
+    except FileExistsError as e:
+        return jsonify({'error': str(e)}), 409
+    except Exception as e:
+        return jsonify({'error': f'업로드 중 오류: {str(e)}'}), 500
+
 @app.route('/mask-pdfs', methods=['POST'])
 def mask_pdfs():
     """pdfs 폴더의 파일들을 마스킹 처리"""
+    if is_watch_running():
+        return jsonify({'error': '감시 모드가 실행 중입니다. 감시를 중지한 뒤 다시 시도하세요.'}), 409
     try:
+        # 요청 옵션 (incremental: 변경/추가된 파일만 마스킹, compact: 압축 출력 모드,
+        #           resume: 중단된 작업을 저널 기준으로 이어서 처리)
+        options = request.get_json(silent=True) or {}
+        incremental = bool(options.get('incremental', False))
+        compact = options.get('compact')
+        resume = bool(options.get('resume', False))
+        
         # 작업 ID 생성
         job_id = str(uuid.uuid4())
         update_job_status(job_id, 'pending', 0, '마스킹 처리 대기 중')
@@ -110,7 +195,8 @@ def mask_pdfs():
                 update_job_status(job_id, status, progress, message)
             
             try:
-                result = pdf_processor.process_masking(status_callback)
+                result = pdf_processor.process_masking(status_callback, incremental=incremental, compact=compact,
+                                                       resume=resume)
                 # 결과를 job_status에 저장
                 with job_lock:
                     job_status[job_id]['result'] = result
@@ -124,7 +210,8 @@ def mask_pdfs():
         return jsonify({
             'success': True,
             'job_id': job_id,
-            'message': '마스킹 처리가 시작되었습니다.',
+            'message': '증분 마스킹 처리가 시작되었습니다.' if incremental else '마스킹 처리가 시작되었습니다.',
+            'incremental': incremental,
             'source_folder': PDF_SOURCE_FOLDER,
             'target_folder': MASKED_PDF_FOLDER
         })
@@ -132,7 +219,30 @@ def mask_pdfs():
     except Exception as e:
         return jsonify({'error': f'마스킹 작업 시작 중 오류: {str(e)}'}), 500
 
-def run_ocr_with_realtime_output(job_id):
+@app.route('/calibrate-masking', methods=['POST'])
+def calibrate_masking():
+    """기준 샘플 PDF에서 마스킹 앵커 라벨 위치 측정 (anchor 마스킹용)"""
+    try:
+        options = request.get_json(silent=True) or {}
+        sample = options.get('sample')
+        if not sample:
+            return jsonify({'error': '기준 샘플 파일명(sample)이 필요합니다.'}), 400
+        
+        sample_path = os.path.join(PDF_SOURCE_FOLDER, os.path.basename(sample))
+        if not os.path.exists(sample_path):
+            return jsonify({'error': f'"{sample}" 파일을 찾을 수 없습니다.'}), 404
+        
+        anchors = pdf_processor.calibrate_masking_anchors(sample_path)
+        return jsonify({
+            'success': True,
+            'anchors': anchors,
+            'masking_strategy': MASKING_STRATEGY
+        })
+        
+    except Exception as e:
+        return jsonify({'error': f'앵커 보정 중 오류: {str(e)}'}), 500
+
+def run_ocr_with_realtime_output(job_id, env_overrides=None):
     """실시간 출력을 캡처하면서 OCR 스크립트 실행 (시간 제한 없음)"""
     try:
         update_job_status(job_id, 'running', 10, 'Gemini OCR 스크립트 실행 중...')
@@ -145,6 +255,7 @@ def run_ocr_with_realtime_output(job_id):
         env = os.environ.copy()
         env['PYTHONIOENCODING'] = 'utf-8'
         env['PYTHONUNBUFFERED'] = '1'
+        env.update(env_overrides or {})
         
         # 프로세스 시작 (timeout 제거)
         process = subprocess.Popen(
@@ -158,6 +269,9 @@ def run_ocr_with_realtime_output(job_id):
             universal_newlines=True
         )
         
+        with job_lock:
+            ocr_processes[job_id] = process
+        
         output_lines = []
         
         # 실시간으로 출력 읽기
@@ -226,54 +340,178 @@ def run_ocr_with_realtime_output(job_id):
         update_job_status(job_id, 'failed', 0, error_msg, str(e))
         logger.error(error_msg)
     finally:
+        with job_lock:
+            ocr_processes.pop(job_id, None)
+        
         # 로그 큐 정리
         with log_queues_lock:
             if job_id in log_queues:
                 del log_queues[job_id]
 
+def masking_env_overrides():
+    """OCR 스크립트가 직접 마스킹할 때 (memory/watch 모드) 서버와 같은 마스킹 설정을 쓰도록 넘기는 환경 변수"""
+    return {
+        'MASK_COMPACT_OUTPUT': '1' if COMPACT_OUTPUT else '0',
+        'MASKING_STRATEGY': MASKING_STRATEGY,
+        'MASKED_OUTPUT_FORMAT': MASKED_OUTPUT_FORMAT,
+        'RASTER_DPI': str(RASTER_DPI),
+        'PAGE_SELECTION': PAGE_SELECTION
+    }
+
+def ocr_rate_env_overrides():
+    """OCR 스크립트의 동시 요청 수와 분당 요청/토큰 한도"""
+    return {
+        'OCR_CONCURRENCY': str(OCR_CONCURRENCY),
+        'OCR_REQUESTS_PER_MINUTE': str(OCR_REQUESTS_PER_MINUTE),
+        'OCR_TOKENS_PER_MINUTE': str(OCR_TOKENS_PER_MINUTE)
+    }
+
 @app.route('/run-gemini-ocr-async', methods=['POST'])
 def run_gemini_ocr_async():
-    """비동기 Gemini OCR 처리"""
+    """비동기 Gemini OCR 처리
+    
+    요청 옵션 in_memory=true 이면 masked-pdfs를 거치지 않고 원본을 바로 마스킹해서
+    메모리에서 OCR로 넘김 (write_masked=true 이면 masked-pdfs에도 기록)
+    batch=true 이면 파일별 온라인 요청 대신 Vertex AI 배치 예측으로 처리
+    (GCS 경로는 .env 의 OCR_BATCH_GCS_PREFIX 사용, 결과가 나올 때까지 시간이 걸림)
+    """
+    if is_watch_running():
+        return jsonify({'error': '감시 모드가 실행 중입니다. 감시를 중지한 뒤 다시 시도하세요.'}), 409
     try:
-        if not os.path.exists(MASKED_PDF_FOLDER):
-            return jsonify({'error': f'"{MASKED_PDF_FOLDER}" 폴더가 없습니다.'}), 400
+        options = request.get_json(silent=True) or {}
+        in_memory = bool(options.get('in_memory', False))
         
-        masked_files = [f for f in os.listdir(MASKED_PDF_FOLDER) if f.lower().endswith('.pdf')]
-        if not masked_files:
-            return jsonify({'error': f'"{MASKED_PDF_FOLDER}" 폴더에 처리할 파일이 없습니다.'}), 400
+        if in_memory:
+            input_folder = PDF_SOURCE_FOLDER
+            env_overrides = {
+                'OCR_INPUT_MODE': 'memory',
+                'OCR_WRITE_MASKED': '1' if options.get('write_masked') else '0',
+                **masking_env_overrides()
+            }
+        else:
+            input_folder = MASKED_PDF_FOLDER
+            env_overrides = {'OCR_INPUT_MODE': 'disk'}
+        env_overrides.update(ocr_rate_env_overrides())
+        if options.get('batch'):
+            env_overrides['OCR_BATCH_MODE'] = 'vertex'
+        
+        if not os.path.exists(input_folder):
+            return jsonify({'error': f'"{input_folder}" 폴더가 없습니다.'}), 400
+        
+        if in_memory:
+            input_files = [f for f in os.listdir(input_folder) if f.lower().endswith('.pdf')]
+        else:
+            input_files = [f for f in os.listdir(input_folder) if is_masked_output(f)]
+        if not input_files:
+            return jsonify({'error': f'"{input_folder}" 폴더에 처리할 파일이 없습니다.'}), 400
         
         # 작업 ID 생성
         job_id = str(uuid.uuid4())
-        update_job_status(job_id, 'pending', 0, f'{len(masked_files)}개 파일 OCR 처리 대기 중')
+        update_job_status(job_id, 'pending', 0, f'{len(input_files)}개 파일 OCR 처리 대기 중')
         
         # 백그라운드에서 실시간 출력과 함께 OCR 실행
-        thread = threading.Thread(target=run_ocr_with_realtime_output, args=(job_id,))
+        thread = threading.Thread(target=run_ocr_with_realtime_output, args=(job_id, env_overrides))
         thread.daemon = True
         thread.start()
         
         return jsonify({
             'success': True,
             'job_id': job_id,
-            'message': f'{len(masked_files)}개 파일 OCR 처리가 시작되었습니다. (시간 제한 없음)',
-            'source_folder': MASKED_PDF_FOLDER
+            'message': f'{len(input_files)}개 파일 OCR 처리가 시작되었습니다. (시간 제한 없음)',
+            'in_memory': in_memory,
+            'source_folder': input_folder
         })
         
     except Exception as e:
         return jsonify({'error': f'OCR 작업 시작 중 오류: {str(e)}'}), 500
 
+@app.route('/start-watch', methods=['POST'])
+def start_watch():
+    """감시 모드 시작 - pdfs 폴더에 새로 들어오는 PDF를 하나씩 마스킹/OCR 해서 바로 시트에 반영
+    
+    진행 로그는 다른 OCR 작업과 같이 /stream-logs/<job_id> 로 확인
+    """
+    global watch_job_id
+    
+    with job_lock:
+        running = watch_job_id is not None and job_status.get(watch_job_id, {}).get('status') in ('pending', 'running')
+        if not running:
+            watch_job_id = str(uuid.uuid4())
+            job_status[watch_job_id] = {
+                'status': 'pending',
+                'progress': 0,
+                'message': '감시 모드 시작 대기 중',
+                'error': None,
+                'log_output': None,
+                'timestamp': datetime.now().isoformat()
+            }
+        job_id = watch_job_id
+    if running:
+        return jsonify({'error': '감시 모드가 이미 실행 중입니다.', 'job_id': job_id}), 409
+    
+    env_overrides = {
+        'OCR_INPUT_MODE': 'watch',
+        'WATCH_STABLE_SECONDS': str(WATCH_STABLE_SECONDS),
+        'WATCH_MAX_IN_FLIGHT': str(WATCH_MAX_IN_FLIGHT),
+        **ocr_rate_env_overrides(),
+        **masking_env_overrides()
+    }
+    thread = threading.Thread(target=run_ocr_with_realtime_output, args=(job_id, env_overrides))
+    thread.daemon = True
+    thread.start()
+    
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'message': f'"{PDF_SOURCE_FOLDER}" 폴더 감시를 시작했습니다. 새로 들어오는 PDF만 처리합니다.',
+        'source_folder': PDF_SOURCE_FOLDER
+    })
+
+@app.route('/stop-watch', methods=['POST'])
+def stop_watch():
+    """감시 모드 중지 - 처리 중인 파일은 마치고 종료 (SIGTERM)"""
+    with job_lock:
+        job_id = watch_job_id
+        process = ocr_processes.get(job_id) if job_id else None
+    if process is None:
+        return jsonify({'error': '실행 중인 감시 모드가 없습니다.'}), 404
+    
+    process.terminate()
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'message': '감시 중지를 요청했습니다. 처리 중인 파일을 마친 뒤 종료됩니다.'
+    })
+
 @app.route('/extract-info', methods=['POST'])
 def extract_personal_info():
-    """개인정보 추출"""
+    """개인정보 추출
+    
+    JSON 옵션: after (이전 응답의 next_after), limit, code (코드로 조회), number (마스킹 번호로 조회)
+    limit 을 주지 않으면 전체 반환 (기존 동작)
+    """
     try:
-        personal_info = pdf_processor.extract_personal_info()
+        options = request.get_json(silent=True) or {}
+        after = options.get('after')
+        limit = options.get('limit')
+        number = options.get('number')
+        result = pdf_processor.extract_personal_info(
+            after=int(after) if after is not None else None,
+            limit=max(1, min(int(limit), EXTRACT_MAX_PAGE_SIZE)) if limit is not None else None,
+            code=options.get('code'),
+            number=int(number) if number is not None else None
+        )
         
         return jsonify({
             'success': True,
-            'personal_info': personal_info,
-            'total_extracted': len(personal_info),
+            'personal_info': result['personal_info'],
+            'total_extracted': result['total'],
+            'next_after': result['next_after'],
             'source_folder': PDF_SOURCE_FOLDER
         })
         
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'잘못된 요청: {str(e)}'}), 400
     except Exception as e:
         return jsonify({'error': f'정보 추출 중 오류: {str(e)}'}), 500
 
@@ -339,34 +577,44 @@ import time
 
 @app.route('/download-masked')
 def download_masked_files():
-    """마스킹된 파일들을 ZIP으로 다운로드"""
+    """마스킹된 파일들을 ZIP으로 다운로드
+    
+    임시 파일 없이 무압축 ZIP을 만들면서 바로 스트리밍하고, 같은 파일 구성이면
+    (이름/크기/수정 시각 기준) 이전에 만든 캐시 아카이브를 그대로 보냄
+    """
     try:
         if not os.path.exists(MASKED_PDF_FOLDER):
             return jsonify({'error': f'"{MASKED_PDF_FOLDER}" 폴더가 없습니다.'}), 400
         
-        masked_files = [f for f in os.listdir(MASKED_PDF_FOLDER) if f.endswith('.pdf')]
+        # 같은 이름으로 다시 마스킹된 파일도 반영되도록 강제로 다시 스캔
+        pdf_processor.masked_index.refresh(force=True)
+        masked_files = [entry['filename'] for entry in pdf_processor.masked_index.page()['files']]
         
         if not masked_files:
             return jsonify({'error': '다운로드할 마스킹된 파일이 없습니다.'}), 400
         
-        zip_path = os.path.join(tempfile.gettempdir(), 
-                               f'masked_files_{datetime.now().strftime("%Y%m%d_%H%M%S")}.zip')
+        files = [(filename, os.path.join(MASKED_PDF_FOLDER, filename)) for filename in masked_files]
         
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for filename in masked_files:
-                file_path = os.path.join(MASKED_PDF_FOLDER, filename)
-                zipf.write(file_path, filename)
-            
-            # 매핑 파일도 포함
-            mapping_path = os.path.join(MASKED_PDF_FOLDER, 'file_mapping.json')
-            if os.path.exists(mapping_path):
-                zipf.write(mapping_path, 'file_mapping.json')
-        
-        return send_file(
-            zip_path,
-            as_attachment=True,
-            download_name=f'masked_pdfs_{datetime.now().strftime("%Y%m%d_%H%M%S")}.zip',
-            mimetype='application/zip'
+        # 매핑 파일도 포함
+        mapping_path = os.path.join(MASKED_PDF_FOLDER, FILE_MAPPING_NAME)
+        if os.path.exists(mapping_path):
+            files.append((FILE_MAPPING_NAME, mapping_path))
+        
+        archive_key = archive_manifest_key(files)
+        download_name = f'masked_pdfs_{datetime.now().strftime("%Y%m%d_%H%M%S")}.zip'
+        
+        cached_path = download_cache.get(archive_key)
+        if cached_path:
+            return send_file(cached_path, as_attachment=True, download_name=download_name,
+                             mimetype='application/zip', etag=archive_key)
+        
+        return Response(
+            download_cache.stream(archive_key, files),
+            mimetype='application/zip',
+            headers={
+                'Content-Disposition': f'attachment; filename={download_name}',
+                'ETag': f'"{archive_key}"'
+            }
         )
         
     except Exception as e:
@@ -376,12 +624,9 @@ def download_masked_files():
 def health_check():
     """서버 상태 확인 - Vertex AI 버전"""
     
-    # 폴더 상태 확인
-    pdfs_exists = os.path.exists(PDF_SOURCE_FOLDER)
-    pdfs_count = len([f for f in os.listdir(PDF_SOURCE_FOLDER) if f.endswith('.pdf')]) if pdfs_exists else 0
-    
-    masked_exists = os.path.exists(MASKED_PDF_FOLDER)
-    masked_count = len([f for f in os.listdir(MASKED_PDF_FOLDER) if f.endswith('.pdf')]) if masked_exists else 0
+    # 폴더 상태 확인 (폴더 인덱스 캐시 사용 - 변경이 없으면 디렉터리를 다시 읽지 않음)
+    pdfs_stats = pdf_processor.source_index.stats()
+    masked_stats = pdf_processor.masked_index.stats()
     
     # Vertex AI 환경 변수 체크
     vertex_ai_config = {
@@ -399,26 +644,43 @@ def health_check():
         'vertex_ai': vertex_ai_config,
         'folders': {
             'pdfs': {
-                'exists': pdfs_exists,
-                'count': pdfs_count,
+                'exists': pdfs_stats['exists'],
+                'count': pdfs_stats['count'],
+                'total_size': pdfs_stats['total_size'],
                 'path': PDF_SOURCE_FOLDER
             },
             'masked_pdfs': {
-                'exists': masked_exists,
-                'count': masked_count,
+                'exists': masked_stats['exists'],
+                'count': masked_stats['count'],
+                'total_size': masked_stats['total_size'],
                 'path': MASKED_PDF_FOLDER
             }
         },
         'max_workers': MAX_WORKERS,
-        'batch_size': BATCH_SIZE
+        'batch_size': BATCH_SIZE,
+        'masking_rss_budget_mb': MASKING_RSS_BUDGET_MB,
+        'masking_resumable': pdf_processor.journal.exists(),
+        'compact_output': COMPACT_OUTPUT,
+        'masking_strategy': MASKING_STRATEGY,
+        'masked_output_format': MASKED_OUTPUT_FORMAT,
+        'page_selection': PAGE_SELECTION,
+        'ocr_concurrency': OCR_CONCURRENCY,
+        'ocr_requests_per_minute': OCR_REQUESTS_PER_MINUTE,
+        'ocr_tokens_per_minute': OCR_TOKENS_PER_MINUTE,
+        'watch': {
+            'running': is_watch_running(),
+            'job_id': watch_job_id,
+            'stable_seconds': WATCH_STABLE_SECONDS,
+            'max_in_flight': WATCH_MAX_IN_FLIGHT
+        }
     })
 
 if __name__ == '__main__':
     print("🚀 PDF 통합 처리 백엔드 서버를 시작합니다...")
     print(f"📂 원본 PDF 폴더: {PDF_SOURCE_FOLDER}")
     print(f"📂 마스킹 폴더: {MASKED_PDF_FOLDER}")
-    print(f"⚙️ 최대 동시 처리: {MAX_WORKERS} 스레드")
-    print(f"📦 배치 크기: {BATCH_SIZE} 파일")
+    print(f"⚙️ 최대 동시 처리: {MAX_WORKERS} 프로세스")
+    print(f"📦 배치 크기: {BATCH_SIZE} 파일 (메모리 예산 {MASKING_RSS_BUDGET_MB}MB 기준 자동 조정)")
     print("🌐 서버 주소: http://localhost:5000")
     
     app.run(debug=True, host='0.0.0.0', port=5000, threaded=True)
\ No newline at end of file
@@ -0,0 +1,179 @@
+import os
+import json
+import time
+import base64
+from abc import ABC, abstractmethod
+
+# 배치 요청 줄마다 파일 번호를 넣어 두는 라벨 (결과 JSONL 에 요청이 그대로 실려 와서 매칭에 사용)
+# Vertex AI 라벨 값은 소문자, 숫자, '_', '-' 만 허용하므로 파일명 대신 batch_key() 값을 넣음
+BATCH_KEY_LABEL = 'file_number'
+BATCH_KEY_PREFIX = 'doc-'
+
+BATCH_INPUT_NAME = 'batch_input.jsonl'
+BATCH_OUTPUT_NAME = 'predictions.jsonl'
+
+
+def batch_key(number):
+    """파일 번호 → 라벨 값 (예: 3 → 'doc-3')"""
+    return f'{BATCH_KEY_PREFIX}{number}'
+
+
+def parse_batch_key(key):
+    """라벨 값 → 파일 번호 (형식이 다르면 None)"""
+    if not isinstance(key, str) or not key.startswith(BATCH_KEY_PREFIX):
+        return None
+    number = key[len(BATCH_KEY_PREFIX):]
+    return int(number) if number.isdigit() else None
+
+
+def build_batch_request(number, file_data, mime_type, prompt, response_schema=None):
+    """배치 예측 입력 한 줄 (GenerateContentRequest - 문서는 inlineData 로 포함)
+
+    response_schema 가 있으면 온라인 요청과 같이 스키마 기반 JSON 출력을 요청
+    """
+    request = {
+        'contents': [{
+            'role': 'user',
+            'parts': [
+                {'inlineData': {'mimeType': mime_type, 'data': base64.b64encode(file_data).decode('ascii')}},
+                {'text': prompt}
+            ]
+        }],
+        'labels': {BATCH_KEY_LABEL: batch_key(number)}
+    }
+    if response_schema is not None:
+        request['generationConfig'] = {'responseMimeType': 'application/json', 'responseSchema': response_schema}
+    return {'request': request}
+
+
+def write_batch_requests(input_path, documents, prompt, response_schema=None):
+    """(파일 번호, 바이트, MIME 타입) 목록을 배치 입력 JSONL 로 기록 - 문서 하나씩 써서 전체를 메모리에 두지 않음
+
+    반환값: 기록한 요청 수
+    """
+    count = 0
+    with open(input_path, 'w', encoding='utf-8') as f:
+        for number, file_data, mime_type in documents:
+            request = build_batch_request(number, file_data, mime_type, prompt, response_schema)
+            f.write(json.dumps(request, ensure_ascii=False) + '\n')
+            count += 1
+    return count
+
+
+def _response_text(response):
+    """GenerateContentResponse 의 첫 후보 텍스트 (없으면 None)"""
+    for candidate in (response or {}).get('candidates', []):
+        parts = candidate.get('content', {}).get('parts', [])
+        text = ''.join(part.get('text', '') for part in parts)
+        if text:
+            return text
+    return None
+
+
+def iter_batch_results(output_paths):
+    """배치 결과 JSONL 들을 읽어 (파일 번호, 응답 텍스트 또는 None, 오류 메시지 또는 None) 를 하나씩 반환"""
+    for output_path in output_paths:
+        with open(output_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                number = parse_batch_key(item.get('request', {}).get('labels', {}).get(BATCH_KEY_LABEL))
+                if number is None:
+                    continue
+                status = item.get('status')
+                text = _response_text(item.get('response'))
+                if status or text is None:
+                    yield number, None, status or '응답 텍스트 없음'
+                else:
+                    yield number, text, None
+
+
+class BatchSubmitter(ABC):
+    """배치 예측 제출 인터페이스 - 입력 JSONL 을 제출하고 끝날 때까지 기다려 결과 JSONL 경로 목록 반환"""
+
+    @abstractmethod
+    def run(self, input_path, output_folder, log=print):
+        pass
+
+
+class LocalBatchSubmitter(BatchSubmitter):
+    """Vertex AI 없이 배치 흐름을 확인하기 위한 로컬 대체 구현
+
+    입력 JSONL 의 각 요청에 대해 responses_folder/<파일 번호>.txt 를 응답 텍스트로 사용해
+    Vertex AI 배치 결과와 같은 형식의 JSONL 을 만듦 (파일이 없으면 그 요청은 오류 상태)
+    """
+
+    def __init__(self, responses_folder):
+        self.responses_folder = responses_folder
+
+    def run(self, input_path, output_folder, log=print):
+        output_path = os.path.join(output_folder, BATCH_OUTPUT_NAME)
+        with open(input_path, 'r', encoding='utf-8') as source, open(output_path, 'w', encoding='utf-8') as target:
+            for line in source:
+                request = json.loads(line)['request']
+                number = parse_batch_key(request.get('labels', {}).get(BATCH_KEY_LABEL))
+                response_path = os.path.join(self.responses_folder, f'{number}.txt')
+                result = {'request': request, 'status': ''}
+                if os.path.exists(response_path):
+                    with open(response_path, 'r', encoding='utf-8') as f:
+                        result['response'] = {'candidates': [{'content': {'role': 'model',
+                                                                          'parts': [{'text': f.read()}]}}]}
+                else:
+                    result['status'] = f'로컬 응답 파일 없음: {response_path}'
+                target.write(json.dumps(result, ensure_ascii=False) + '\n')
+        log(f"📁 로컬 배치 결과 생성: {output_path}")
+        return [output_path]
+
+
+class VertexBatchSubmitter(BatchSubmitter):
+    """Vertex AI 배치 예측 - 입력 JSONL 을 GCS 에 올리고 작업이 끝나면 결과 JSONL 을 내려받음
+
+    gcs_prefix 예: gs://bucket/pdf-ocr-batch (작업마다 하위 폴더를 만들어 입력/출력을 둠)
+    """
+
+    def __init__(self, gcs_prefix, model_name, poll_interval=60):
+        self.gcs_prefix = gcs_prefix.rstrip('/')
+        self.model_name = model_name
+        self.poll_interval = poll_interval
+
+    @staticmethod
+    def _split_gcs_uri(uri):
+        bucket, _, path = uri[len('gs://'):].partition('/')
+        return bucket, path
+
+    def run(self, input_path, output_folder, log=print):
+        from google.cloud import storage
+        from vertexai.batch_prediction import BatchPredictionJob
+
+        job_prefix = f"{self.gcs_prefix}/{os.path.basename(os.path.normpath(output_folder))}"
+        bucket_name, input_blob_path = self._split_gcs_uri(f"{job_prefix}/{BATCH_INPUT_NAME}")
+        client = storage.Client()
+        client.bucket(bucket_name).blob(input_blob_path).upload_from_filename(input_path)
+        log(f"☁️ 배치 입력 업로드 완료: gs://{bucket_name}/{input_blob_path}")
+
+        job = BatchPredictionJob.submit(
+            source_model=self.model_name,
+            input_dataset=f"gs://{bucket_name}/{input_blob_path}",
+            output_uri_prefix=f"{job_prefix}/output"
+        )
+        log(f"🚀 배치 예측 작업 제출: {job.resource_name}")
+
+        while not job.has_ended:
+            time.sleep(self.poll_interval)
+            job.refresh()
+            log(f"⏳ 배치 예측 작업 상태: {job.state.name}")
+        if not job.has_succeeded:
+            raise RuntimeError(f"배치 예측 작업 실패: {job.error}")
+
+        output_bucket, output_path = self._split_gcs_uri(job.output_location)
+        output_paths = []
+        for blob in client.list_blobs(output_bucket, prefix=output_path):
+            if not blob.name.endswith('.jsonl'):
+                continue
+            local_path = os.path.join(output_folder, f"{len(output_paths)}-{os.path.basename(blob.name)}")
+            blob.download_to_filename(local_path)
+            output_paths.append(local_path)
+        log(f"📥 배치 결과 {len(output_paths)}개 파일 다운로드 완료")
+        return output_paths
+
@@ -0,0 +1,152 @@
+import os
+import sys
+
+import fitz  # PyMuPDF
+
+try:
+    import psutil  # 선택 - 없으면 /proc 또는 resource 로 대체
+except ImportError:
+    psutil = None
+
+# 배치 크기 상한/하한 (파일 수)
+MIN_BATCH_FILES = 1
+MAX_BATCH_FILES = 1000
+
+# 처음 측정값이 나오기 전 파일 하나당 메모리 추정치
+FILE_BASE_COST = 2 * 1024 * 1024    # 문서 열기/저장 고정 비용
+BYTE_COST = 1.5                     # 원본 바이트당 (xref, 객체 파싱)
+PAGE_COST = 16 * 1024               # 페이지 트리 객체당
+
+# 이 크기 이상인 파일만 실제로 열어서 페이지 수를 셈 (작은 고지서는 1페이지로 간주)
+PAGE_COUNT_MIN_BYTES = 1024 * 1024
+
+# 측정값 반영 비율 (지수 이동 평균)
+SCALE_SMOOTHING = 0.5
+
+
+def current_rss_bytes():
+    """현재 프로세스의 상주 메모리(RSS) 바이트 - 측정할 수 없으면 None"""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # 최대 RSS 로 대체 (Linux 는 KB, macOS 는 바이트 단위)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def release_memory(rss_budget):
+    """RSS 가 예산을 넘었으면 MuPDF 리소스 캐시(store)를 비우고 다시 측정한 값 반환"""
+    rss = current_rss_bytes()
+    if rss is not None and rss_budget and rss > rss_budget:
+        fitz.TOOLS.store_shrink(100)
+        rss = current_rss_bytes()
+    return rss
+
+
+def estimate_pages(input_path, size):
+    """큰 파일만 페이지 수를 세고 작은 파일은 1페이지로 간주"""
+    if size < PAGE_COUNT_MIN_BYTES:
+        return 1
+    try:
+        with fitz.open(input_path) as doc:
+            return max(doc.page_count, 1)
+    except Exception:
+        return 1
+
+
+class AdaptiveBatchScheduler:
+    """원본 바이트 수와 페이지 수로 배치를 나누고, 배치마다 실제 RSS를 측정해서 크기를 조정
+
+    파일 하나의 예상 메모리 = (고정 비용 + 바이트 비용 + 페이지 비용) × scale 이고,
+    scale 은 배치 처리 후 측정한 (RSS - 기준 RSS) / 예상 비용 으로 계속 보정함.
+    배치 하나의 예상 메모리 합이 프로세스당 예산을 넘지 않을 때까지 파일을 담음
+    """
+
+    def __init__(self, files, rss_budget, initial_batch_files=50, workers=1):
+        self.queue = list(files)  # [(input_path, output_path, filename), ...] - 순서 유지
+        self.position = 0
+        self.workers = max(workers, 1)
+        # 워커 프로세스마다 독립된 메모리를 쓰므로 예산을 나눠 가짐
+        self.process_budget = rss_budget // self.workers if rss_budget else None
+        self.batch_files = min(max(initial_batch_files, MIN_BATCH_FILES), MAX_BATCH_FILES)
+        self.scale = 1.0
+        self.baseline_rss = None
+        self.peak_rss = 0
+        self.batch_count = 0
+        self._costs = {}
+
+    def _file_cost(self, item):
+        input_path = item[0]
+        if input_path not in self._costs:
+            try:
+                size = os.path.getsize(input_path)
+            except OSError:
+                size = 0
+            pages = estimate_pages(input_path, size)
+            self._costs[input_path] = FILE_BASE_COST + size * BYTE_COST + pages * PAGE_COST
+        return self._costs[input_path]
+
+    def remaining(self):
+        return len(self.queue) - self.position
+
+    def next_batch(self):
+        """다음 배치 (남은 파일이 없으면 None)"""
+        if self.position >= len(self.queue):
+            return None
+
+        headroom = None
+        if self.process_budget and self.baseline_rss is not None:
+            headroom = self.process_budget - self.baseline_rss
+
+        batch = []
+        estimated = 0.0
+        while self.position < len(self.queue) and len(batch) < self.batch_files:
+            item = self.queue[self.position]
+            cost = self._file_cost(item) * self.scale
+            if batch and headroom is not None and estimated + cost > headroom:
+                break
+            batch.append(item)
+            estimated += cost
+            self.position += 1
+
+        self.batch_count += 1
+        return batch, estimated
+
+    def record(self, batch, estimated, rss_before, rss_after):
+        """배치 처리 전/후 RSS 측정값으로 scale 과 다음 배치 파일 수 조정"""
+        if rss_after is None:
+            return
+        self.peak_rss = max(self.peak_rss, rss_after)
+        if self.baseline_rss is None or (rss_before is not None and rss_before < self.baseline_rss):
+            self.baseline_rss = rss_before if rss_before is not None else rss_after
+
+        if estimated > 0 and rss_before is not None:
+            observed = max(rss_after - self.baseline_rss, 0) / (estimated / self.scale)
+            self.scale = (1 - SCALE_SMOOTHING) * self.scale + SCALE_SMOOTHING * max(observed, 0.01)
+
+        if not self.process_budget:
+            return
+        if rss_after > self.process_budget:
+            # 예산 초과 - 다음 배치는 절반으로
+            self.batch_files = max(len(batch) // 2, MIN_BATCH_FILES)
+        elif rss_after < self.process_budget * 0.5 and len(batch) >= self.batch_files:
+            # 여유가 충분하고 파일 수 상한에 걸렸으면 두 배로
+            self.batch_files = min(self.batch_files * 2, MAX_BATCH_FILES)
+
+    def stats(self):
+        return {
+            'batches': self.batch_count,
+            'batch_files': self.batch_files,
+            'scale': round(self.scale, 3),
+            'baseline_rss_mb': round(self.baseline_rss / 1024 / 1024, 1) if self.baseline_rss else None,
+            'peak_rss_mb': round(self.peak_rss / 1024 / 1024, 1) if self.peak_rss else None,
+            'process_budget_mb': round(self.process_budget / 1024 / 1024, 1) if self.process_budget else None
+        }
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+기본 출력과 compact 출력 모드의 마스킹 결과 크기/시간 비교
+
+사용법:
+    python benchmarks/compact_output.py [원본 폴더] [--limit N]
+
+원본 폴더의 PDF를 임시 폴더 두 곳에 각각 마스킹한 뒤
+파일별 전/후 바이트와 처리 시간(ms), 전체 요약을 JSON으로 출력함
+"""
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_processor import PDFProcessor, summarize_masking_sizes
+
+
+def run_mode(source_folder, compact, limit):
+    """임시 폴더에 한 가지 모드로 마스킹하고 파일별 결과 반환"""
+    target_folder = tempfile.mkdtemp(prefix='masking-bench-')
+    try:
+        processor = PDFProcessor(source_folder, target_folder, batch_size=50, compact_output=compact)
+        pdf_files = sorted(
+            (f for f in os.listdir(source_folder) if f.lower().endswith('.pdf')),
+            key=processor.natural_sort_key
+        )[:limit]
+        files_batch = [
+            (os.path.join(source_folder, filename), os.path.join(target_folder, f"{number}.pdf"), filename)
+            for number, filename in enumerate(pdf_files, 1)
+        ]
+        return processor.redact_pdf_batch(files_batch, processor.default_masking_areas,
+                                          output_options={'compact': compact})
+    finally:
+        shutil.rmtree(target_folder, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='compact 마스킹 출력 모드 크기/시간 비교')
+    parser.add_argument('source_folder', nargs='?', default='pdfs')
+    parser.add_argument('--limit', type=int, default=200, help='비교할 최대 파일 수')
+    args = parser.parse_args()
+
+    default_files = run_mode(args.source_folder, False, args.limit)
+    compact_files = run_mode(args.source_folder, True, args.limit)
+
+    compact_by_name = {item['original_name']: item for item in compact_files}
+    per_file = []
+    for item in default_files:
+        compact_item = compact_by_name.get(item['original_name'])
+        if not compact_item:
+            continue
+        per_file.append({
+            'filename': item['original_name'],
+            'source_bytes': item['source_size'],
+            'default_bytes': item['size'],
+            'compact_bytes': compact_item['size'],
+            'default_ms': item['elapsed_ms'],
+            'compact_ms': compact_item['elapsed_ms']
+        })
+
+    print(json.dumps({
+        'files': per_file,
+        'summary': {
+            'default': summarize_masking_sizes(default_files),
+            'compact': summarize_masking_sizes(compact_files)
+        }
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
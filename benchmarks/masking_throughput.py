@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+마스킹 처리량 벤치마크 - 워커 수/배치 크기별 files/sec, MB/sec, 최대 RSS, 단계별 시간
+
+사용법:
+    python benchmarks/masking_throughput.py [원본 폴더] [--workers 1 2 4] [--batch-sizes 10 50]
+                                            [--generate N] [--compact] [--output result.json]
+
+원본 폴더를 지정하지 않으면 synthetic_corpus 로 합성 PDF를 임시 폴더에 만들어 사용함.
+설정 하나마다 별도 파이썬 프로세스에서 process_masking 을 실행해서 최대 RSS가
+이전 설정의 영향을 받지 않도록 함. 결과는 JSON으로 출력
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+
+STAGES = ('open', 'redact', 'insert', 'save')
+
+
+def peak_rss_mb(who):
+    """getrusage 기준 최대 RSS (MB) - RUSAGE_CHILDREN 은 종료된 워커 중 가장 큰 값"""
+    import resource
+    peak = resource.getrusage(who).ru_maxrss
+    return round((peak if sys.platform == 'darwin' else peak * 1024) / 1024 / 1024, 1)
+
+
+def run_single(source_folder, workers, batch_size, compact, rss_budget_mb):
+    """설정 하나 실행 (자식 프로세스 안에서 호출됨)"""
+    import resource
+    from pdf_processor import PDFProcessor
+
+    target_folder = tempfile.mkdtemp(prefix='masking-throughput-')
+    try:
+        processor = PDFProcessor(source_folder, target_folder, batch_size=batch_size, max_workers=workers,
+                                 compact_output=compact, rss_budget_mb=rss_budget_mb)
+        start_time = time.perf_counter()
+        result = processor.process_masking()
+        elapsed = time.perf_counter() - start_time
+    finally:
+        shutil.rmtree(target_folder, ignore_errors=True)
+
+    processed = result['processed_files']
+    source_bytes = result['size_stats']['source_bytes']
+    stage_totals = {stage: sum(item['stage_ms'][stage] for item in processed) for stage in STAGES}
+    return {
+        'workers': workers,
+        'batch_size': batch_size,
+        'compact': compact,
+        'files': len(processed),
+        'source_mb': round(source_bytes / 1024 / 1024, 2),
+        'elapsed_s': round(elapsed, 3),
+        'files_per_sec': round(len(processed) / elapsed, 2) if elapsed else None,
+        'mb_per_sec': round(source_bytes / 1024 / 1024 / elapsed, 2) if elapsed else None,
+        'peak_rss_main_mb': peak_rss_mb(resource.RUSAGE_SELF),
+        'peak_rss_worker_mb': peak_rss_mb(resource.RUSAGE_CHILDREN) if workers > 1 else None,
+        # 단계별 합계는 워커 시간의 합이라 병렬 실행에서는 경과 시간보다 클 수 있음
+        'stage_total_ms': {stage: round(value, 1) for stage, value in stage_totals.items()},
+        'stage_avg_ms': {stage: round(value / len(processed), 2) if processed else None
+                         for stage, value in stage_totals.items()},
+        'batch_stats': result['batch_stats']
+    }
+
+
+def run_in_subprocess(source_folder, workers, batch_size, compact, rss_budget_mb):
+    command = [sys.executable, os.path.abspath(__file__), source_folder, '--single',
+               '--workers', str(workers), '--batch-sizes', str(batch_size),
+               '--rss-budget-mb', str(rss_budget_mb)]
+    if compact:
+        command.append('--compact')
+    completed = subprocess.run(command, capture_output=True, text=True, check=True)
+    # 결과 JSON은 마지막 줄 (PyMuPDF 경고 등이 먼저 출력될 수 있음)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='마스킹 처리량 벤치마크')
+    parser.add_argument('source_folder', nargs='?', help='원본 PDF 폴더 (없으면 합성 PDF 생성)')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[10, 50])
+    parser.add_argument('--generate', type=int, default=40, help='합성 PDF 파일 수')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--compact', action='store_true', help='compact 출력 모드로 측정')
+    parser.add_argument('--rss-budget-mb', type=int, default=1024)
+    parser.add_argument('--output', help='결과 JSON 저장 경로 (없으면 stdout)')
+    parser.add_argument('--single', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(run_single(args.source_folder, args.workers[0], args.batch_sizes[0],
+                                    args.compact, args.rss_budget_mb)))
+        return
+
+    corpus_folder = None
+    source_folder = args.source_folder
+    if not source_folder:
+        from synthetic_corpus import generate_corpus
+        corpus_folder = source_folder = tempfile.mkdtemp(prefix='masking-corpus-')
+        generate_corpus(source_folder, args.generate, args.seed)
+
+    try:
+        runs = [
+            run_in_subprocess(source_folder, workers, batch_size, args.compact, args.rss_budget_mb)
+            for workers in args.workers
+            for batch_size in args.batch_sizes
+        ]
+    finally:
+        if corpus_folder:
+            shutil.rmtree(corpus_folder, ignore_errors=True)
+
+    report = json.dumps({
+        'source_folder': args.source_folder or f'synthetic (count={args.generate}, seed={args.seed})',
+        'runs': runs
+    }, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(report)
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
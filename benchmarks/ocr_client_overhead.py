@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+OCR 요청당 준비 비용 비교 - 시도마다 모델/요청을 새로 만들던 방식과 VertexOCRClient 재사용
+
+사용법:
+    python benchmarks/ocr_client_overhead.py [마스킹 폴더] [--attempts 3] [--repeat 20] [--generate 10]
+                                             [--live N] [--output result.json]
+
+기존 방식 (legacy): 시도마다 GenerativeModel 생성 + 파일 다시 읽기 + 사용하지 않는 base64 인코딩 + Part 생성
+재사용 방식 (client): 모델 하나를 재사용하고 문서당 한 번 읽은 바이트로 Part 를 한 번만 만듦
+문서 하나를 attempts 번 시도한다고 보고 문서당 시간(ms)과 tracemalloc 최대 할당량(KB)을 비교함.
+--live N 을 주면 count_tokens 호출(생성 없음) N 번으로 새 모델/재사용 모델의 왕복 지연도 측정
+(GOOGLE_CLOUD_PROJECT 등 Vertex AI 환경 변수 필요)
+폴더를 지정하지 않으면 synthetic_corpus 로 합성 PDF를 임시 폴더에 만들어 사용함. 결과는 JSON으로 출력
+"""
+import os
+import sys
+import json
+import time
+import base64
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+
+import vertexai
+from vertexai.generative_models import GenerativeModel, Part
+
+from ocr_client import OCR_MODEL_NAME, VertexOCRClient, read_document
+
+PROMPT = "이 문서의 내용을 JSON 배열로 추출하세요."
+MIME_TYPE = 'application/pdf'
+
+
+def legacy_document(file_path, attempts):
+    """기존 extract_data_with_vertex_ai 의 시도별 준비 과정 (요청 전송 제외)"""
+    for _ in range(attempts):
+        model = GenerativeModel(OCR_MODEL_NAME)
+        with open(file_path, 'rb') as f:
+            file_data = f.read()
+        pdf_data = base64.b64encode(file_data).decode('utf-8')  # 기존 코드에서 사용되지 않던 인코딩
+        contents = [Part.from_data(data=file_data, mime_type=MIME_TYPE), PROMPT]
+    return model, pdf_data, contents
+
+
+def client_document(client, file_path, attempts):
+    """VertexOCRClient 재사용 - 바이트/요청 내용은 문서당 한 번만 준비 (시도 수와 무관)"""
+    contents = client.build_contents(read_document(file_path), MIME_TYPE, PROMPT)
+    return client, contents
+
+
+def measure(function, file_paths, repeat):
+    """파일 목록을 repeat 번 처리한 문서당 평균 시간(ms)과 최대 추가 할당량(KB)"""
+    elapsed = 0.0
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        for file_path in file_paths:
+            function(file_path)
+        elapsed += time.perf_counter() - start_time
+
+    # 시간 측정과 분리해서 할당량만 따로 측정 (tracemalloc 자체 오버헤드 제외)
+    peak = 0
+    for file_path in file_paths:
+        tracemalloc.start()
+        function(file_path)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    documents = len(file_paths) * repeat
+    return {
+        'ms_per_document': round(elapsed * 1000 / documents, 3),
+        'peak_alloc_kb': round(peak / 1024, 1)
+    }
+
+
+def measure_live(file_path, requests):
+    """count_tokens 왕복 지연 (ms) - 요청마다 새 모델 vs 모델 하나 재사용"""
+    contents = VertexOCRClient.build_contents(read_document(file_path), MIME_TYPE, PROMPT)
+
+    def latencies(get_model):
+        values = []
+        for _ in range(requests):
+            start_time = time.perf_counter()
+            get_model().count_tokens(contents)
+            values.append((time.perf_counter() - start_time) * 1000)
+        return {
+            'first_ms': round(values[0], 1),
+            'avg_ms': round(sum(values) / len(values), 1),
+            'avg_after_first_ms': round(sum(values[1:]) / (len(values) - 1), 1) if len(values) > 1 else None
+        }
+
+    client = VertexOCRClient()
+    return {
+        'legacy_new_model_per_request': latencies(lambda: GenerativeModel(OCR_MODEL_NAME)),
+        'client_reused_model': latencies(lambda: client.model)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='OCR 요청당 준비 비용 벤치마크')
+    parser.add_argument('source_folder', nargs='?', help='마스킹된 PDF 폴더 (없으면 합성 PDF 생성)')
+    parser.add_argument('--attempts', type=int, default=3, help='문서당 시도 수 (기존 재시도 횟수)')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--generate', type=int, default=10, help='합성 PDF 파일 수')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--live', type=int, default=0, help='count_tokens 왕복 측정 횟수 (0이면 생략)')
+    parser.add_argument('--output', help='결과 JSON 저장 경로 (없으면 stdout)')
+    args = parser.parse_args()
+
+    # 모델 객체 생성에 필요한 기본 설정 (--live 가 아니면 요청은 보내지 않음)
+    vertexai.init(project=os.getenv('GOOGLE_CLOUD_PROJECT', 'benchmark'),
+                  location=os.getenv('GOOGLE_CLOUD_LOCATION', 'us-central1'))
+
+    corpus_folder = None
+    source_folder = args.source_folder
+    if not source_folder:
+        from synthetic_corpus import generate_corpus
+        corpus_folder = source_folder = tempfile.mkdtemp(prefix='ocr-client-corpus-')
+        generate_corpus(source_folder, args.generate, args.seed)
+
+    try:
+        file_paths = [os.path.join(source_folder, filename) for filename in sorted(os.listdir(source_folder))
+                      if filename.lower().endswith('.pdf')]
+        client = VertexOCRClient()
+        results = {
+            'documents': len(file_paths),
+            'avg_document_kb': round(sum(os.path.getsize(path) for path in file_paths) / len(file_paths) / 1024, 1),
+            'attempts_per_document': args.attempts,
+            'legacy': measure(lambda path: legacy_document(path, args.attempts), file_paths, args.repeat),
+            'client': measure(lambda path: client_document(client, path, args.attempts), file_paths, args.repeat)
+        }
+        if args.live:
+            results['live_count_tokens'] = measure_live(file_paths[0], args.live)
+    finally:
+        if corpus_folder:
+            shutil.rmtree(corpus_folder, ignore_errors=True)
+
+    report = json.dumps({
+        'source_folder': args.source_folder or f'synthetic (count={args.generate}, seed={args.seed})',
+        'results': results
+    }, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(report)
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
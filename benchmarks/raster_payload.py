@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+벡터 마스킹 출력과 흑백 래스터 출력의 OCR 요청 크기/지연시간/추출 정확도 비교
+
+사용법:
+    python benchmarks/raster_payload.py [원본 폴더] [--limit N] [--dpi 100 150] [--formats jpeg image-pdf] [--no-ocr]
+
+각 원본 PDF를 메모리에서 출력 형식별로 마스킹한 뒤 Vertex AI로 OCR 해서
+벡터(pdf) 결과를 기준으로 필드 일치율을 계산함. --no-ocr 이면 요청 크기만 비교
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import importlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_processor import PDFProcessor, mask_source
+
+MIME_BY_FORMAT = {
+    'pdf': 'application/pdf',
+    'image-pdf': 'application/pdf',
+    'png': 'image/png',
+    'jpeg': 'image/jpeg',
+}
+
+
+def field_agreement(baseline_rows, rows, fields):
+    """기준(벡터) 결과 대비 필드 값 일치율 (행 순서대로 비교, 행 수 차이는 불일치로 계산)"""
+    total = max(len(baseline_rows), len(rows)) * len(fields)
+    if total == 0:
+        return 1.0
+    matched = 0
+    for baseline, row in zip(baseline_rows, rows):
+        for field in fields:
+            if str(baseline.get(field, '')).strip() == str(row.get(field, '')).strip():
+                matched += 1
+    return matched / total
+
+
+def main():
+    parser = argparse.ArgumentParser(description='래스터 마스킹 출력 OCR 비교 벤치마크')
+    parser.add_argument('source_folder', nargs='?', default='pdfs')
+    parser.add_argument('--limit', type=int, default=10, help='비교할 최대 파일 수')
+    parser.add_argument('--dpi', type=int, nargs='+', default=[100, 150])
+    parser.add_argument('--formats', nargs='+', default=['jpeg', 'image-pdf'],
+                        choices=['png', 'jpeg', 'image-pdf'])
+    parser.add_argument('--no-ocr', action='store_true', help='OCR 호출 없이 요청 크기만 비교')
+    args = parser.parse_args()
+
+    processor = PDFProcessor(args.source_folder, 'masked-pdfs')
+    pdf_files = processor.list_source_pdfs()[:args.limit]
+
+    variants = [('pdf', None)] + [(fmt, dpi) for fmt in args.formats for dpi in args.dpi]
+
+    ocr = None
+    if not args.no_ocr:
+        import vertexai
+        ocr = importlib.import_module('gemini-pdf-ocr-genai')
+        vertexai.init(project=ocr.PROJECT_ID, location=ocr.LOCATION)
+        client = ocr.VertexOCRClient()
+
+    results = {f"{fmt}@{dpi}" if dpi else fmt: {'bytes': [], 'latency_s': [], 'agreement': [], 'errors': 0}
+               for fmt, dpi in variants}
+
+    for index, filename in enumerate(pdf_files, 1):
+        input_path = os.path.join(args.source_folder, filename)
+        baseline_rows = None
+
+        for fmt, dpi in variants:
+            key = f"{fmt}@{dpi}" if dpi else fmt
+            output_options = {}
+            if fmt != 'pdf':
+                output_options.update({'output_format': fmt, 'raster_dpi': dpi})
+
+            data = mask_source(input_path, processor.default_masking_areas, output_options)['data']
+            if data is None:
+                results[key]['errors'] += 1
+                continue
+            results[key]['bytes'].append(len(data))
+
+            if ocr is None:
+                continue
+
+            start_time = time.perf_counter()
+            try:
+                rows = ocr.extract_data_with_vertex_ai(client, filename, ocr.GEMINI_PROMPT, index, len(pdf_files),
+                                                       data, MIME_BY_FORMAT[fmt])
+            except Exception:
+                results[key]['errors'] += 1
+                continue
+            results[key]['latency_s'].append(time.perf_counter() - start_time)
+
+            rows = [row for row in rows if isinstance(row, dict)]
+            if fmt == 'pdf':
+                baseline_rows = rows
+            elif baseline_rows is not None:
+                results[key]['agreement'].append(field_agreement(baseline_rows, rows, ocr.EXTRACTION_FIELDS))
+
+    def average(values):
+        return round(sum(values) / len(values), 4) if values else None
+
+    summary = {
+        key: {
+            'files': len(stats['bytes']),
+            'avg_bytes': average(stats['bytes']),
+            'avg_latency_s': average(stats['latency_s']),
+            'field_agreement_vs_pdf': average(stats['agreement']),
+            'errors': stats['errors']
+        }
+        for key, stats in results.items()
+    }
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+마스킹 벤치마크용 합성 고지서 PDF 생성기
+
+사용법:
+    python benchmarks/synthetic_corpus.py [출력 폴더] [--count N] [--seed S]
+
+실제 고지서 첫 페이지처럼 성명/생년월일/사업자 등록번호 라벨과 수입금액 표를 그린
+PDF를 만들고, 파일마다 페이지 수, 텍스트/스캔 이미지 페이지 여부, 목표 크기
+(50KB ~ 20MB)를 바꿔가며 생성함. 생성 결과는 corpus.json 에 기록됨
+"""
+import os
+import sys
+import json
+import random
+import argparse
+
+import fitz  # PyMuPDF
+
+# (이름, 페이지 수 범위, 스캔 이미지 페이지 여부, 목표 크기 범위 바이트)
+CORPUS_PROFILES = [
+    ('text-small', (1, 2), False, (50 * 1024, 200 * 1024)),
+    ('text-long', (20, 60), False, (200 * 1024, 2 * 1024 * 1024)),
+    ('scan-small', (1, 2), True, (300 * 1024, 2 * 1024 * 1024)),
+    ('scan-large', (5, 30), True, (5 * 1024 * 1024, 20 * 1024 * 1024)),
+]
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 (pt)
+
+
+def draw_notice_text(page, rng, page_number):
+    """고지서 양식 텍스트 - 첫 페이지는 마스킹 대상 라벨 위치를 기본 좌표에 맞춤"""
+    page.insert_text((60, 80), '종합소득세 신고 안내', fontname='korea', fontsize=16)
+    if page_number == 0:
+        page.insert_text((140, 132), '성명', fontname='korea', fontsize=10)
+        page.insert_text((190, 132), '홍길동', fontname='korea', fontsize=10)
+        page.insert_text((370, 132), '생년월일', fontname='korea', fontsize=10)
+        page.insert_text((430, 132), '1980.01.01', fontname='korea', fontsize=10)
+        page.insert_text((60, 248), '사업자 등록번호', fontname='korea', fontsize=10)
+        for row in range(6):
+            page.insert_text((60, 268 + row * 15), f'{rng.randint(100, 999)}-{rng.randint(10, 99)}-'
+                                                   f'{rng.randint(10000, 99999)}', fontname='korea', fontsize=9)
+    page.insert_text((60, 400), '사업장별 수입금액', fontname='korea', fontsize=11)
+    for row in range(25):
+        page.insert_text((60, 420 + row * 15),
+                         f'{rng.randint(100000, 999999)}  {rng.choice(["X", "O"])}  '
+                         f'{rng.randint(1, 99999999):,}', fontname='korea', fontsize=9)
+
+
+def noise_image(rng, width, height):
+    """압축이 잘 되지 않는 스캔 이미지 대용 (그레이스케일 노이즈)"""
+    samples = rng.randbytes(width * height)
+    return fitz.Pixmap(fitz.csGRAY, width, height, samples, False)
+
+
+def build_pdf(rng, pages, scanned, target_size):
+    """프로필 하나에 맞는 PDF 바이트 생성"""
+    doc = fitz.open()
+    # 스캔 페이지는 노이즈 이미지로 목표 크기를 채움 (이미지 바이트 ≈ 폭 × 높이)
+    image_bytes = max(target_size // pages, 16 * 1024) if scanned else 0
+    for page_number in range(pages):
+        page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        if scanned:
+            width = int((image_bytes * PAGE_WIDTH / PAGE_HEIGHT) ** 0.5)
+            height = max(image_bytes // max(width, 1), 1)
+            page.insert_image(page.rect, pixmap=noise_image(rng, width, height))
+        # 스캔 페이지에도 텍스트 레이어를 넣음 (OCR 된 스캔본과 같은 구조)
+        draw_notice_text(page, rng, page_number)
+
+    data = doc.tobytes(deflate=True)
+    if not scanned and len(data) < target_size:
+        # 텍스트 전용 PDF는 압축되지 않는 첨부 스트림으로 목표 크기까지 채움
+        doc.embfile_add('padding.bin', rng.randbytes(target_size - len(data)))
+        data = doc.tobytes(deflate=True)
+    doc.close()
+    return data
+
+
+def generate_corpus(output_folder, count=40, seed=0, profiles=None):
+    """합성 PDF를 output_folder 에 생성하고 파일별 정보 목록 반환 (같은 seed 면 같은 결과)"""
+    rng = random.Random(seed)
+    profiles = profiles or CORPUS_PROFILES
+    os.makedirs(output_folder, exist_ok=True)
+
+    files = []
+    for number in range(1, count + 1):
+        name, page_range, scanned, size_range = profiles[(number - 1) % len(profiles)]
+        pages = rng.randint(*page_range)
+        target_size = rng.randint(*size_range)
+        data = build_pdf(rng, pages, scanned, target_size)
+
+        filename = f'{number}.pdf'
+        with open(os.path.join(output_folder, filename), 'wb') as f:
+            f.write(data)
+        files.append({'filename': filename, 'profile': name, 'pages': pages, 'scanned': scanned,
+                      'size': len(data)})
+
+    with open(os.path.join(output_folder, 'corpus.json'), 'w', encoding='utf-8') as f:
+        json.dump({'seed': seed, 'files': files}, f, ensure_ascii=False, indent=2)
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description='마스킹 벤치마크용 합성 PDF 생성')
+    parser.add_argument('output_folder', nargs='?', default='benchmarks/corpus')
+    parser.add_argument('--count', type=int, default=40, help='생성할 파일 수')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    files = generate_corpus(args.output_folder, args.count, args.seed)
+    total = sum(item['size'] for item in files)
+    print(f'{len(files)}개 파일 생성 ({total / 1024 / 1024:.1f}MB): {args.output_folder}', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+import os
+import json
+import time
+import base64
+import bisect
+import threading
+
+
+class FolderIndex:
+    """os.scandir 기반 폴더 인덱스 - 폴더 mtime이 바뀐 경우에만 다시 스캔
+
+    파일 추가/삭제/이름 변경은 폴더 mtime을 바꾸므로 평소에는 stat 한 번으로
+    캐시를 그대로 쓰고, 폴더가 바뀌었거나 max_age 초가 지나면 이름/inode 만 다시 읽어
+    새로 생기거나 교체된 파일만 stat 함 (큰 폴더에서도 업로드 한 번에 파일 하나만 stat).
+    같은 파일을 제자리에서 덮어쓴 크기 변화는 force=True 전체 재스캔(마스킹 실행 시작 등)에서 반영.
+    정렬 결과는 인덱스가 바뀔 때까지 재사용
+    """
+
+    SORT_FIELDS = ('name', 'size', 'mtime')
+
+    def __init__(self, folder, file_filter, name_sort_key=None, max_age=30.0):
+        self.folder = folder
+        self.file_filter = file_filter
+        self.name_sort_key = name_sort_key or (lambda filename: filename)
+        self.max_age = max_age
+
+        self.entries = {}  # filename → {'filename', 'size', 'mtime', 'inode'}
+        self.total_size = 0
+        self.exists = False
+        self.version = 0  # 내용이 바뀔 때마다 증가 (캐시 키 용도)
+
+        self._dir_mtime_ns = None
+        self._scanned_at = 0.0
+        self._sorted = {}  # sort field → (keys, entries)
+        self._lock = threading.Lock()
+
+    def refresh(self, force=False):
+        """폴더가 바뀌었으면 바뀐 항목만 갱신 (바뀌지 않았으면 stat 한 번으로 끝, force=True 이면 전체 재스캔)"""
+        with self._lock:
+            try:
+                dir_mtime_ns = os.stat(self.folder).st_mtime_ns
+            except FileNotFoundError:
+                if self.exists or self.entries:
+                    self._replace_entries({}, None, False)
+                return
+
+            is_fresh = (
+                not force
+                and self.exists
+                and dir_mtime_ns == self._dir_mtime_ns
+                and time.monotonic() - self._scanned_at < self.max_age
+            )
+            if is_fresh:
+                return
+
+            full_scan = force or not self.exists
+            entries = {}
+            with os.scandir(self.folder) as iterator:
+                for entry in iterator:
+                    if not self.file_filter(entry.name):
+                        continue
+                    # 이름과 inode 가 그대로인 항목은 stat 없이 재사용 (inode 는 디렉터리 항목에서 바로 얻음)
+                    previous = None if full_scan else self.entries.get(entry.name)
+                    if previous is not None and previous['inode'] == entry.inode():
+                        entries[entry.name] = previous
+                        continue
+                    if not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                    entries[entry.name] = {
+                        'filename': entry.name,
+                        'size': stat.st_size,
+                        'mtime': stat.st_mtime,
+                        'inode': stat.st_ino
+                    }
+            self._replace_entries(entries, dir_mtime_ns, True)
+
+    def _replace_entries(self, entries, dir_mtime_ns, exists):
+        """스캔 결과 반영 - 실제로 달라졌을 때만 정렬 캐시 무효화"""
+        self._dir_mtime_ns = dir_mtime_ns
+        self._scanned_at = time.monotonic()
+        if entries == self.entries and exists == self.exists:
+            return
+        self.entries = entries
+        self.exists = exists
+        self.total_size = sum(entry['size'] for entry in entries.values())
+        self.version += 1
+        self._sorted = {}
+
+    def stats(self):
+        """캐시된 파일 수/총 크기 (/health 용)"""
+        self.refresh()
+        return {'exists': self.exists, 'count': len(self.entries), 'total_size': self.total_size}
+
+    def _sort_key(self, sort, entry):
+        name_key = self.name_sort_key(entry['filename'])
+        if sort == 'size':
+            return (entry['size'], name_key)
+        if sort == 'mtime':
+            return (entry['mtime'], name_key)
+        return (name_key,)
+
+    def _sorted_entries(self, sort):
+        if sort not in self._sorted:
+            ordered = sorted(self.entries.values(), key=lambda entry: self._sort_key(sort, entry))
+            keys = [self._sort_key(sort, entry) for entry in ordered]
+            self._sorted[sort] = (keys, ordered)
+        return self._sorted[sort]
+
+    @staticmethod
+    def _encode_cursor(key):
+        return base64.urlsafe_b64encode(json.dumps(key, ensure_ascii=False).encode('utf-8')).decode('ascii')
+
+    @staticmethod
+    def _decode_cursor(cursor):
+        def to_tuple(value):
+            return tuple(to_tuple(item) for item in value) if isinstance(value, list) else value
+        try:
+            return to_tuple(json.loads(base64.urlsafe_b64decode(cursor.encode('ascii'))))
+        except (ValueError, TypeError):
+            raise ValueError('잘못된 커서입니다.')
+
+    def page(self, cursor=None, limit=None, sort='name', order='asc'):
+        """정렬된 파일 목록의 한 페이지 반환 (커서는 마지막 항목의 정렬 키)
+
+        커서 기반이라 페이지를 넘기는 사이에 파일이 추가/삭제되어도
+        이미 본 항목이 중복되거나 건너뛰어지지 않음. limit=None 이면 전체 반환
+        """
+        if sort not in self.SORT_FIELDS:
+            raise ValueError(f"지원하지 않는 정렬 기준입니다: {sort}")
+        if order not in ('asc', 'desc'):
+            raise ValueError(f"지원하지 않는 정렬 순서입니다: {order}")
+
+        self.refresh()
+        with self._lock:
+            keys, ordered = self._sorted_entries(sort)
+
+            if order == 'asc':
+                start = bisect.bisect_right(keys, self._decode_cursor(cursor)) if cursor else 0
+                end = len(ordered) if limit is None else min(start + limit, len(ordered))
+                page_entries = ordered[start:end]
+                has_more = end < len(ordered)
+            else:
+                end = bisect.bisect_left(keys, self._decode_cursor(cursor)) if cursor else len(ordered)
+                start = 0 if limit is None else max(end - limit, 0)
+                page_entries = ordered[start:end][::-1]
+                has_more = start > 0
+
+            next_cursor = None
+            if has_more and page_entries:
+                next_cursor = self._encode_cursor(self._sort_key(sort, page_entries[-1]))
+
+            return {
+                'files': [{'filename': entry['filename'], 'size': entry['size']} for entry in page_entries],
+                'count': len(ordered),
+                'total_size': self.total_size,
+                'next_cursor': next_cursor
+            }
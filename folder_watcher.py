@@ -0,0 +1,187 @@
+import os
+import time
+import threading
+
+try:
+    # 선택 - 있으면 inotify(Linux) / FSEvents / ReadDirectoryChangesW 이벤트로 감시
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+
+# 크기/수정 시각이 이 시간(초) 동안 그대로여야 복사/업로드가 끝난 것으로 봄
+STABLE_SECONDS = 2.0
+# 폴링 주기, 이벤트 모드에서는 후보 파일의 안정 여부를 확인하는 주기
+POLL_INTERVAL = 1.0
+# 이벤트 모드에서도 놓친 이벤트가 없도록 가끔 폴더 전체를 다시 스캔
+RESCAN_INTERVAL = 60.0
+
+
+class _ChangeHandler(FileSystemEventHandler):
+    """watchdog 이벤트를 FolderWatcher 후보 목록으로 전달"""
+
+    def __init__(self, watcher):
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        if event.is_directory:
+            return
+        for path in (getattr(event, 'src_path', None), getattr(event, 'dest_path', None)):
+            if path:
+                self.watcher.notify(os.path.basename(path))
+
+
+class FolderWatcher:
+    """폴더에 새로 생기거나 바뀐 파일을 안정된 뒤에 하나씩 넘겨주는 감시기
+
+    watchdog 이 설치되어 있으면 파일 이벤트로 후보를 받고, 없거나 시작에 실패하면
+    POLL_INTERVAL 마다 os.scandir 로 폴더를 비교함. 어느 쪽이든 후보 파일은
+    (크기, 수정 시각)이 stable_seconds 동안 바뀌지 않아야 take_ready 로 나감.
+    시작 시점에 이미 있던 파일은 기준으로 삼고 넘기지 않음 (이후 내용이 바뀌면 다시 넘김)
+    """
+
+    def __init__(self, folder, file_filter, name_sort_key=None, stable_seconds=STABLE_SECONDS,
+                 poll_interval=POLL_INTERVAL, use_events=True):
+        self.folder = folder
+        self.file_filter = file_filter
+        self.name_sort_key = name_sort_key or (lambda filename: filename)
+        self.stable_seconds = stable_seconds
+        self.poll_interval = poll_interval
+        self.use_events = use_events and Observer is not None
+        self.mode = None  # 'events' | 'polling' (start 이후)
+
+        self._known = {}       # 넘겨준(또는 시작 시 있던) 파일 → (size, mtime_ns)
+        self._candidates = {}  # 안정 대기 중인 파일 → {'signature', 'changed_at', 'detected_at'}
+        self._dirty = set()    # 이벤트로 들어온, 아직 확인하지 않은 파일명
+        self._observer = None
+        self._rescanned_at = 0.0
+        self._changed = threading.Event()
+        self._lock = threading.Lock()
+
+    def _signature(self, filename):
+        try:
+            stat = os.stat(os.path.join(self.folder, filename))
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        return (stat.st_size, stat.st_mtime_ns)
+
+    def _scan(self):
+        """폴더 전체의 {파일명: (size, mtime_ns)}"""
+        signatures = {}
+        with os.scandir(self.folder) as iterator:
+            for entry in iterator:
+                if entry.is_file() and self.file_filter(entry.name):
+                    stat = entry.stat()
+                    signatures[entry.name] = (stat.st_size, stat.st_mtime_ns)
+        return signatures
+
+    def start(self):
+        """현재 폴더 상태를 기준으로 감시 시작"""
+        os.makedirs(self.folder, exist_ok=True)
+        with self._lock:
+            self._known = self._scan()
+            self._rescanned_at = time.monotonic()
+
+        self.mode = 'polling'
+        if self.use_events:
+            try:
+                observer = Observer()
+                observer.schedule(_ChangeHandler(self), self.folder, recursive=False)
+                observer.start()
+            except OSError:
+                # inotify 감시 개수 한도 초과 등 - 폴링으로 대체
+                pass
+            else:
+                self._observer = observer
+                self.mode = 'events'
+        return self
+
+    def stop(self):
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+        self._changed.set()
+
+    def notify(self, filename):
+        """파일 이벤트 수신 (watchdog 스레드에서 호출)"""
+        if not self.file_filter(filename):
+            return
+        with self._lock:
+            self._dirty.add(filename)
+        self._changed.set()
+
+    def _observe(self, filename, signature, now):
+        """관찰한 상태를 후보 목록에 반영 (호출자가 _lock 보유)"""
+        if signature is None or signature == self._known.get(filename):
+            self._candidates.pop(filename, None)
+            return
+        candidate = self._candidates.get(filename)
+        if candidate is None:
+            self._candidates[filename] = {'signature': signature, 'changed_at': now, 'detected_at': now}
+        elif candidate['signature'] != signature:
+            # 아직 기록 중 - 안정 대기 시간을 다시 셈
+            candidate['signature'] = signature
+            candidate['changed_at'] = now
+
+    def _refresh(self):
+        now = time.monotonic()
+        full_scan = self.mode != 'events' or now - self._rescanned_at >= RESCAN_INTERVAL
+        signatures = self._scan() if full_scan else None
+
+        with self._lock:
+            if full_scan:
+                self._rescanned_at = now
+                self._dirty.clear()
+                for filename in set(signatures) | set(self._candidates):
+                    self._observe(filename, signatures.get(filename), now)
+                # 삭제된 파일은 기준에서 빼서 같은 이름으로 다시 들어오면 새 파일로 처리
+                for filename in set(self._known) - set(signatures):
+                    del self._known[filename]
+            else:
+                filenames = self._dirty | set(self._candidates)
+                self._dirty = set()
+                for filename in filenames:
+                    signature = self._signature(filename)
+                    if signature is None:
+                        self._known.pop(filename, None)
+                    self._observe(filename, signature, now)
+
+    def pending(self):
+        """안정 대기 중인 파일 수"""
+        with self._lock:
+            return len(self._candidates)
+
+    def take_ready(self, limit=None, timeout=None):
+        """안정된 파일을 정렬 순서대로 최대 limit 개 넘겨줌 (없으면 timeout 초까지 기다림)
+
+        반환값: [{'filename', 'size', 'detected_at': 처음 감지한 time.monotonic() 값}]
+        넘겨준 파일은 기준 상태로 기록되어, 내용이 다시 바뀌기 전에는 또 넘기지 않음
+        """
+        if limit is not None and limit <= 0:
+            return []
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            self._refresh()
+            now = time.monotonic()
+            with self._lock:
+                ready = sorted(
+                    (filename for filename, candidate in self._candidates.items()
+                     if now - candidate['changed_at'] >= self.stable_seconds),
+                    key=self.name_sort_key
+                )[:limit]
+                taken = []
+                for filename in ready:
+                    candidate = self._candidates.pop(filename)
+                    self._known[filename] = candidate['signature']
+                    taken.append({'filename': filename, 'size': candidate['signature'][0],
+                                  'detected_at': candidate['detected_at']})
+            if taken:
+                return taken
+
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return []
+            self._changed.clear()
+            self._changed.wait(self.poll_interval if remaining is None else min(self.poll_interval, remaining))
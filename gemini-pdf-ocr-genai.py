@@ -1,16 +1,32 @@
 # -*- coding: utf-8 -*-
 import os
-import re
 import json
+import asyncio
 import gspread
 from google.oauth2 import service_account
 import vertexai
-from vertexai.generative_models import GenerativeModel
 from dotenv import load_dotenv
 import sys
 import time
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime
 
+from batch_prediction import (BATCH_INPUT_NAME, LocalBatchSubmitter, VertexBatchSubmitter, iter_batch_results,
+                              write_batch_requests)
+from folder_watcher import FolderWatcher
+from json_stream import JsonArrayStreamParser, safe_extract_json
+from ocr_client import (OCR_MODEL_NAME, VertexOCRClient, build_response_schema, json_generation_config,
+                        read_document)
+from request_packing import (build_pack_instruction, document_delimiter, pack_generation_config,
+                             split_pack_response)
+from rate_limiter import RateLimiter, ResponseParseError, classify_error, estimate_request_tokens
+from response_cache import ResponseCache
+from pdf_processor import PDFProcessor, is_masked_output
+from local_extraction import (clean_currency, extract_rows_from_text_layer, normalize_extracted_rows,
+                              validate_extracted_rows)
+
 # UTF-8 인코딩 강제 설정
 if sys.platform.startswith('win'):
     import codecs
@@ -28,6 +44,60 @@ CREDENTIALS_PATH = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
 SERVICE_ACCOUNT_FILE = 'pdf-ocr.json'
 SPREADSHEET_NAME = 'pdf-ocr'
 PDF_FOLDER_PATH = './masked-pdfs/'
+SOURCE_PDF_FOLDER_PATH = './pdfs/'
+
+# --- 입력 모드 ---
+# disk: masked-pdfs 폴더의 파일을 읽어서 처리 (기본)
+# memory: pdfs 원본을 바로 마스킹해서 메모리의 바이트를 그대로 OCR 요청에 사용
+# watch: pdfs 폴더를 계속 감시하면서 새 원본이 들어오면 하나씩 마스킹 → OCR → 시트 업로드
+OCR_INPUT_MODE = os.getenv("OCR_INPUT_MODE", "disk")
+WRITE_MASKED_PDFS = os.getenv("OCR_WRITE_MASKED", "0") == "1"  # memory 모드에서 masked-pdfs에도 기록할지 여부
+MASK_COMPACT_OUTPUT = os.getenv("MASK_COMPACT_OUTPUT", "0") == "1"
+MASKING_STRATEGY = os.getenv("MASKING_STRATEGY", "fixed")
+MASKED_OUTPUT_FORMAT = os.getenv("MASKED_OUTPUT_FORMAT", "pdf")
+RASTER_DPI = int(os.getenv("RASTER_DPI", "150"))
+PAGE_SELECTION = os.getenv("PAGE_SELECTION", "first")  # target: 사업소득 표가 이어지는 페이지까지 함께 전송
+# 텍스트 레이어가 있는 PDF는 먼저 로컬에서 추출하고 검증에 실패한 경우만 Vertex AI 호출
+LOCAL_EXTRACTION = os.getenv("LOCAL_EXTRACTION", "1") == "1"
+# Vertex AI 동시 요청 수 (1이면 기존처럼 한 파일씩 처리)
+OCR_CONCURRENCY = max(1, int(os.getenv("OCR_CONCURRENCY", "8")))
+# 모든 작업자가 함께 쓰는 분당 요청 수 / 분당 토큰 수 한도 (0이면 제한 없음)
+OCR_REQUESTS_PER_MINUTE = int(os.getenv("OCR_REQUESTS_PER_MINUTE", "60"))
+OCR_TOKENS_PER_MINUTE = int(os.getenv("OCR_TOKENS_PER_MINUTE", "0"))
+# EXTRACTION_FIELDS 로 만든 응답 스키마로 JSON 출력을 강제 (0이면 기존처럼 자유 형식 응답에서 JSON 을 찾음)
+OCR_RESPONSE_SCHEMA = os.getenv("OCR_RESPONSE_SCHEMA", "1") == "1"
+# 고정 프롬프트(GEMINI_PROMPT)를 Vertex AI 컨텍스트 캐시로 한 번 등록하고 요청마다 문서만 전송 (0이면 매번 전체 전송)
+# BASELINE_EVERY 번째 요청마다 프롬프트 전체를 보내 캐시 유무별 지연을 비교 (0이면 비교 안 함)
+OCR_PROMPT_CACHE = os.getenv("OCR_PROMPT_CACHE", "1") == "1"
+OCR_PROMPT_CACHE_TTL_MINUTES = int(os.getenv("OCR_PROMPT_CACHE_TTL_MINUTES", "60"))
+OCR_PROMPT_CACHE_BASELINE_EVERY = int(os.getenv("OCR_PROMPT_CACHE_BASELINE_EVERY", "20"))
+# 응답을 스트리밍으로 받아 배열 항목이 닫히는 대로 검증/시트 행 변환 (0이면 응답 전체를 받은 뒤 처리)
+OCR_STREAMING = os.getenv("OCR_STREAMING", "1") == "1"
+# 작은 마스킹 문서 여러 개를 한 요청에 묶어 보낼 문서 수 (1이면 문서마다 요청, 4~10 권장)
+# 묶음이 다 차지 않아도 첫 문서가 들어온 뒤 이 시간(초)이 지나면 보냄
+OCR_PACK_SIZE = max(1, int(os.getenv("OCR_PACK_SIZE", "1")))
+OCR_PACK_WAIT_SECONDS = float(os.getenv("OCR_PACK_WAIT_SECONDS", "0.5"))
+# Vertex AI 응답 디스크 캐시 (문서 해시 + 프롬프트 해시 + 모델이 같으면 재실행 시 API 호출 생략)
+# 크기 한도(MB)를 넘으면 오래 사용하지 않은 응답부터 삭제, 0이면 캐시 사용 안 함
+OCR_RESPONSE_CACHE_PATH = os.getenv("OCR_RESPONSE_CACHE_PATH", "./ocr-cache/responses.sqlite3")
+OCR_RESPONSE_CACHE_MB = float(os.getenv("OCR_RESPONSE_CACHE_MB", "256"))
+# 배치 예측 모드 (급하지 않은 대량 처리용): vertex - Vertex AI 배치 예측, local - 로컬 응답 파일로 대체 (테스트용)
+# 비어 있으면 파일마다 온라인 요청
+OCR_BATCH_MODE = os.getenv("OCR_BATCH_MODE", "")
+OCR_BATCH_GCS_PREFIX = os.getenv("OCR_BATCH_GCS_PREFIX", "")  # 예: gs://bucket/pdf-ocr-batch
+OCR_BATCH_LOCAL_RESPONSES = os.getenv("OCR_BATCH_LOCAL_RESPONSES", "./batch-responses/")  # local: <파일 번호>.txt
+OCR_BATCH_FOLDER = os.getenv("OCR_BATCH_FOLDER", "./batch-jobs/")  # 작업별 입력/결과 JSONL 보관
+# 감시 모드: 크기/수정 시각이 이 시간(초) 동안 그대로인 파일만 처리, Vertex AI 동시 요청 수 상한
+WATCH_STABLE_SECONDS = float(os.getenv("WATCH_STABLE_SECONDS", "2"))
+WATCH_POLL_INTERVAL = float(os.getenv("WATCH_POLL_INTERVAL", "1"))
+WATCH_MAX_IN_FLIGHT = int(os.getenv("WATCH_MAX_IN_FLIGHT", "4"))
+
+# 마스킹 결과 확장자별 MIME 타입 (래스터 출력 모드는 이미지로 전송)
+MIME_TYPES = {
+    '.pdf': 'application/pdf',
+    '.png': 'image/png',
+    '.jpg': 'image/jpeg',
+}
 
 # --- 추출 필드 및 프롬프트 ---
 EXTRACTION_FIELDS = [
@@ -91,6 +161,13 @@ currency_fields = [
     "소기업소상공인공제부금 (노란우산공제)", "퇴직연금세액공제", "연금계좌세액공제", "수입금액"
 ]
 
+# 스트리밍 응답 통계 (요청 시작부터 첫 행 / 응답 끝까지 걸린 시간)
+streaming_stats = {'responses': 0, 'first_row_seconds': 0.0, 'complete_seconds': 0.0}
+streaming_stats_lock = threading.Lock()
+
+# 묶음 요청 통계 (보낸 묶음 수, 묶음으로 처리한 문서 수, 묶음에서 결과를 못 받아 개별 요청한 문서 수)
+packing_stats = {'packs': 0, 'packed_documents': 0, 'reissued_documents': 0}
+
 # --- 로그 출력 함수 (실시간 업데이트용) ---
 def log_progress(message, flush=True):
     """진행상황을 실시간으로 출력"""
@@ -101,108 +178,221 @@ def log_progress(message, flush=True):
         sys.stdout.flush()
 
 # --- 유틸리티 함수 ---
-def clean_currency(value: str) -> str:
-    if not isinstance(value, str): return "0"
-    if value.strip() in ["", "없음", "N/A"]: return "0"
-    cleaned = re.sub(r"[^\d]", "", value)
-    return cleaned if cleaned else "0"
-
-def safe_extract_json(text):
+async def extract_data_with_vertex_ai_async(client: VertexOCRClient, file_path: str, prompt: str, file_number: int,
+                                            total_files: int, file_data: bytes = None,
+                                            mime_type: str = "application/pdf", blocking: bool = False,
+                                            on_row=None):
     """
-    텍스트에서 JSON 배열을 안전하게 추출하는 함수
-    """
-    # 여러 패턴으로 JSON 찾기 시도
-    patterns = [
-        r'\[[\s\S]*?\]',  # JSON 배열 (가장 우선)
-        r'```json\s*([\s\S]*?)\s*```',  # 마크다운 JSON 블록
-        r'```\s*([\s\S]*?)\s*```',  # 일반 마크다운 블록
-        r'\{[\s\S]*?\}',  # JSON 객체 (단일)
-    ]
-    
-    for pattern in patterns:
-        matches = re.findall(pattern, text, re.DOTALL)
-        for match in matches:
-            try:
-                # 마크다운 패턴의 경우
-                if '```' in pattern and isinstance(match, str):
-                    json_data = json.loads(match.strip())
-                else:
-                    json_data = json.loads(match)
-                
-                # 배열이 아닌 경우 배열로 변환
-                if isinstance(json_data, dict):
-                    return [json_data]
-                elif isinstance(json_data, list):
-                    return json_data
-                    
-            except json.JSONDecodeError:
-                continue
-    
-    return None
-
-def extract_data_with_vertex_ai(file_path: str, prompt: str, file_number: int, total_files: int):
-    """
-    Vertex AI를 직접 사용하여 PDF에서 데이터를 추출합니다.
+    Vertex AI를 직접 사용하여 PDF에서 데이터를 추출합니다 (generate_content_async - 다른 파일 요청과 동시 진행).
+    file_data 가 주어지면 (메모리 모드) 파일을 읽지 않고 그 바이트를 그대로 사용합니다.
+    모델(client)과 요청 내용은 한 번만 만들고 재시도에서는 요청만 다시 보냅니다.
+    client 에 응답 캐시가 있으면 같은 문서/프롬프트/모델의 저장된 응답을 요청 없이 사용합니다.
+    재시도 횟수와 대기 시간은 오류 종류별 정책(rate_limiter.RETRY_POLICIES)을 따릅니다.
+    blocking=True 이면 동기 API를 별도 스레드에서 호출합니다 (호출마다 이벤트 루프가 새로 생기는 동기 호출용).
+    OCR_STREAMING 이면 응답을 스트리밍으로 받으면서 배열 항목이 닫힐 때마다 on_row(순번, 항목)을 호출합니다
+    (미리 처리용 - 반환값은 항상 전체 응답을 해석한 결과).
     """
     log_progress(f"🔄 [{file_number}/{total_files}] '{os.path.basename(file_path)}' Vertex AI OCR 분석 시작...")
     
-    if not os.path.exists(file_path):
-        raise FileNotFoundError(f"❌ 오류: PDF 파일을 찾을 수 없습니다. 경로: {file_path}")
-
-    max_retries = 3
+    # 파일 읽기 (메모리 모드에서는 이미 받은 바이트 사용)
+    if file_data is None:
+        log_progress(f"📤 [{file_number}/{total_files}] '{os.path.basename(file_path)}' 파일 읽는 중...")
+    file_data = read_document(file_path, file_data)
+    
+    # 같은 문서/프롬프트/모델/생성 설정으로 받아 둔 응답이 있으면 Vertex AI 호출 생략
+    # (SQLite 조회와 문서 해싱은 이벤트 루프를 막지 않도록 작업자 스레드에서)
+    cache_key, extracted_data = await asyncio.to_thread(lookup_cached_response, client.response_cache, file_data,
+                                                        prompt, client.model_name, client.generation_config)
+    if extracted_data is not None:
+        log_progress(f"💾 [{file_number}/{total_files}] '{os.path.basename(file_path)}' 캐시된 응답 사용 ({len(extracted_data)}개 항목)")
+        return extracted_data
+    
+    # 프롬프트가 컨텍스트 캐시에 있으면 캐시 모델에 문서만 보냄
+    model, contents = client.prepare(file_data, mime_type, prompt)
+    estimated_tokens = estimate_request_tokens(file_data, mime_type, prompt)
     
-    for attempt in range(max_retries):
+    attempt = 0
+    while True:
+        attempt += 1
         try:
-            if max_retries > 1:
-                log_progress(f"🔄 [{file_number}/{total_files}] Vertex AI OCR 시도 {attempt + 1}/{max_retries}")
-            
-            # Vertex AI GenerativeModel 생성
-            model = GenerativeModel("gemini-2.5-flash")
-            
-            # 파일 읽기
-            log_progress(f"📤 [{file_number}/{total_files}] '{os.path.basename(file_path)}' 파일 읽는 중...")
-            
-            with open(file_path, 'rb') as f:
-                file_data = f.read()
+            log_progress(f"🔄 [{file_number}/{total_files}] Vertex AI OCR 시도 {attempt}")
             
-            # PDF를 base64로 인코딩
-            import base64
-            pdf_data = base64.b64encode(file_data).decode('utf-8')
-            
-            # Part 생성
-            from vertexai.generative_models import Part
-            pdf_part = Part.from_data(
-                data=file_data,
-                mime_type="application/pdf"
-            )
-            
-            # 콘텐츠 생성
+            # 콘텐츠 생성 (RPM/TPM 한도와 회로 차단기는 client 가 모든 작업자와 공유)
             log_progress(f"🧠 [{file_number}/{total_files}] '{os.path.basename(file_path)}' Vertex AI 분석 중...")
             
-            response = model.generate_content([pdf_part, prompt])
+            if OCR_STREAMING:
+                response_text = await stream_response_rows(client, contents, estimated_tokens, model, file_number,
+                                                           total_files, os.path.basename(file_path), blocking, on_row)
+            elif blocking:
+                response_text = (await asyncio.to_thread(client.generate, contents, estimated_tokens, model)).text
+            else:
+                response_text = (await client.generate_async(contents, estimated_tokens, model)).text
             
-            log_progress(f"📄 [{file_number}/{total_files}] '{os.path.basename(file_path)}' 응답 수신 완료 (길이: {len(response.text)} 문자)")
+            log_progress(f"📄 [{file_number}/{total_files}] '{os.path.basename(file_path)}' 응답 수신 완료 (길이: {len(response_text)} 문자)")
             
             # JSON 추출
-            extracted_data = safe_extract_json(response.text)
+            extracted_data = safe_extract_json(response_text)
             
             if extracted_data is None:
-                log_progress(f"⚠️ [{file_number}/{total_files}] '{os.path.basename(file_path)}' JSON 추출 실패 (시도 {attempt + 1})")
-                if attempt < max_retries - 1:
-                    log_progress(f"🔄 [{file_number}/{total_files}] '{os.path.basename(file_path)}' 재시도합니다...")
-                    time.sleep(5)  # 재시도 전 대기
-                    continue
-                else:
-                    raise ValueError(f"❌ '{os.path.basename(file_path)}' 모든 시도에서 JSON 추출 실패")
+                client.rate_limiter.record_failure('parse')
+                raise ResponseParseError(f"❌ '{os.path.basename(file_path)}' JSON 추출 실패")
+            if cache_key is not None:
+                await asyncio.to_thread(client.response_cache.put, cache_key, response_text)
             
             log_progress(f"✅ [{file_number}/{total_files}] '{os.path.basename(file_path)}' Vertex AI OCR 성공! {len(extracted_data)}개 항목 발견")
             return extracted_data
             
         except Exception as e:
-            log_progress(f"❌ [{file_number}/{total_files}] '{os.path.basename(file_path)}' Vertex AI OCR 실패 (시도 {attempt + 1}): {e}")
-            if attempt == max_retries - 1:
+            # 오류 종류(quota/server/parse/other)별 정책으로 재시도 여부와 대기 시간 결정
+            error_kind = classify_error(e)
+            log_progress(f"❌ [{file_number}/{total_files}] '{os.path.basename(file_path)}' Vertex AI OCR 실패 (시도 {attempt}, {error_kind}): {e}")
+            breaker = client.rate_limiter.breaker
+            if error_kind in ('quota', 'server') and breaker.state == 'open':
+                log_progress(f"⛔ Vertex AI 엔드포인트 오류가 계속되어 모든 요청을 {breaker.cooldown:.0f}초 동안 멈춥니다 (회로 차단기)")
+            delay = client.rate_limiter.retry_delay(error_kind, attempt, e)
+            if delay is None:
                 raise
-            time.sleep(5)  # 재시도 전 대기
+            log_progress(f"🔄 [{file_number}/{total_files}] '{os.path.basename(file_path)}' {delay:.1f}초 후 재시도합니다...")
+            await asyncio.sleep(delay)
+
+def lookup_cached_response(response_cache, file_data, prompt, model_name, generation_config=None):
+    """응답 캐시에서 추출 결과 찾기 - (캐시 키, 항목 목록 또는 None), 캐시를 쓰지 않으면 (None, None)
+
+    generation_config 는 문서 하나짜리 요청에 쓰는 생성 설정 (응답 스키마를 바꾸면 예전 응답을 쓰지 않음)
+    """
+    if response_cache is None:
+        return None, None
+    cache_key = response_cache.key(file_data, prompt, model_name, generation_config)
+    cached_text = response_cache.get(cache_key)
+    return cache_key, safe_extract_json(cached_text) if cached_text is not None else None
+
+async def extract_pack_with_vertex_ai_async(client: VertexOCRClient, pack, total_files: int):
+    """여러 문서를 한 요청으로 추출 - pack: [(번호, 파일명, 바이트, MIME 타입)]
+    
+    문서마다 구분 텍스트를 앞에 붙여 넣고, 응답은 문서 번호별 객체 배열 스키마로 받아 문서별로 나눕니다.
+    반환값: {pack 안 순번(1부터): 항목 목록} - 응답에 없거나 형식이 틀린 문서는 빠지므로 호출하는 쪽에서 개별 요청.
+    quota/server 오류는 정책대로 묶음 전체를 재시도하고, 그 밖의 오류는 빈 결과(전부 개별 요청)로 처리합니다.
+    나눠 받은 결과(모든 행이 객체인 문서만)는 문서별 응답 캐시에도 저장해 다음 실행에서는 개별/묶음 어느 쪽이든 재사용됩니다.
+    """
+    label = f"{pack[0][0]}~{pack[-1][0]}/{total_files}"
+    parts = []
+    for number, (i, pdf_file, file_data, mime_type) in enumerate(pack, 1):
+        parts += [document_delimiter(number), client.document_part(file_data, mime_type)]
+    model, contents = client.prepare_contents(parts, GEMINI_PROMPT, [build_pack_instruction(len(pack))])
+    estimated_tokens = (sum(estimate_request_tokens(file_data, mime_type, '') for _, _, file_data, mime_type in pack)
+                        + estimate_request_tokens(b'', 'text/plain', GEMINI_PROMPT))
+    generation_config = pack_generation_config(EXTRACTION_FIELDS) if OCR_RESPONSE_SCHEMA else None
+    
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            log_progress(f"📦 [{label}] 문서 {len(pack)}개 묶음 요청 (시도 {attempt})")
+            response = await client.generate_async(contents, estimated_tokens, model, generation_config)
+            results = split_pack_response(safe_extract_json(response.text), len(pack))
+            break
+        except Exception as e:
+            error_kind = classify_error(e)
+            log_progress(f"❌ [{label}] 묶음 요청 실패 (시도 {attempt}, {error_kind}): {e}")
+            delay = client.rate_limiter.retry_delay(error_kind, attempt, e) if error_kind in ('quota', 'server') else None
+            if delay is None:
+                return {}
+            log_progress(f"🔄 [{label}] {delay:.1f}초 후 묶음 재요청합니다...")
+            await asyncio.sleep(delay)
+    
+    if client.response_cache is not None:
+        # 문서별 결과는 문서 하나짜리 요청과 같은 형식이므로 그 생성 설정의 키로 저장
+        def cache_results():
+            for number, rows in results.items():
+                file_data = pack[number - 1][2]
+                client.response_cache.put(client.response_cache.key(file_data, GEMINI_PROMPT, client.model_name,
+                                                                     client.generation_config),
+                                          json.dumps(rows, ensure_ascii=False))
+        await asyncio.to_thread(cache_results)
+    log_progress(f"✅ [{label}] 묶음 응답 수신: 문서 {len(results)}/{len(pack)}개 결과")
+    return results
+
+async def stream_response_rows(client, contents, estimated_tokens, model, file_number, total_files, filename,
+                               blocking=False, on_row=None):
+    """스트리밍 요청 하나 - 조각마다 JSON 배열 항목을 꺼내 on_row(순번, 항목) 호출, 전체 응답 텍스트 반환
+
+    blocking=True 이면 동기 스트림을 별도 스레드에서 읽음 (on_row 도 그 스레드에서 호출됨)
+    """
+    parser = JsonArrayStreamParser()
+    started_at = time.perf_counter()
+    first_row_seconds = None
+    
+    def on_text(text):
+        nonlocal first_row_seconds
+        for item in parser.feed(text):
+            if first_row_seconds is None:
+                first_row_seconds = time.perf_counter() - started_at
+                log_progress(f"⏱️ [{file_number}/{total_files}] '{filename}' 첫 행 수신: {first_row_seconds:.2f}초")
+            if on_row:
+                on_row(parser.item_count - 1, item)
+    
+    if blocking:
+        response_text = await asyncio.to_thread(client.generate_stream, contents, estimated_tokens, model, on_text)
+    else:
+        response_text = await client.generate_stream_async(contents, estimated_tokens, model, on_text)
+    
+    complete_seconds = time.perf_counter() - started_at
+    if first_row_seconds is not None:
+        log_progress(f"⏱️ [{file_number}/{total_files}] '{filename}' 응답 완료: {complete_seconds:.2f}초 "
+                     f"(첫 행 이후 {complete_seconds - first_row_seconds:.2f}초 동안 {parser.item_count}개 행 수신)")
+        with streaming_stats_lock:
+            streaming_stats['responses'] += 1
+            streaming_stats['first_row_seconds'] += first_row_seconds
+            streaming_stats['complete_seconds'] += complete_seconds
+    return response_text
+
+def streaming_summary():
+    """스트리밍 응답의 평균 첫 행 시간 / 응답 완료 시간"""
+    with streaming_stats_lock:
+        responses = streaming_stats['responses']
+        if not responses:
+            return {'responses': 0}
+        return {
+            'responses': responses,
+            'avg_time_to_first_row_seconds': round(streaming_stats['first_row_seconds'] / responses, 2),
+            'avg_time_to_complete_seconds': round(streaming_stats['complete_seconds'] / responses, 2)
+        }
+
+def extract_data_with_vertex_ai(client: VertexOCRClient, file_path: str, prompt: str, file_number: int, total_files: int,
+                                file_data: bytes = None, mime_type: str = "application/pdf"):
+    """동기 호출용 (감시 모드 스레드 풀, 벤치마크) - 같은 클라이언트의 동기 채널을 스레드 간에 공유"""
+    return asyncio.run(extract_data_with_vertex_ai_async(client, file_path, prompt, file_number, total_files,
+                                                         file_data, mime_type, blocking=True))
+
+def extract_data_locally(file_path: str, file_number: int, total_files: int, file_data: bytes = None,
+                         mime_type: str = "application/pdf"):
+    """
+    PDF 텍스트 레이어에서 바로 추출을 시도합니다 (Vertex AI 호출 없음).
+    검증 규칙(6자리 업종 코드, 이자/기타 X/O, 금액)을 통과하지 못하면 None 을 반환합니다.
+    """
+    if not LOCAL_EXTRACTION or mime_type != "application/pdf":
+        return None
+    
+    try:
+        if file_data is None:
+            with open(file_path, 'rb') as f:
+                file_data = f.read()
+        rows = extract_rows_from_text_layer(file_data, EXTRACTION_FIELDS)
+    except Exception as e:
+        log_progress(f"⚠️ [{file_number}/{total_files}] '{os.path.basename(file_path)}' 로컬 추출 오류: {e}")
+        return None
+    
+    if rows is None:
+        log_progress(f"ℹ️ [{file_number}/{total_files}] '{os.path.basename(file_path)}' 텍스트 레이어/사업소득 표 없음 → Vertex AI 사용")
+        return None
+    
+    is_valid, reason = validate_extracted_rows(rows, currency_fields)
+    if not is_valid:
+        log_progress(f"ℹ️ [{file_number}/{total_files}] '{os.path.basename(file_path)}' 로컬 추출 검증 실패 ({reason}) → Vertex AI 사용")
+        return None
+    
+    log_progress(f"⚡ [{file_number}/{total_files}] '{os.path.basename(file_path)}' 텍스트 레이어에서 추출 성공! {len(rows)}개 항목 (Vertex AI 생략)")
+    return normalize_extracted_rows(rows, currency_fields)
 
 def validate_and_fix_data(data_list, file_number, total_files, filename):
     """
@@ -218,16 +408,37 @@ def validate_and_fix_data(data_list, file_number, total_files, filename):
             log_progress(f"⚠️ [{file_number}/{total_files}] '{filename}' 항목 {i+1}이 객체가 아닙니다. 건너뜁니다.")
             continue
         
-        # 모든 필드가 있는지 확인하고 없으면 추가
-        for field in EXTRACTION_FIELDS:
-            if field not in item:
-                item[field] = "N/A"
-        
-        validated_data.append(item)
+        validated_data.append(fix_row(item))
     
     log_progress(f"✅ [{file_number}/{total_files}] '{filename}' 데이터 검증 완료. {len(validated_data)}개 항목 유효")
     return validated_data
 
+def fix_row(item):
+    """항목 하나의 빠진 필드를 "N/A" 로 채움"""
+    # 모든 필드가 있는지 확인하고 없으면 추가
+    for field in EXTRACTION_FIELDS:
+        if field not in item:
+            item[field] = "N/A"
+    return item
+
+def build_sheet_row(file_name_without_ext, row_number, extracted_data):
+    """검증된 항목 하나를 스프레드시트 행으로 변환 (파일 이름(확장자 제거), 행번호, 추출 필드 순)"""
+    data_row = [file_name_without_ext, row_number]
+    for field in EXTRACTION_FIELDS:
+        value = extracted_data.get(field, 'N/A')
+        if isinstance(value, str):
+            value = value.replace('\n', ' ').replace('\r', ' ')
+        if field in currency_fields:
+            value = clean_currency(str(value))
+        data_row.append(str(value))
+    return data_row
+
+def build_sheet_rows(pdf_file, validated_data):
+    """검증된 항목을 스프레드시트 행으로 변환"""
+    file_name_without_ext = os.path.splitext(pdf_file)[0]
+    return [build_sheet_row(file_name_without_ext, row_number, extracted_data)
+            for row_number, extracted_data in enumerate(validated_data, 1)]
+
 def add_to_spreadsheet_batch(worksheet, rows_to_append, file_number, total_files, filename):
     """스프레드시트에 배치로 데이터 추가"""
     try:
@@ -239,6 +450,434 @@ def add_to_spreadsheet_batch(worksheet, rows_to_append, file_number, total_files
         log_progress(f"❌ [{file_number}/{total_files}] '{filename}' 구글시트 업로드 실패: {e}")
         return False
 
+def run_watch_mode(client, worksheet, log_worksheet):
+    """감시 모드 - pdfs 폴더에 새 원본이 들어와 안정되면 바로 마스킹 → OCR → 시트 업로드
+
+    마스킹과 텍스트 레이어 추출(PyMuPDF)은 메인 스레드에서 하고, Vertex AI 호출만 스레드 풀에서
+    최대 WATCH_MAX_IN_FLIGHT 개까지 동시에 처리함. 처리 중인 파일이 상한에 닿으면 새 파일은
+    감시기에 남겨 두었다가 하나가 끝나면 꺼냄. 시트 업로드는 끝난 순서대로 메인 스레드에서 처리.
+    SIGTERM/SIGINT 를 받으면 새 파일은 더 받지 않고 처리 중인 파일을 마친 뒤 종료
+    """
+    processor = PDFProcessor(SOURCE_PDF_FOLDER_PATH, PDF_FOLDER_PATH, compact_output=MASK_COMPACT_OUTPUT,
+                             masking_strategy=MASKING_STRATEGY, output_format=MASKED_OUTPUT_FORMAT,
+                             raster_dpi=RASTER_DPI, page_selection=PAGE_SELECTION)
+    # 기존 원본 해시를 먼저 색인해 두어야 같은 내용의 새 파일을 중복으로 알아봄
+    processor.list_unique_source_pdfs()
+    watcher = FolderWatcher(SOURCE_PDF_FOLDER_PATH,
+                            lambda filename: filename.lower().endswith('.pdf') and not filename.startswith('.'),
+                            processor.natural_sort_key, WATCH_STABLE_SECONDS, WATCH_POLL_INTERVAL).start()
+    
+    stop_event = threading.Event()
+    def request_stop(signum, frame):
+        log_progress("🛑 감시 중지 요청 수신 - 처리 중인 파일을 마치고 종료합니다")
+        stop_event.set()
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+    
+    log_progress(f"👀 감시 모드 시작: '{SOURCE_PDF_FOLDER_PATH}' (방식: {'파일 이벤트' if watcher.mode == 'events' else '폴링'}, "
+                 f"안정 대기 {WATCH_STABLE_SECONDS}초, 동시 OCR {WATCH_MAX_IN_FLIGHT}개)")
+    log_progress("📂 지금 있는 파일은 건너뛰고 새로 들어오거나 바뀐 PDF만 처리합니다")
+    
+    stats = {'files': 0, 'successful': 0, 'local': 0, 'duplicates': 0, 'errors': 0, 'rows': 0}
+    in_flight = {}  # Vertex AI 요청 future → (번호, 마스킹 파일명, 원본 파일명, 감지 시각)
+    
+    def record_error(filename, error):
+        log_progress(f"🚨 '{filename}' 처리 중 오류 발생: {error}")
+        log_worksheet.append_row([filename, str(error), datetime.now().strftime("%Y-%m-%d %H:%M:%S")])
+        stats['errors'] += 1
+    
+    def upload(job, extracted_data_list):
+        number, masked_name, original_name, detected_at = job
+        validated_data = validate_and_fix_data(extracted_data_list, number, stats['files'], masked_name)
+        if not validated_data:
+            record_error(masked_name, "유효한 데이터 없음")
+            return
+        rows_to_append = build_sheet_rows(masked_name, validated_data)
+        if not add_to_spreadsheet_batch(worksheet, rows_to_append, number, stats['files'], masked_name):
+            record_error(masked_name, "스프레드시트 추가 실패")
+            return
+        stats['successful'] += 1
+        stats['rows'] += len(rows_to_append)
+        log_progress(f"✅ [{number}] '{original_name}' → '{masked_name}' 시트 반영 완료 "
+                     f"(감지 후 {time.monotonic() - detected_at:.1f}초)")
+    
+    with ThreadPoolExecutor(max_workers=WATCH_MAX_IN_FLIGHT) as executor:
+        while in_flight or not stop_event.is_set():
+            ready = []
+            if not stop_event.is_set():
+                # 처리 중인 파일이 있으면 기다리지 않고 한 번만 확인 (완료 대기는 아래에서)
+                ready = watcher.take_ready(limit=WATCH_MAX_IN_FLIGHT - len(in_flight),
+                                           timeout=0 if in_flight else WATCH_POLL_INTERVAL)
+            
+            for item in ready:
+                stats['files'] += 1
+                number = stats['files']
+                filename = item['filename']
+                log_progress(f"")
+                log_progress(f"📥 [{number}] 새 원본 감지: '{filename}' ({item['size'] / 1024 / 1024:.2f} MB)")
+                try:
+                    masked = processor.mask_new_source(filename)
+                    if masked['duplicate_of']:
+                        log_progress(f"⏭️ [{number}] '{filename}' 은(는) '{masked['duplicate_of']}' 와 내용이 같아 건너뜁니다")
+                        stats['duplicates'] += 1
+                        continue
+                    if masked['unchanged']:
+                        log_progress(f"⏭️ [{number}] '{filename}' 은(는) 내용이 바뀌지 않아 다시 처리하지 않습니다")
+                        stats['duplicates'] += 1
+                        continue
+                    
+                    masked_name = masked['masked_name']
+                    job = (number, masked_name, filename, item['detected_at'])
+                    full_path = os.path.join(PDF_FOLDER_PATH, masked_name)
+                    mime_type = MIME_TYPES.get(os.path.splitext(masked_name)[1].lower(), 'application/pdf')
+                    extracted_data_list = extract_data_locally(full_path, number, number, masked['data'], mime_type)
+                    if extracted_data_list is not None:
+                        stats['local'] += 1
+                        upload(job, extracted_data_list)
+                    else:
+                        future = executor.submit(extract_data_with_vertex_ai, client, full_path, GEMINI_PROMPT,
+                                                 number, number, masked['data'], mime_type)
+                        in_flight[future] = job
+                except Exception as e:
+                    record_error(filename, e)
+            
+            if in_flight:
+                done, _ = wait(in_flight, timeout=WATCH_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = in_flight.pop(future)
+                    try:
+                        upload(job, future.result())
+                    except Exception as e:
+                        record_error(job[1], e)
+    
+    watcher.stop()
+    processor.flush_watch_state()
+    log_progress(f"")
+    log_progress(f"{'='*25} 🛑 감시 모드 종료 {'='*25}")
+    log_progress(f"📊 감지된 파일: {stats['files']}개 (중복 건너뜀: {stats['duplicates']}개)")
+    log_progress(f"✅ 성공: {stats['successful']}개 (텍스트 레이어 처리: {stats['local']}개)")
+    log_progress(f"📡 Vertex AI 요청 수 (재시도 포함): {client.request_count}회")
+    log_progress(f"🚦 요청 제한 통계: {client.rate_limiter.stats()}")
+    if client.response_cache is not None:
+        log_progress(f"💾 응답 캐시 통계: {client.response_cache.stats()}")
+    if client.prompt_cache is not None:
+        log_progress(f"🧊 프롬프트 컨텍스트 캐시 통계: {client.prompt_cache_stats()}")
+    if OCR_STREAMING:
+        log_progress(f"⏱️ 스트리밍 응답 통계: {streaming_summary()}")
+    log_progress(f"❌ 오류: {stats['errors']}개")
+    log_progress(f"📝 총 업로드 행 수: {stats['rows']}개")
+
+async def process_document_async(client, i, pdf_file, file_data, total_files, packer=None, pdf_executor=None):
+    """파일 하나 OCR 및 검증 - 시트에 쓸 결과를 반환 (시트 기록은 번호 순으로 따로 처리)
+    
+    packer 가 있으면 Vertex AI 요청은 다른 문서와 묶어서 보냄 (run_ocr_engine 의 묶음 모드)
+    """
+    file_start_time = time.time()
+
+    log_progress(f"")
+    log_progress(f"📄 [{i}/{total_files}] ===== {pdf_file} Vertex AI 처리 시작 =====")
+    log_progress("-" * 50)
+
+    full_path = os.path.join(PDF_FOLDER_PATH, pdf_file)
+
+    if OCR_INPUT_MODE == 'memory' and file_data is None:
+        raise ValueError("마스킹 처리 실패 (원본 PDF를 열 수 없음)")
+
+    # 문서 바이트는 여기서 한 번만 읽어 로컬 추출과 Vertex AI 요청에 같이 사용
+    file_data = await asyncio.to_thread(read_document, full_path, file_data)
+    log_progress(f"📏 [{i}/{total_files}] '{pdf_file}' 파일 크기: {len(file_data) / 1024 / 1024:.2f} MB")
+
+    # 텍스트 레이어에서 먼저 추출하고, 실패하면 Vertex AI로 데이터 추출
+    mime_type = MIME_TYPES.get(os.path.splitext(pdf_file)[1].lower(), 'application/pdf')
+    # PyMuPDF 작업은 이벤트 루프를 막지 않도록 pdf_executor 스레드에서 실행
+    extracted_data_list = await asyncio.get_running_loop().run_in_executor(
+        pdf_executor, extract_data_locally, full_path, i, total_files, file_data, mime_type)
+    extracted_locally = extracted_data_list is not None
+    if extracted_locally:
+        return build_document_outcome(i, total_files, pdf_file, extracted_data_list, True, file_start_time)
+    if packer is not None:
+        extracted_data_list = await packer(i, pdf_file, full_path, file_data, mime_type)
+        return build_document_outcome(i, total_files, pdf_file, extracted_data_list, False, file_start_time)
+    
+    # 스트리밍 중 닫힌 항목은 바로 보정/시트 행 변환 (순번 → (받은 항목, 시트 행))
+    file_name_without_ext = os.path.splitext(pdf_file)[0]
+    streamed_rows = {}
+    
+    def prepare_row(index, item):
+        if isinstance(item, dict):
+            streamed_rows[index] = (dict(item), build_sheet_row(file_name_without_ext, index + 1, fix_row(item)))
+    
+    extracted_data_list = await extract_data_with_vertex_ai_async(client, full_path, GEMINI_PROMPT, i, total_files,
+                                                                  file_data, mime_type, on_row=prepare_row)
+    
+    # 최종 응답의 항목이 스트리밍 중 받은 항목과 모두 같으면 미리 만든 행을 그대로 사용
+    # (재시도/캐시 응답 등으로 다르면 전체 결과로 다시 검증)
+    if (isinstance(extracted_data_list, list) and len(streamed_rows) == len(extracted_data_list)
+            and all(streamed_rows.get(index, (None,))[0] == item for index, item in enumerate(extracted_data_list))):
+        log_progress(f"✅ [{i}/{total_files}] '{pdf_file}' 데이터 검증 완료. {len(streamed_rows)}개 항목 유효 (스트리밍 중 처리)")
+        return {
+            'validated_count': len(streamed_rows),
+            'rows': [streamed_rows[index][1] for index in range(len(streamed_rows))],
+            'local': False,
+            'start_time': file_start_time
+        }
+    return build_document_outcome(i, total_files, pdf_file, extracted_data_list, False, file_start_time)
+
+def build_document_outcome(i, total_files, pdf_file, extracted_data_list, extracted_locally, start_time):
+    """추출 결과를 검증/보정하고 시트에 쓸 행으로 변환 (write_document_result 입력)"""
+    # 데이터 검증 및 수정
+    validated_data = validate_and_fix_data(extracted_data_list, i, total_files, pdf_file)
+
+    return {
+        'validated_count': len(validated_data),
+        'rows': build_sheet_rows(pdf_file, validated_data),
+        'local': extracted_locally,
+        'start_time': start_time
+    }
+
+def write_document_result(worksheet, log_worksheet, i, total_files, pdf_file, outcome, stats):
+    """OCR 결과 하나를 시트에 기록하고 통계 갱신 (번호 순으로 한 번에 하나씩 호출됨)"""
+    if 'error' in outcome:
+        log_worksheet.append_row([pdf_file, outcome['error'], datetime.now().strftime("%Y-%m-%d %H:%M:%S")])
+        stats['error_count'] += 1
+        return
+
+    if outcome['local']:
+        stats['local_extracted_files'] += 1
+
+    rows_to_append = outcome['rows']
+    if not rows_to_append:
+        log_progress(f"⚠️ [{i}/{total_files}] '{pdf_file}'에서 유효한 데이터를 찾지 못했습니다.")
+        log_worksheet.append_row([pdf_file, "유효한 데이터 없음", datetime.now().strftime("%Y-%m-%d %H:%M:%S")])
+        return
+
+    # 스프레드시트에 실시간 추가
+    if not add_to_spreadsheet_batch(worksheet, rows_to_append, i, total_files, pdf_file):
+        log_worksheet.append_row([pdf_file, "스프레드시트 추가 실패", datetime.now().strftime("%Y-%m-%d %H:%M:%S")])
+        stats['error_count'] += 1
+        return
+    stats['total_rows_added'] += len(rows_to_append)
+    stats['successful_files'] += 1
+
+    # 처리 시간 계산 (처리 시작부터 시트 기록까지)
+    processing_time = time.time() - outcome['start_time']
+
+    log_progress(f"✅ [{i}/{total_files}] '{pdf_file}' Vertex AI 처리 완료!")
+    log_progress(f"   📊 OCR 추출: {outcome['validated_count']}개 항목")
+    log_progress(f"   📝 시트 업로드: {len(rows_to_append)}개 행")
+    log_progress(f"   ⏱️ 처리 시간: {processing_time:.2f}초")
+    log_progress(f"   📈 전체 진행률: {i}/{total_files} ({(i/total_files*100):.1f}%)")
+    log_progress(f"===== {pdf_file} Vertex AI 처리 완료 =====")
+
+async def run_ocr_engine(client, documents, total_files, worksheet, log_worksheet):
+    """documents 를 최대 OCR_CONCURRENCY 개까지 동시에 OCR 하는 asyncio 엔진
+
+    Vertex AI 요청은 generate_content_async 로 겹쳐서 보내고, 검증/행 변환은 응답이 오는 대로 처리.
+    시트 기록은 파일 번호 순서를 지키도록 앞 번호가 모두 끝난 결과부터 차례로 내보냄
+    (gspread 는 동기 라이브러리라 별도 스레드에서 기록). 다음 문서는 동시 처리 자리가 나야
+    꺼내므로 메모리 모드에서도 마스킹된 바이트는 최대 OCR_CONCURRENCY 개만 메모리에 있음
+    
+    OCR_PACK_SIZE 가 2 이상이면 Vertex AI 로 보낼 문서를 그 수만큼 모아 한 요청으로 보냄
+    (동시 요청 수는 그대로 OCR_CONCURRENCY, 동시에 처리 중인 문서는 그 묶음 수 배).
+    묶음 응답에서 결과를 받지 못한 문서만 개별 요청으로 다시 처리하며, 묶음 요청과 개별 재요청 모두
+    request_slots 세마포어를 잡고 보내므로 진행 중인 Vertex AI 요청은 OCR_CONCURRENCY 개를 넘지 않음
+    
+    메모리 모드 마스킹(documents 제너레이터)과 텍스트 레이어 추출은 PyMuPDF 를 쓰는 동기 작업이므로
+    작업자 스레드 하나(pdf_executor)에서 차례로 실행함 - 이벤트 루프는 그동안 응답 처리를 계속하고,
+    스레드 안전하지 않은 PyMuPDF 가 동시에 두 곳에서 쓰이지 않음
+    """
+    stats = {'total_rows_added': 0, 'error_count': 0, 'successful_files': 0, 'local_extracted_files': 0}
+    slots = asyncio.Semaphore(OCR_CONCURRENCY * OCR_PACK_SIZE)
+    outcomes = {}  # 끝났지만 아직 시트에 쓰지 않은 결과 (번호 → (파일명, 결과))
+    next_to_write = 1
+    write_lock = asyncio.Lock()
+
+    async def write_in_order():
+        nonlocal next_to_write
+        async with write_lock:
+            while next_to_write in outcomes:
+                pdf_file, outcome = outcomes.pop(next_to_write)
+                await asyncio.to_thread(write_document_result, worksheet, log_worksheet, next_to_write, total_files,
+                                        pdf_file, outcome, stats)
+                next_to_write += 1
+
+    loop = asyncio.get_running_loop()
+    pdf_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='pymupdf')
+    request_slots = asyncio.Semaphore(OCR_CONCURRENCY)  # 묶음 모드에서 진행 중인 Vertex AI 요청 수 제한
+    pack_queue = []  # 묶음으로 보낼 문서 [(번호, 파일명, 바이트, MIME 타입, 결과 future)]
+    pack_timer = None
+    pack_tasks = set()
+    
+    async def send_pack(pack):
+        results = {}
+        try:
+            async with request_slots:
+                results = await extract_pack_with_vertex_ai_async(client, [entry[:4] for entry in pack], total_files)
+        except Exception as e:
+            log_progress(f"🚨 묶음 요청 처리 중 오류 발생: {e}")
+        finally:
+            packing_stats['packs'] += 1
+            packing_stats['packed_documents'] += len(results)
+            for number, entry in enumerate(pack, 1):
+                entry[4].set_result(results.get(number))
+    
+    def flush_pack():
+        nonlocal pack_queue, pack_timer
+        if pack_timer is not None:
+            pack_timer.cancel()
+            pack_timer = None
+        pack, pack_queue = pack_queue, []
+        if pack:
+            task = asyncio.create_task(send_pack(pack))
+            pack_tasks.add(task)
+            task.add_done_callback(pack_tasks.discard)
+    
+    async def packed_extract(i, pdf_file, full_path, file_data, mime_type):
+        nonlocal pack_timer
+        _, extracted_data = await asyncio.to_thread(lookup_cached_response, client.response_cache, file_data,
+                                                    GEMINI_PROMPT, client.model_name, client.generation_config)
+        if extracted_data is not None:
+            log_progress(f"💾 [{i}/{total_files}] '{pdf_file}' 캐시된 응답 사용 ({len(extracted_data)}개 항목)")
+            return extracted_data
+        
+        future = loop.create_future()
+        pack_queue.append((i, pdf_file, file_data, mime_type, future))
+        if len(pack_queue) >= OCR_PACK_SIZE:
+            flush_pack()
+        elif pack_timer is None:
+            pack_timer = loop.call_later(OCR_PACK_WAIT_SECONDS, flush_pack)
+        extracted_data = await future
+        if extracted_data is None:
+            log_progress(f"🔁 [{i}/{total_files}] '{pdf_file}' 묶음 응답에 결과가 없어 개별 요청합니다")
+            packing_stats['reissued_documents'] += 1
+            async with request_slots:
+                extracted_data = await extract_data_with_vertex_ai_async(client, full_path, GEMINI_PROMPT, i,
+                                                                         total_files, file_data, mime_type)
+        return extracted_data
+    
+    packer = packed_extract if OCR_PACK_SIZE > 1 else None
+    
+    async def run_one(i, pdf_file, file_data):
+        try:
+            outcome = await process_document_async(client, i, pdf_file, file_data, total_files, packer, pdf_executor)
+        except Exception as e:
+            log_progress(f"🚨 [{i}/{total_files}] '{pdf_file}' Vertex AI 처리 중 오류 발생: {e}")
+            outcome = {'error': str(e)}
+        finally:
+            slots.release()
+        outcomes[i] = (pdf_file, outcome)
+        await write_in_order()
+
+    pending = set()
+    document_iter = iter(documents)
+    i = 0
+    try:
+        while True:
+            await slots.acquire()
+            document = await loop.run_in_executor(pdf_executor, next, document_iter, None)
+            if document is None:
+                slots.release()
+                break
+            i += 1
+            pdf_file, file_data = document
+            task = asyncio.create_task(run_one(i, pdf_file, file_data))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        if pending:
+            await asyncio.gather(*pending)
+    finally:
+        pdf_executor.shutdown(wait=False)
+    return stats
+
+def create_batch_submitter():
+    """OCR_BATCH_MODE 에 맞는 배치 제출 구현"""
+    if OCR_BATCH_MODE == 'local':
+        return LocalBatchSubmitter(OCR_BATCH_LOCAL_RESPONSES)
+    if OCR_BATCH_MODE != 'vertex':
+        raise ValueError(f"지원하지 않는 배치 모드입니다: {OCR_BATCH_MODE}")
+    if not OCR_BATCH_GCS_PREFIX:
+        raise ValueError("OCR_BATCH_GCS_PREFIX 환경변수가 설정되지 않았습니다.")
+    return VertexBatchSubmitter(OCR_BATCH_GCS_PREFIX, OCR_MODEL_NAME)
+
+def run_batch_mode(documents, total_files, worksheet, log_worksheet, submitter, response_cache=None):
+    """배치 예측 모드 - 모든 문서를 배치 입력 JSONL 하나로 만들어 제출하고, 결과 JSONL 을 받아 시트에 기록
+
+    텍스트 레이어로 추출되거나 응답 캐시에 있는 문서는 배치에 넣지 않음. 결과는 온라인 요청과 같은 경로
+    (safe_extract_json → validate_and_fix_data → 시트 기록)로 처리하고 파일 번호 순으로 기록함
+    """
+    stats = {'total_rows_added': 0, 'error_count': 0, 'successful_files': 0, 'local_extracted_files': 0}
+    job_folder = os.path.join(OCR_BATCH_FOLDER, datetime.now().strftime('%Y%m%d-%H%M%S'))
+    os.makedirs(job_folder, exist_ok=True)
+    start_time = time.time()
+
+    outcomes = {}       # 번호 → (파일명, 결과)
+    batch_files = {}    # 배치에 넣은 번호 → 파일명 (배치 라벨에는 번호만 넣음)
+    cache_keys = {}     # 배치에 넣은 번호 → 응답 캐시 키
+    # 배치 결과는 온라인 요청과 같은 응답이므로 캐시 키도 온라인 요청의 생성 설정으로 만듦
+    cache_config = json_generation_config(EXTRACTION_FIELDS) if OCR_RESPONSE_SCHEMA else None
+
+    def batch_documents():
+        for i, (pdf_file, file_data) in enumerate(documents, 1):
+            full_path = os.path.join(PDF_FOLDER_PATH, pdf_file)
+            try:
+                if OCR_INPUT_MODE == 'memory' and file_data is None:
+                    raise ValueError("마스킹 처리 실패 (원본 PDF를 열 수 없음)")
+                file_data = read_document(full_path, file_data)
+                mime_type = MIME_TYPES.get(os.path.splitext(pdf_file)[1].lower(), 'application/pdf')
+                extracted_data_list = extract_data_locally(full_path, i, total_files, file_data, mime_type)
+                if extracted_data_list is not None:
+                    outcomes[i] = (pdf_file, build_document_outcome(i, total_files, pdf_file, extracted_data_list,
+                                                                    True, start_time))
+                    continue
+                cache_key, extracted_data_list = lookup_cached_response(response_cache, file_data, GEMINI_PROMPT,
+                                                                        OCR_MODEL_NAME, cache_config)
+                if extracted_data_list is not None:
+                    log_progress(f"💾 [{i}/{total_files}] '{pdf_file}' 캐시된 응답 사용 ({len(extracted_data_list)}개 항목)")
+                    outcomes[i] = (pdf_file, build_document_outcome(i, total_files, pdf_file, extracted_data_list,
+                                                                    False, start_time))
+                    continue
+                if cache_key is not None:
+                    cache_keys[i] = cache_key
+                batch_files[i] = pdf_file
+                yield i, file_data, mime_type
+            except Exception as e:
+                log_progress(f"🚨 [{i}/{total_files}] '{pdf_file}' 배치 요청 준비 중 오류 발생: {e}")
+                outcomes[i] = (pdf_file, {'error': str(e)})
+
+    input_path = os.path.join(job_folder, BATCH_INPUT_NAME)
+    response_schema = build_response_schema(EXTRACTION_FIELDS) if OCR_RESPONSE_SCHEMA else None
+    request_count = write_batch_requests(input_path, batch_documents(), GEMINI_PROMPT, response_schema)
+    log_progress(f"📦 배치 입력 작성 완료: {request_count}개 요청 (그 밖의 {len(outcomes)}개는 로컬 처리/캐시/오류) → {input_path}")
+
+    if request_count:
+        output_paths = submitter.run(input_path, job_folder, log_progress)
+        for i, response_text, error in iter_batch_results(output_paths):
+            pdf_file = batch_files.pop(i, None)
+            if pdf_file is None:
+                continue
+            try:
+                if error:
+                    raise RuntimeError(f"배치 예측 실패: {error}")
+                extracted_data_list = safe_extract_json(response_text)
+                if extracted_data_list is None:
+                    raise ResponseParseError(f"❌ '{pdf_file}' JSON 추출 실패")
+                if i in cache_keys:
+                    response_cache.put(cache_keys[i], response_text)
+                log_progress(f"✅ [{i}/{total_files}] '{pdf_file}' 배치 결과 {len(extracted_data_list)}개 항목")
+                outcomes[i] = (pdf_file, build_document_outcome(i, total_files, pdf_file, extracted_data_list,
+                                                                False, start_time))
+            except Exception as e:
+                log_progress(f"🚨 [{i}/{total_files}] '{pdf_file}' 배치 결과 처리 중 오류 발생: {e}")
+                outcomes[i] = (pdf_file, {'error': str(e)})
+        for i, pdf_file in batch_files.items():
+            log_progress(f"🚨 [{i}/{total_files}] '{pdf_file}' 배치 결과에 응답이 없습니다")
+            outcomes[i] = (pdf_file, {'error': '배치 결과에 응답 없음'})
+
+    for i in sorted(outcomes):
+        pdf_file, outcome = outcomes[i]
+        write_document_result(worksheet, log_worksheet, i, total_files, pdf_file, outcome, stats)
+    return stats
+
 # --- 🚀 Main ---
 def main():
     start_time = time.time()
@@ -277,7 +916,27 @@ def main():
         import vertexai
         vertexai.init(project=PROJECT_ID, location=LOCATION)
         
-        log_progress("✅ Vertex AI 초기화 성공!")
+        # 모델/예측 채널은 실행 전체에서 하나만 만들어 재사용
+        response_cache = None
+        if OCR_RESPONSE_CACHE_MB > 0:
+            response_cache = ResponseCache(OCR_RESPONSE_CACHE_PATH, int(OCR_RESPONSE_CACHE_MB * 1024 * 1024))
+        ocr_client = VertexOCRClient(rate_limiter=RateLimiter(OCR_REQUESTS_PER_MINUTE, OCR_TOKENS_PER_MINUTE),
+                                     response_cache=response_cache,
+                                     generation_config=json_generation_config(EXTRACTION_FIELDS)
+                                     if OCR_RESPONSE_SCHEMA else None)
+        
+        log_progress(f"✅ Vertex AI 초기화 성공! (모델: {ocr_client.model_name}, "
+                     f"분당 요청 {OCR_REQUESTS_PER_MINUTE or '제한 없음'}, 분당 토큰 {OCR_TOKENS_PER_MINUTE or '제한 없음'})")
+        
+        # 고정 프롬프트를 컨텍스트 캐시로 등록 (배치 모드는 요청마다 프롬프트를 넣어야 하므로 제외)
+        if OCR_PROMPT_CACHE and not OCR_BATCH_MODE:
+            try:
+                prompt_cache = ocr_client.enable_prompt_cache(GEMINI_PROMPT, OCR_PROMPT_CACHE_TTL_MINUTES,
+                                                              OCR_PROMPT_CACHE_BASELINE_EVERY)
+                log_progress(f"🧊 프롬프트 컨텍스트 캐시 사용: {prompt_cache.display_name} "
+                             f"(TTL {OCR_PROMPT_CACHE_TTL_MINUTES}분)")
+            except Exception as e:
+                log_progress(f"⚠️ 프롬프트 컨텍스트 캐시를 사용할 수 없어 요청마다 프롬프트 전체를 보냅니다: {e}")
 
         # Google Sheets 인증
         log_progress("📋 Google Sheets 연결 중...")
@@ -316,114 +975,76 @@ def main():
     except Exception as e:
         log_progress(f"❌ 헤더 확인 중 오류 발생: {e}")
 
-    # PDF 파일 목록 가져오기
-    try:
-        log_progress("📂 PDF 파일 목록 스캔 중...")
-        pdf_files = [f for f in os.listdir(PDF_FOLDER_PATH) if f.lower().endswith('.pdf')]
-        if not pdf_files:
-            log_progress(f"❌ '{PDF_FOLDER_PATH}' 폴더에 PDF 파일이 없습니다.")
-            return
-        
-        # 파일명을 숫자 순서로 정렬 (1.pdf, 2.pdf, 3.pdf...)
-        def natural_sort_key(filename):
-            try:
-                # 파일명에서 .pdf 제거하고 숫자로 변환
-                number = int(filename.replace('.pdf', ''))
-                return number
-            except ValueError:
-                # 숫자가 아닌 파일명은 맨 뒤로
-                return 999999
-        
-        pdf_files.sort(key=natural_sort_key)
-        
-        log_progress(f"📂 총 {len(pdf_files)}개의 PDF 파일을 Vertex AI로 처리합니다")
-        log_progress(f"📋 파일 목록: {pdf_files[:10]}{'...' if len(pdf_files) > 10 else ''}")
-    except FileNotFoundError:
-        log_progress(f"❌ 폴더를 찾을 수 없습니다: '{PDF_FOLDER_PATH}'")
+    if OCR_INPUT_MODE == 'watch':
+        run_watch_mode(ocr_client, worksheet, log_worksheet)
         return
 
-    total_rows_added = 0
-    error_count = 0
-    successful_files = 0
-
-    # 파일 처리 시작
-    log_progress(f"{'='*25} 📄 Vertex AI 파일별 OCR 처리 시작 {'='*25}")
-    
-    # 각 PDF 파일 처리
-    for i, pdf_file in enumerate(pdf_files, 1):
-        file_start_time = time.time()
-        
-        log_progress(f"")
-        log_progress(f"📄 [{i}/{len(pdf_files)}] ===== {pdf_file} Vertex AI 처리 시작 =====")
-        log_progress("-" * 50)
+    # PDF 파일 목록 가져오기
+    if OCR_INPUT_MODE == 'memory':
+        # 원본을 바로 마스킹해서 메모리에서 넘겨받음 (masked-pdfs 재읽기 없음)
+        log_progress(f"🧠 메모리 모드: '{SOURCE_PDF_FOLDER_PATH}' 원본을 마스킹하여 바로 OCR 처리합니다")
+        processor = PDFProcessor(SOURCE_PDF_FOLDER_PATH, PDF_FOLDER_PATH, compact_output=MASK_COMPACT_OUTPUT,
+                                 masking_strategy=MASKING_STRATEGY, output_format=MASKED_OUTPUT_FORMAT,
+                                 raster_dpi=RASTER_DPI, page_selection=PAGE_SELECTION)
+        try:
+            # 내용이 같은 원본은 한 번만 마스킹/OCR
+            total_files = len(processor.list_unique_source_pdfs()[0])
+        except FileNotFoundError:
+            log_progress(f"❌ 폴더를 찾을 수 없습니다: '{SOURCE_PDF_FOLDER_PATH}'")
+            return
+        if total_files == 0:
+            log_progress(f"❌ '{SOURCE_PDF_FOLDER_PATH}' 폴더에 PDF 파일이 없습니다.")
+            return
         
+        documents = (
+            (document['masked_name'], document['data'])
+            for document in processor.iter_masked_documents(write_to_disk=WRITE_MASKED_PDFS)
+        )
+        log_progress(f"📂 총 {total_files}개의 PDF 파일을 Vertex AI로 처리합니다 (디스크 기록: {'예' if WRITE_MASKED_PDFS else '아니오'})")
+    else:
         try:
-            full_path = os.path.join(PDF_FOLDER_PATH, pdf_file)
-            
-            # 파일 크기 정보 추가
-            file_size = os.path.getsize(full_path) / 1024 / 1024  # MB
-            log_progress(f"📏 [{i}/{len(pdf_files)}] '{pdf_file}' 파일 크기: {file_size:.2f} MB")
-            
-            # Vertex AI로 데이터 추출
-            extracted_data_list = extract_data_with_vertex_ai(full_path, GEMINI_PROMPT, i, len(pdf_files))
-            
-            # 데이터 검증 및 수정
-            validated_data = validate_and_fix_data(extracted_data_list, i, len(pdf_files), pdf_file)
+            log_progress("📂 PDF 파일 목록 스캔 중...")
+            pdf_files = [f for f in os.listdir(PDF_FOLDER_PATH) if is_masked_output(f)]
+            if not pdf_files:
+                log_progress(f"❌ '{PDF_FOLDER_PATH}' 폴더에 PDF 파일이 없습니다.")
+                return
             
-            if not validated_data:
-                log_progress(f"⚠️ [{i}/{len(pdf_files)}] '{pdf_file}'에서 유효한 데이터를 찾지 못했습니다.")
-                log_worksheet.append_row([pdf_file, "유효한 데이터 없음", datetime.now().strftime("%Y-%m-%d %H:%M:%S")])
-                continue
-            
-            # 스프레드시트에 추가할 행들 준비
-            log_progress(f"📊 [{i}/{len(pdf_files)}] '{pdf_file}' 스프레드시트 데이터 준비 중...")
-            rows_to_append = []
-            for j, extracted_data in enumerate(validated_data):
-                # 모든 행에 파일 이름 표시 (확장자 제거)
-                file_name_without_ext = pdf_file.replace('.pdf', '')  # .pdf 확장자 제거
-                row_number = j + 1
-                
-                data_row = [file_name_without_ext, row_number]
-                for field in EXTRACTION_FIELDS:
-                    value = extracted_data.get(field, 'N/A')
-                    if isinstance(value, str):
-                        value = value.replace('\n', ' ').replace('\r', ' ')
-                    if field in currency_fields:
-                        value = clean_currency(str(value))
-                    data_row.append(str(value))
-                
-                rows_to_append.append(data_row)
+            # 파일명을 숫자 순서로 정렬 (1.pdf, 2.pdf, 3.pdf...)
+            def natural_sort_key(filename):
+                try:
+                    # 파일명에서 확장자 제거하고 숫자로 변환
+                    number = int(os.path.splitext(filename)[0])
+                    return number
+                except ValueError:
+                    # 숫자가 아닌 파일명은 맨 뒤로
+                    return 999999
             
-            # 스프레드시트에 실시간 추가
-            if rows_to_append:
-                success = add_to_spreadsheet_batch(worksheet, rows_to_append, i, len(pdf_files), pdf_file)
-                if success:
-                    total_rows_added += len(rows_to_append)
-                    successful_files += 1
-                else:
-                    log_worksheet.append_row([pdf_file, "스프레드시트 추가 실패", datetime.now().strftime("%Y-%m-%d %H:%M:%S")])
-                    error_count += 1
-                    continue
+            pdf_files.sort(key=natural_sort_key)
+            total_files = len(pdf_files)
+            documents = ((pdf_file, None) for pdf_file in pdf_files)
             
-            # 처리 시간 계산
-            file_end_time = time.time()
-            processing_time = file_end_time - file_start_time
-            
-            log_progress(f"✅ [{i}/{len(pdf_files)}] '{pdf_file}' Vertex AI 처리 완료!")
-            log_progress(f"   📊 OCR 추출: {len(validated_data)}개 항목")
-            log_progress(f"   📝 시트 업로드: {len(rows_to_append)}개 행")
-            log_progress(f"   ⏱️ 처리 시간: {processing_time:.2f}초")
-            log_progress(f"   📈 전체 진행률: {i}/{len(pdf_files)} ({(i/len(pdf_files)*100):.1f}%)")
-            log_progress(f"===== {pdf_file} Vertex AI 처리 완료 =====")
+            log_progress(f"📂 총 {len(pdf_files)}개의 PDF 파일을 Vertex AI로 처리합니다")
+            log_progress(f"📋 파일 목록: {pdf_files[:10]}{'...' if len(pdf_files) > 10 else ''}")
+        except FileNotFoundError:
+            log_progress(f"❌ 폴더를 찾을 수 없습니다: '{PDF_FOLDER_PATH}'")
+            return
 
+    # 파일 처리 시작
+    if OCR_BATCH_MODE:
+        log_progress(f"{'='*25} 📦 Vertex AI 배치 예측 처리 시작 ({OCR_BATCH_MODE}) {'='*25}")
+        try:
+            stats = run_batch_mode(documents, total_files, worksheet, log_worksheet, create_batch_submitter(),
+                                   ocr_client.response_cache)
         except Exception as e:
-            error_message = f"🚨 [{i}/{len(pdf_files)}] '{pdf_file}' Vertex AI 처리 중 오류 발생: {e}"
-            log_progress(error_message)
-            
-            # 오류 로그에 기록
-            log_worksheet.append_row([pdf_file, str(e), datetime.now().strftime("%Y-%m-%d %H:%M:%S")])
-            error_count += 1
-            continue
+            log_progress(f"❌ 배치 예측 처리 실패: {e}")
+            return
+    else:
+        log_progress(f"{'='*25} 📄 Vertex AI 파일별 OCR 처리 시작 (동시 {OCR_CONCURRENCY}개) {'='*25}")
+        stats = asyncio.run(run_ocr_engine(ocr_client, documents, total_files, worksheet, log_worksheet))
+    total_rows_added = stats['total_rows_added']
+    error_count = stats['error_count']
+    successful_files = stats['successful_files']
+    local_extracted_files = stats['local_extracted_files']
 
     # 총 처리 시간 계산
     end_time = time.time()
@@ -433,8 +1054,19 @@ def main():
     log_progress(f"")
     log_progress(f"{'='*25} ✨ Vertex AI 처리 완료 {'='*25}")
     log_progress(f"⏱️ 총 처리 시간: {total_processing_time:.2f}초 ({total_processing_time/60:.1f}분)")
-    log_progress(f"📊 총 처리된 파일: {len(pdf_files)}개")
+    log_progress(f"📊 총 처리된 파일: {total_files}개")
     log_progress(f"✅ 성공: {successful_files}개")
+    log_progress(f"🧾 텍스트 레이어 처리 (Vertex AI 생략): {local_extracted_files}개")
+    log_progress(f"📡 Vertex AI 요청 수 (재시도 포함): {ocr_client.request_count}회")
+    log_progress(f"🚦 요청 제한 통계: {ocr_client.rate_limiter.stats()}")
+    if ocr_client.response_cache is not None:
+        log_progress(f"💾 응답 캐시 통계: {ocr_client.response_cache.stats()}")
+    if ocr_client.prompt_cache is not None:
+        log_progress(f"🧊 프롬프트 컨텍스트 캐시 통계: {ocr_client.prompt_cache_stats()}")
+    if OCR_STREAMING and not OCR_BATCH_MODE:
+        log_progress(f"⏱️ 스트리밍 응답 통계: {streaming_summary()}")
+    if OCR_PACK_SIZE > 1 and not OCR_BATCH_MODE:
+        log_progress(f"📦 묶음 요청 통계 (묶음당 최대 {OCR_PACK_SIZE}개): {packing_stats}")
     log_progress(f"❌ 오류: {error_count}개")
     log_progress(f"📝 총 업로드 행 수: {total_rows_added}개")
     log_progress(f"⚡ 평균 처리 속도: {total_processing_time/successful_files:.2f}초/파일" if successful_files > 0 else "")
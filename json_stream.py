@@ -0,0 +1,93 @@
+import re
+import json
+
+# 자유 형식 응답의 ```json ... ``` 코드 블록 본문
+CODE_FENCE_PATTERN = re.compile(r'```(?:json)?\s*(.*?)```', re.DOTALL)
+
+
+class JsonArrayStreamParser:
+    """스트리밍 응답 조각에서 최상위 JSON 배열의 항목을 닫히는 즉시 하나씩 꺼내는 파서
+
+    조각의 문자를 한 번씩만 보면서 중첩 깊이와 문자열/이스케이프 상태만 유지하므로
+    응답 길이에 비례한 시간만 씀. 배열 시작 '[' 앞의 텍스트(코드 블록 표시 등)는 건너뛰고,
+    객체/배열이 아닌 최상위 항목(문자열, 숫자)은 내보내지 않음.
+    전체 응답의 최종 해석은 호출하는 쪽에서 따로 함 (여기서 꺼낸 항목은 미리 처리용)
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.finished = False
+        self.item_count = 0
+        self._pending = ''  # 이전 조각에서 시작해 아직 닫히지 않은 항목 텍스트
+
+    def feed(self, chunk):
+        """응답 조각 하나를 처리하고 이 조각에서 닫힌 항목 목록 반환"""
+        items = []
+        if self.finished:
+            return items
+        start = 0 if self.depth >= 2 else None
+        for index, char in enumerate(chunk):
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == '\\':
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+                continue
+            if self.depth == 0:
+                if char == '[':
+                    self.depth = 1
+                continue
+            if char == '"':
+                self.in_string = True
+            elif char in '[{':
+                self.depth += 1
+                if self.depth == 2:
+                    start = index
+                    self._pending = ''
+            elif char in ']}':
+                self.depth -= 1
+                if self.depth == 1:
+                    item_text = self._pending + chunk[start:index + 1]
+                    self._pending = ''
+                    start = None
+                    try:
+                        items.append(json.loads(item_text))
+                        self.item_count += 1
+                    except json.JSONDecodeError:
+                        pass
+                elif self.depth == 0:
+                    self.finished = True
+                    break
+        if start is not None and self.depth >= 2:
+            self._pending += chunk[start:]
+        return items
+
+
+def safe_extract_json(text):
+    """응답 텍스트에서 JSON 배열을 추출 (실패하면 None - 호출하는 쪽에서 'parse' 재시도 정책 적용)
+
+    코드 블록이 있으면 그 본문만 보고, 첫 '[' 에서 한 번만 디코딩함. 그 배열이 깨졌으면
+    (끝에서 잘림, 끝에 쉼표 등) 안쪽 객체 일부만 돌려주지 않도록 None 을 반환.
+    '[' 가 전혀 없을 때만 첫 '{' 의 객체 하나를 배열로 감싸서 반환
+    """
+    fence = CODE_FENCE_PATTERN.search(text)
+    if fence:
+        text = fence.group(1)
+    start = text.find('[')
+    if start < 0:
+        start = text.find('{')
+    if start < 0:
+        return None
+    try:
+        json_data, _ = json.JSONDecoder().raw_decode(text, start)
+    except json.JSONDecodeError:
+        return None
+    if isinstance(json_data, dict):
+        return [json_data]
+    if isinstance(json_data, list):
+        return json_data
+    return None
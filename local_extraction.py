@@ -0,0 +1,181 @@
+import re
+
+import fitz  # PyMuPDF
+
+# 사업소득 표 열 이름 중 EXTRACTION_FIELDS 와 표기가 다른 것 (공백 제거 후 비교)
+FIELD_ALIASES = {
+    '수입종류구분코드': '수입금액 구분코드',
+    '수입금액구분': '수입금액 구분코드',
+    '업종': '업종 코드',
+    '사업형태': '사업 형태',
+    '기장의무': '기장 의무',
+    '노란우산공제': '소기업소상공인공제부금 (노란우산공제)',
+}
+
+# 사업소득 표 행에만 있는 필드 (나머지는 문서 전체 공통 값으로 모든 행에 복사)
+TABLE_ROW_FIELDS = [
+    '사업자 등록번호', '상호', '수입금액 구분코드', '업종 코드', '사업 형태', '기장 의무',
+    '경비율', '수입금액', '일반', '자가', '일반(기본)', '자가(초과)',
+]
+
+# 사업소득 표를 알아보는 기준 열
+TABLE_KEY_FIELDS = ('업종 코드', '수입금액')
+
+# 개인정보 필드 - GEMINI_PROMPT 와 같이 텍스트 레이어에 값이 있어도 항상 빈칸으로 둠 (상호는 마스킹 영역 밖)
+BLANK_FIELDS = ('성명', '생년월일', '사업자 등록번호', '상호')
+
+# 모든 행에 값이 있어야 하는 문서 공통 필드 - 없으면 로컬 추출 결과를 쓰지 않고 Vertex AI 로 처리
+REQUIRED_SUMMARY_FIELDS = ('안내유형', '기장의무')
+
+
+def normalize_label(text):
+    """라벨 비교용 - 공백/줄바꿈 제거"""
+    return re.sub(r'\s+', '', text or '')
+
+
+def clean_currency(value: str) -> str:
+    if not isinstance(value, str): return "0"
+    if value.strip() in ["", "없음", "N/A"]: return "0"
+    cleaned = re.sub(r"[^\d]", "", value)
+    return cleaned if cleaned else "0"
+
+
+def clean_business_code(value: str):
+    """'업종 코드'를 정제하여 6자리 숫자 코드를 반환합니다. 유효하지 않으면 None을 반환합니다."""
+    if not isinstance(value, str) or not value.strip():
+        return None
+    cleaned = re.sub(r'[^\d]', '', value)
+    return cleaned if len(cleaned) == 6 else None
+
+
+def _field_for_label(text, label_to_field):
+    label = normalize_label(text)
+    return label_to_field.get(label) or label_to_field.get(normalize_label(FIELD_ALIASES.get(label, '')))
+
+
+def _cell_text(value):
+    return ' '.join((value or '').split())
+
+
+def _income_table_rows(table_rows, label_to_field):
+    """표 하나가 사업소득 표이면 행 목록 반환 (아니면 None)
+
+    머리글이 두 줄(예: 경비율 아래 일반/자가)일 수 있어서 위에서부터 최대 두 줄까지
+    열 이름으로 보고, 아래 줄 이름이 필드에 해당하면 그것을 우선함
+    """
+    for header_rows in (1, 2):
+        if len(table_rows) <= header_rows:
+            return None
+        columns = {}
+        for column in range(len(table_rows[0])):
+            for row in reversed(table_rows[:header_rows]):
+                field = _field_for_label(row[column], label_to_field) if column < len(row) else None
+                if field in TABLE_ROW_FIELDS and field not in columns.values():
+                    columns[column] = field
+                    break
+        if all(key in columns.values() for key in TABLE_KEY_FIELDS):
+            rows = []
+            for row in table_rows[header_rows:]:
+                values = {field: _cell_text(row[column]) for column, field in columns.items() if column < len(row)}
+                if any(values.values()):
+                    rows.append(values)
+            return rows
+    return None
+
+
+def _label_values(table_rows, label_to_field):
+    """라벨 셀 오른쪽 (없으면 아래) 셀을 값으로 보는 단일 값 필드 추출"""
+    values = {}
+    for row_index, row in enumerate(table_rows):
+        for column, cell in enumerate(row):
+            field = _field_for_label(cell, label_to_field)
+            if not field or field in TABLE_ROW_FIELDS or field in values:
+                continue
+            value = row[column + 1] if column + 1 < len(row) else None
+            if not _cell_text(value) and row_index + 1 < len(table_rows) and column < len(table_rows[row_index + 1]):
+                value = table_rows[row_index + 1][column]
+            if _cell_text(value) and not _field_for_label(value, label_to_field):
+                values[field] = _cell_text(value)
+    return values
+
+
+def extract_rows_from_text_layer(pdf_data, fields):
+    """마스킹된 PDF의 텍스트 레이어와 표 셀에서 EXTRACTION_FIELDS 행 목록 추출
+
+    사업소득 표의 각 행마다 객체 하나를 만들고 문서 공통 값(안내유형, 중간예납세액 등)을
+    모든 행에 복사함 (GEMINI_PROMPT 3단계와 같은 구조). 텍스트 레이어나 사업소득 표를
+    찾지 못하면 None 반환. BLANK_FIELDS 는 항상 빈칸
+    """
+    # '기장의무'(공통)와 '기장 의무'(표 열)처럼 공백만 다른 필드가 있어서 라벨 대응표를 따로 둠
+    table_label_to_field = {normalize_label(field): field for field in fields if field in TABLE_ROW_FIELDS}
+    summary_label_to_field = {normalize_label(field): field for field in fields if field not in TABLE_ROW_FIELDS}
+
+    doc = fitz.open(stream=pdf_data, filetype='pdf')
+    try:
+        if not any(page.get_text().strip() for page in doc):
+            return None
+
+        income_rows = []
+        common_values = {}
+        for page in doc:
+            for table in page.find_tables().tables:
+                table_rows = table.extract()
+                rows = _income_table_rows(table_rows, table_label_to_field)
+                if rows is not None:
+                    income_rows.extend(rows)
+                else:
+                    for field, value in _label_values(table_rows, summary_label_to_field).items():
+                        common_values.setdefault(field, value)
+    finally:
+        doc.close()
+
+    if not income_rows:
+        return None
+
+    return [
+        {field: '' if field in BLANK_FIELDS else row.get(field, common_values.get(field, '')) for field in fields}
+        for row in income_rows
+    ]
+
+
+def validate_extracted_rows(rows, currency_fields, required_fields=REQUIRED_SUMMARY_FIELDS):
+    """메인 루프와 같은 규칙으로 검증 - (통과 여부, 실패 사유)
+
+    - 필수 공통 필드(required_fields): 비어 있으면 안 됨
+    - 업종 코드: 숫자만 남겼을 때 6자리
+    - 이자/기타: 비어 있거나 X/O
+    - 금액 필드: 숫자/쉼표/원/공백 외의 문자가 없어야 함, 수입금액은 0보다 커야 함
+    """
+    if not rows:
+        return False, '추출된 행 없음'
+
+    for row_number, row in enumerate(rows, 1):
+        for field in required_fields:
+            if not str(row.get(field, '')).strip():
+                return False, f"행 {row_number}: 필수 필드 '{field}' 없음"
+        if clean_business_code(row.get('업종 코드', '')) is None:
+            return False, f"행 {row_number}: 유효하지 않은 업종 코드 '{row.get('업종 코드', '')}'"
+        for field in ('이자', '기타'):
+            value = str(row.get(field, '')).strip().upper()
+            if value and value not in ('X', 'O'):
+                return False, f"행 {row_number}: 필드 '{field}'에 유효하지 않은 값 '{value}'"
+        for field in currency_fields:
+            value = str(row.get(field, '')).strip()
+            if value and value not in ('없음', 'N/A') and re.search(r'[^\d,\s원\-]', value):
+                return False, f"행 {row_number}: 금액 필드 '{field}'에 숫자가 아닌 값 '{value}'"
+        if clean_currency(str(row.get('수입금액', ''))) == '0':
+            return False, f"행 {row_number}: 수입금액 없음"
+    return True, None
+
+
+def normalize_extracted_rows(rows, currency_fields):
+    """검증을 통과한 행을 메인 루프가 기대하는 형태로 정리 (업종 코드 6자리, X/O 대문자, 금액 숫자만)"""
+    for row in rows:
+        row['업종 코드'] = clean_business_code(row['업종 코드'])
+        for field in ('이자', '기타'):
+            if field in row:
+                row[field] = str(row[field]).strip().upper()
+        for field in currency_fields:
+            if field in row:
+                row[field] = clean_currency(str(row[field]))
+    return rows
@@ -0,0 +1,129 @@
+import os
+import json
+import sqlite3
+import threading
+from contextlib import closing
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS mappings (
+    number INTEGER PRIMARY KEY,   -- 마스킹 파일 번호 = OCR 처리 순서
+    original_name TEXT NOT NULL,
+    masked_name TEXT NOT NULL,
+    code TEXT                     -- 원본 파일명 앞 4글자 (비어 있으면 NULL)
+);
+CREATE INDEX IF NOT EXISTS mappings_code ON mappings (code);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def file_code(filename):
+    """파일명에서 .pdf 를 뗀 앞 4글자 코드 (파일명이 4글자보다 짧으면 전체, 공백뿐이면 None)"""
+    file_base = filename.replace('.pdf', '')
+    code = file_base[:4] if len(file_base) >= 4 else file_base
+    return code if code.strip() else None
+
+
+def _row_to_info(row):
+    number, original_name, code = row
+    return {'order': number, 'code': code, 'original_filename': original_name}
+
+
+class MappingIndex:
+    """file_mapping.json 내용을 SQLite 로 색인 (번호 → 원본 파일명 → 코드)
+
+    JSON 파일이 기준이고, 파일의 크기/수정 시각이 색인할 때와 다르면
+    다음 조회 시 한 번만 다시 읽어서 색인을 갱신함
+    """
+
+    def __init__(self, db_path, mapping_path):
+        self.db_path = db_path
+        self.mapping_path = mapping_path
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.db_path)
+        connection.executescript(SCHEMA)
+        return connection
+
+    def _mapping_signature(self):
+        try:
+            stat = os.stat(self.mapping_path)
+        except FileNotFoundError:
+            return None
+        return f'{stat.st_size}:{stat.st_mtime_ns}'
+
+    def replace(self, file_mapping):
+        """매핑 전체 교체 (file_mapping.json 을 쓴 직후 호출 - JSON을 다시 파싱하지 않음)"""
+        rows = [
+            (mapping['number'], mapping['original_name'], mapping['masked_name'],
+             file_code(mapping['original_name']))
+            for mapping in file_mapping
+        ]
+        with self._lock, closing(self._connect()) as connection, connection:
+            connection.execute('DELETE FROM mappings')
+            connection.executemany('INSERT INTO mappings VALUES (?, ?, ?, ?)', rows)
+            connection.execute('INSERT OR REPLACE INTO meta VALUES (?, ?)',
+                               ('mapping_signature', self._mapping_signature() or ''))
+
+    def upsert(self, mapping):
+        """매핑 한 건 추가/교체 (file_mapping.json 을 쓴 직후 호출 - 감시 모드에서 파일 하나씩 반영)"""
+        row = (mapping['number'], mapping['original_name'], mapping['masked_name'],
+               file_code(mapping['original_name']))
+        with self._lock, closing(self._connect()) as connection, connection:
+            connection.execute('DELETE FROM mappings WHERE number = ? OR original_name = ?',
+                               (mapping['number'], mapping['original_name']))
+            connection.execute('INSERT INTO mappings VALUES (?, ?, ?, ?)', row)
+            connection.execute('INSERT OR REPLACE INTO meta VALUES (?, ?)',
+                               ('mapping_signature', self._mapping_signature() or ''))
+
+    def sync(self):
+        """file_mapping.json 이 색인 이후 바뀌었으면 다시 읽어서 반영 (JSON이 없으면 False)"""
+        signature = self._mapping_signature()
+        if signature is None:
+            return False
+        with closing(self._connect()) as connection:
+            row = connection.execute("SELECT value FROM meta WHERE key = 'mapping_signature'").fetchone()
+        if row is None or row[0] != signature:
+            with open(self.mapping_path, 'r', encoding='utf-8') as f:
+                self.replace(json.load(f))
+        return True
+
+    def page(self, after=None, limit=None, code=None, number=None):
+        """번호 순 개인정보 목록 한 페이지 - after 이후 번호부터 limit 개, code/number 로 조회 가능
+
+        반환값: {'personal_info': [...], 'total': 조건에 맞는 전체 개수, 'next_after': 다음 페이지 시작점}
+        """
+        conditions = ['code IS NOT NULL']
+        params = []
+        if code is not None:
+            conditions.append('code = ?')
+            params.append(code)
+        if number is not None:
+            conditions.append('number = ?')
+            params.append(number)
+        where = ' AND '.join(conditions)
+
+        with closing(self._connect()) as connection:
+            total = connection.execute(f'SELECT COUNT(*) FROM mappings WHERE {where}', params).fetchone()[0]
+
+            page_conditions = where
+            page_params = list(params)
+            if after is not None:
+                page_conditions += ' AND number > ?'
+                page_params.append(after)
+            query = f'SELECT number, original_name, code FROM mappings WHERE {page_conditions} ORDER BY number'
+            if limit is not None:
+                query += ' LIMIT ?'
+                page_params.append(limit + 1)  # 다음 페이지가 있는지 확인용으로 하나 더
+            rows = connection.execute(query, page_params).fetchall()
+
+        has_more = limit is not None and len(rows) > limit
+        personal_info = [_row_to_info(row) for row in rows[:limit]]
+        return {
+            'personal_info': personal_info,
+            'total': total,
+            'next_after': personal_info[-1]['order'] if personal_info and has_more else None
+        }
@@ -0,0 +1,68 @@
+import os
+import json
+
+
+def append_journal_entry(journal_path, entry):
+    """저널에 완료된 파일 한 줄 추가 후 fsync
+
+    O_APPEND 로 한 줄을 한 번에 쓰므로 여러 워커 프로세스가 같은 저널에
+    동시에 추가해도 줄이 섞이지 않음
+    """
+    line = (json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8')
+    fd = os.open(journal_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class MaskingJournal:
+    """마스킹 실행 저널 (append-only JSON Lines)
+
+    첫 줄은 실행 계획 {'type': 'plan', ...}, 이후 줄은 마스킹이 끝난 파일마다
+    {'type': 'file', 'original_name', 'masked_name', 'source_sha256', ...} 가 하나씩 추가됨.
+    실행이 정상 종료되면 삭제되므로, 남아 있는 저널은 중단된 실행을 뜻함
+    """
+
+    def __init__(self, journal_path):
+        self.journal_path = journal_path
+
+    def exists(self):
+        return os.path.exists(self.journal_path)
+
+    def start(self, plan):
+        """새 실행 계획으로 저널 시작 (이전 저널은 덮어씀)"""
+        tmp_path = f'{self.journal_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'type': 'plan', **plan}, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.journal_path)
+
+    def load(self):
+        """(실행 계획, 원본 파일명 → 완료 항목) 반환 - 저널이 없으면 (None, {})
+
+        마지막 줄이 쓰다 만 줄이면 (프로세스가 쓰는 도중에 죽은 경우) 무시함
+        """
+        if not self.exists():
+            return None, {}
+
+        plan = None
+        committed = {}
+        with open(self.journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record.get('type') == 'plan':
+                    plan = record
+                elif record.get('type') == 'file':
+                    committed[record['original_name']] = record
+        return plan, committed
+
+    def finish(self):
+        """실행 완료 - 매니페스트/매핑 저장 후 저널 삭제"""
+        if self.exists():
+            os.remove(self.journal_path)
@@ -0,0 +1,182 @@
+import fitz  # PyMuPDF
+from collections import OrderedDict
+
+# 기본 앵커 설정 - 라벨 텍스트와 기준 양식에서의 라벨 좌상단 위치(ref_x, ref_y)
+# 실제 라벨 위치가 기준에서 (dx, dy) 만큼 밀려 있으면 마스킹 영역도 같은 만큼 이동
+# 양식이 바뀌면 PDFProcessor.calibrate_masking_anchors() 로 기준 위치를 다시 측정
+DEFAULT_MASKING_ANCHORS = [
+    {'labels': ['성명'], 'ref_x': 140, 'ref_y': 122,
+     'area': {'x1': 190, 'y1': 122, 'x2': 270, 'y2': 135}},   # 이름
+    {'labels': ['생년월일'], 'ref_x': 370, 'ref_y': 122,
+     'area': {'x1': 430, 'y1': 122, 'x2': 510, 'y2': 135}},   # 생년월일
+    {'labels': ['사업자 등록번호', '사업자등록번호'], 'ref_x': 60, 'ref_y': 238,
+     'area': {'x1': 60, 'y1': 255, 'x2': 170, 'y2': 355}},    # 사업자번호
+]
+
+# 어느 페이지에서든 라벨 옆 값을 지우는 개인정보 앵커 라벨
+PERSONAL_ANCHOR_LABELS = {'성명', '생년월일'}
+
+# 캐시된 앵커 위치와 실제 라벨 위치가 이 값(pt) 이내로 같아야 같은 레이아웃으로 인정
+LABEL_POSITION_TOLERANCE = 1.0
+
+
+def page_size_key(page):
+    """레이아웃 지문의 첫 부분 - 페이지 크기(pt, 정수 반올림)"""
+    return (round(page.rect.width), round(page.rect.height))
+
+
+def find_anchor_label(page, anchor, textpage):
+    """텍스트 레이어에서 앵커 라벨을 찾아 기준 위치에 가장 가까운 사각형 반환"""
+    best = None
+    for label in anchor['labels']:
+        for rect in page.search_for(label, textpage=textpage):
+            distance = abs(rect.x0 - anchor['ref_x']) + abs(rect.y0 - anchor['ref_y'])
+            if best is None or distance < best[0]:
+                best = (distance, label, rect)
+    return (best[1], best[2]) if best else None
+
+
+def personal_value_areas(page, anchors, textpage=None):
+    """성명/생년월일 라벨이 나오는 모든 위치에서 라벨 옆 값 영역 목록 반환
+
+    첫 페이지 양식 좌표와 관계없이 어느 페이지에 개인정보 블록이 찍혀도 지울 수 있도록
+    앵커의 (라벨 → 영역) 상대 위치를 라벨이 발견된 자리마다 그대로 적용함
+    """
+    areas = []
+    for anchor in anchors:
+        if not PERSONAL_ANCHOR_LABELS.intersection(anchor['labels']):
+            continue
+        area = anchor['area']
+        for label in anchor['labels']:
+            for rect in page.search_for(label, textpage=textpage):
+                dx = rect.x0 - anchor['ref_x']
+                dy = rect.y0 - anchor['ref_y']
+                areas.append({
+                    'x1': area['x1'] + dx, 'y1': area['y1'] + dy,
+                    'x2': area['x2'] + dx, 'y2': area['y2'] + dy
+                })
+    return areas
+
+
+class LayoutTemplateCache:
+    """레이아웃 지문(페이지 크기 + 처음 찾은 앵커 라벨 위치) → 마스킹 영역 캐시
+
+    조회할 때는 앵커 하나만 페이지 전체에서 검색해 지문을 만들고, 그 지문의 템플릿 하나만
+    나머지 앵커가 캐시된 자리에 그대로 있는지 확인함 (템플릿 수와 무관하게 조회 비용 일정).
+    캐시에 없으면 이미 찾은 앵커 결과를 재사용해 나머지 앵커만 검색하므로
+    일반 전체 검색보다 비용이 늘지 않음
+    """
+
+    def __init__(self, max_templates=256, max_per_page_size=16):
+        self.max_templates = max_templates
+        self.max_per_page_size = max_per_page_size
+        self.templates = OrderedDict()  # fingerprint → template (최근 사용 순)
+        self.page_size_counts = {}      # 페이지 크기 → 저장된 템플릿 수
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def fingerprint(size_key, label, rect):
+        """페이지 크기와 처음 찾은 앵커 라벨 위치(정수 반올림)로 레이아웃 지문 생성"""
+        return (size_key, label, round(rect[0]), round(rect[1]))
+
+    @staticmethod
+    def _label_at(page, textpage, label, rect):
+        """캐시된 위치 주변만 검색해서 라벨이 같은 자리에 있는지 확인"""
+        tolerance = LABEL_POSITION_TOLERANCE
+        clip = fitz.Rect(rect) + (-tolerance, -tolerance, tolerance, tolerance)
+        return any(
+            abs(found.x0 - rect[0]) <= tolerance and abs(found.y0 - rect[1]) <= tolerance
+            for found in page.search_for(label, clip=clip, textpage=textpage)
+        )
+
+    def lookup(self, page, textpage, key_anchor):
+        """지문이 같은 템플릿 하나만 확인해서 나머지 앵커 라벨이 그대로 있으면 마스킹 영역 반환
+
+        key_anchor: 처음 찾은 앵커의 (라벨, 사각형)
+        """
+        label, rect = key_anchor
+        fingerprint = self.fingerprint(page_size_key(page), label, rect)
+        template = self.templates.get(fingerprint)
+        if template is not None and all(
+                self._label_at(page, textpage, other_label, other_rect)
+                for other_label, other_rect in template['anchor_rects'][1:]):
+            self.templates.move_to_end(fingerprint)
+            self.hits += 1
+            return template['areas']
+        self.misses += 1
+        return None
+
+    def store(self, page, anchor_rects, areas):
+        """새 레이아웃 템플릿 저장 - anchor_rects 의 첫 항목이 지문 앵커
+
+        페이지 크기별 템플릿 수와 전체 템플릿 수를 넘으면 오래 안 쓴 템플릿부터 제거
+        """
+        size_key = page_size_key(page)
+        label, rect = anchor_rects[0]
+        fingerprint = self.fingerprint(size_key, label, rect)
+        if fingerprint not in self.templates:
+            self.page_size_counts[size_key] = self.page_size_counts.get(size_key, 0) + 1
+        self.templates[fingerprint] = {
+            'page_size': size_key,
+            'anchor_rects': anchor_rects,
+            'areas': areas
+        }
+        self.templates.move_to_end(fingerprint)
+        if self.page_size_counts[size_key] > self.max_per_page_size:
+            oldest = next(key for key, template in self.templates.items() if template['page_size'] == size_key)
+            self._evict(oldest)
+        while len(self.templates) > self.max_templates:
+            self._evict(next(iter(self.templates)))
+
+    def _evict(self, fingerprint):
+        template = self.templates.pop(fingerprint)
+        self.page_size_counts[template['page_size']] -= 1
+        if not self.page_size_counts[template['page_size']]:
+            del self.page_size_counts[template['page_size']]
+
+    def resolve(self, page, anchors):
+        """페이지에 적용할 마스킹 영역과 출처('cached' | 'searched' | 'default') 반환
+
+        앵커 라벨을 찾지 못한 영역은 기본 좌표를 그대로 사용함 (스캔본 등 텍스트 레이어 없음)
+        """
+        textpage = page.get_textpage()
+
+        # 지문용으로 앞에서부터 처음 찾히는 앵커까지만 검색 (캐시에 없으면 아래에서 그대로 재사용)
+        found = []
+        for anchor in anchors:
+            found.append(find_anchor_label(page, anchor, textpage))
+            if found[-1] is not None:
+                break
+        if found and found[-1] is not None:
+            areas = self.lookup(page, textpage, found[-1])
+            if areas is not None:
+                return areas, 'cached'
+
+        areas = []
+        anchor_rects = []
+        for index, anchor in enumerate(anchors):
+            result = found[index] if index < len(found) else find_anchor_label(page, anchor, textpage)
+            area = anchor['area']
+            if result is None:
+                areas.append(dict(area))
+                continue
+
+            label, rect = result
+            dx = rect.x0 - anchor['ref_x']
+            dy = rect.y0 - anchor['ref_y']
+            areas.append({
+                'x1': area['x1'] + dx, 'y1': area['y1'] + dy,
+                'x2': area['x2'] + dx, 'y2': area['y2'] + dy
+            })
+            anchor_rects.append((label, tuple(rect)))
+
+        if not anchor_rects:
+            return areas, 'default'
+
+        self.store(page, anchor_rects, areas)
+        return areas, 'searched'
+
+
+# 프로세스별 템플릿 캐시 (프로세스 풀 워커마다 하나씩 유지됨)
+template_cache = LayoutTemplateCache()
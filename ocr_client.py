@@ -0,0 +1,263 @@
+import os
+import time
+import hashlib
+import datetime
+import threading
+
+from vertexai.generative_models import GenerationConfig, GenerativeModel, Part
+
+from rate_limiter import RateLimiter, classify_error
+
+OCR_MODEL_NAME = "gemini-2.5-flash"
+
+# 컨텍스트 캐시 이름 (뒤에 프롬프트 해시를 붙여 프롬프트가 바뀌면 다른 캐시가 됨)
+PROMPT_CACHE_NAME_PREFIX = 'pdf-ocr-prompt-'
+PROMPT_CACHE_REFRESH_SECONDS = 600  # 만료까지 이보다 적게 남으면 TTL 연장 (감시 모드처럼 오래 도는 실행용)
+
+
+def build_response_schema(fields):
+    """추출 필드로 만든 응답 스키마 - 모든 필드를 문자열로 가진 객체의 배열 (Vertex AI 스키마 형식)"""
+    return {
+        'type': 'ARRAY',
+        'items': {
+            'type': 'OBJECT',
+            'properties': {field: {'type': 'STRING'} for field in fields},
+            'required': list(fields)
+        }
+    }
+
+
+def json_generation_config(fields):
+    """응답을 스키마에 맞는 JSON 으로만 생성하도록 하는 설정 (코드 블록/설명 없이 본문 전체가 JSON)"""
+    return GenerationConfig(response_mime_type='application/json', response_schema=build_response_schema(fields))
+
+
+def read_document(file_path, file_data=None):
+    """OCR 요청에 보낼 문서 바이트 (이미 받은 바이트가 있으면 그대로, 없으면 파일을 한 번만 읽음)"""
+    if file_data is not None:
+        return file_data
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"❌ 오류: PDF 파일을 찾을 수 없습니다. 경로: {file_path}")
+    with open(file_path, 'rb') as f:
+        return f.read()
+
+
+class VertexOCRClient:
+    """실행 전체에서 하나만 만들어 쓰는 Vertex AI OCR 클라이언트
+
+    GenerativeModel 은 처음 요청할 때 예측 서비스 클라이언트(gRPC 채널, 인증 토큰)를
+    만들어 모델 객체에 캐시하므로, 모델 하나를 재사용하면 요청/재시도마다 채널 연결과
+    인증 설정을 다시 하지 않음. vertexai.init() 이후에 만들어야 함
+    모든 요청은 rate_limiter 를 거치므로 이 클라이언트를 같이 쓰는 작업자 전체가
+    같은 RPM/TPM 한도와 회로 차단기를 공유함
+    response_cache(ResponseCache) 가 있으면 호출하는 쪽에서 요청 전에 캐시된 응답을 먼저 찾음
+    generation_config 는 모든 요청에 적용됨 (예: json_generation_config - 스키마 기반 JSON 출력)
+    enable_prompt_cache 를 호출하면 고정 프롬프트를 컨텍스트 캐시로 한 번 등록하고 요청에는 문서만 보냄
+    """
+
+    def __init__(self, model_name=OCR_MODEL_NAME, rate_limiter=None, response_cache=None, generation_config=None):
+        self.model_name = model_name
+        self.generation_config = generation_config
+        self.model = GenerativeModel(model_name, generation_config=generation_config)
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.response_cache = response_cache
+        self.request_count = 0
+
+        self.prompt_cache = None  # {'prompt', 'content', 'model', 'ttl', 'baseline_every', 'refresh_at'}
+        self.prompt_cache_counters = {
+            'cached_tokens': 0,  # usage_metadata.cached_content_token_count 합계
+            'with_cache': [0, 0.0], 'without_cache': [0, 0.0]  # [응답 수, 누적 지연 ms]
+        }
+        self._prepared = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def build_contents(file_data, mime_type, prompt):
+        """요청 내용 [문서 Part, 프롬프트] - 문서당 한 번만 만들어 재시도에도 그대로 사용"""
+        return [Part.from_data(data=file_data, mime_type=mime_type), prompt]
+
+    def enable_prompt_cache(self, prompt, ttl_minutes=60, baseline_every=0):
+        """prompt 를 Vertex AI 컨텍스트 캐시(system instruction)로 등록 - 이후 같은 프롬프트 요청은 문서만 보냄
+
+        캐시 이름에 프롬프트 해시를 넣어 두고, 같은 이름의 캐시가 남아 있으면 TTL 만 늘려서 재사용.
+        만료됐거나 이름이 다른 (프롬프트가 바뀐) 예전 캐시만 삭제하고, 같은 이름의 다른 캐시는
+        동시에 실행 중인 작업(감시 모드 등)이 쓰고 있을 수 있으므로 그대로 두어 TTL 로 만료되게 함.
+        baseline_every 가 N 이면 N번째 요청마다 프롬프트 전체를 보내 캐시 유무에 따른 지연 차이를 측정.
+        최소 토큰 수 미달 등으로 캐시를 만들 수 없으면 예외 발생 (호출하는 쪽에서 기존 방식으로 계속)
+        """
+        from vertexai.preview import caching
+        from vertexai.preview.generative_models import GenerativeModel as CachedContentModel
+
+        ttl = datetime.timedelta(minutes=ttl_minutes)
+        name = PROMPT_CACHE_NAME_PREFIX + hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:16]
+        content = None
+        now = datetime.datetime.now(datetime.timezone.utc)
+        for existing in caching.CachedContent.list():
+            if not (existing.display_name or '').startswith(PROMPT_CACHE_NAME_PREFIX):
+                continue
+            expired = existing.expire_time is not None and existing.expire_time <= now
+            if existing.display_name != name or expired:
+                existing.delete()
+            elif content is None and existing.model_name.endswith(self.model_name):
+                existing.update(ttl=ttl)
+                content = existing
+        if content is None:
+            content = caching.CachedContent.create(model_name=self.model_name, system_instruction=prompt,
+                                                   ttl=ttl, display_name=name)
+
+        self.prompt_cache = {
+            'prompt': prompt,
+            'content': content,
+            'model': CachedContentModel.from_cached_content(cached_content=content,
+                                                            generation_config=self.generation_config),
+            'ttl': ttl,
+            'baseline_every': baseline_every,
+            'refresh_at': time.monotonic() + ttl.total_seconds() - PROMPT_CACHE_REFRESH_SECONDS
+        }
+        return content
+
+    def _keep_prompt_cache_alive(self, cache):
+        with self._lock:
+            if time.monotonic() < cache['refresh_at']:
+                return
+            cache['content'].update(ttl=cache['ttl'])
+            cache['refresh_at'] = time.monotonic() + cache['ttl'].total_seconds() - PROMPT_CACHE_REFRESH_SECONDS
+
+    @staticmethod
+    def document_part(file_data, mime_type):
+        return Part.from_data(data=file_data, mime_type=mime_type)
+
+    def prepare(self, file_data, mime_type, prompt):
+        """요청에 쓸 (모델, 요청 내용) - 프롬프트가 컨텍스트 캐시에 있으면 캐시 모델에 문서만 보냄"""
+        return self.prepare_contents([self.document_part(file_data, mime_type)], prompt)
+
+    def prepare_contents(self, parts, prompt, instructions=()):
+        """parts(문서 Part, 구분 텍스트 등) 뒤에 프롬프트와 추가 지시를 붙인 (모델, 요청 내용)
+
+        프롬프트가 컨텍스트 캐시에 있으면 캐시 모델을 쓰고 프롬프트는 빼고 보냄
+        """
+        cache = self.prompt_cache
+        if cache is not None and cache['prompt'] == prompt:
+            with self._lock:
+                self._prepared += 1
+                baseline = cache['baseline_every'] and self._prepared % cache['baseline_every'] == 0
+            if not baseline:
+                self._keep_prompt_cache_alive(cache)
+                return cache['model'], list(parts) + list(instructions)
+        return self.model, list(parts) + [prompt] + list(instructions)
+
+    def _record(self, response, estimated_tokens, model, started_at):
+        elapsed_ms = (time.perf_counter() - started_at) * 1000
+        usage = getattr(response, 'usage_metadata', None)
+        self.rate_limiter.record_success(estimated_tokens, getattr(usage, 'total_token_count', None))
+        with_cache = model is not self.model
+        with self._lock:
+            counters = self.prompt_cache_counters
+            latency = counters['with_cache' if with_cache else 'without_cache']
+            latency[0] += 1
+            latency[1] += elapsed_ms
+            counters['cached_tokens'] += getattr(usage, 'cached_content_token_count', 0) or 0
+        return response
+
+    def _count_request(self):
+        """요청 수 증가 (감시 모드에서는 여러 스레드가 동시에 호출)"""
+        with self._lock:
+            self.request_count += 1
+
+    def generate(self, contents, estimated_tokens=0, model=None, generation_config=None):
+        """동기 호출 - 한도 안에서 요청을 보내고 결과(성공/오류 종류)를 제한기에 기록
+
+        generation_config 를 주면 이 요청만 모델 기본 설정 대신 사용 (예: 묶음 요청 스키마)
+        """
+        model = model or self.model
+        self.rate_limiter.acquire(estimated_tokens)
+        self._count_request()
+        started_at = time.perf_counter()
+        try:
+            response = model.generate_content(contents, generation_config=generation_config)
+        except Exception as e:
+            self.rate_limiter.record_failure(classify_error(e))
+            raise
+        return self._record(response, estimated_tokens, model, started_at)
+
+    async def generate_async(self, contents, estimated_tokens=0, model=None, generation_config=None):
+        """비동기 호출 - 비동기 채널은 처음 호출한 이벤트 루프에 묶이므로 한 루프에서만 사용"""
+        model = model or self.model
+        await self.rate_limiter.acquire_async(estimated_tokens)
+        self._count_request()
+        started_at = time.perf_counter()
+        try:
+            response = await model.generate_content_async(contents, generation_config=generation_config)
+        except Exception as e:
+            self.rate_limiter.record_failure(classify_error(e))
+            raise
+        return self._record(response, estimated_tokens, model, started_at)
+
+    @staticmethod
+    def _chunk_text(chunk):
+        """스트리밍 응답 조각의 텍스트 (사용량/종료 정보만 있는 조각은 빈 문자열)"""
+        try:
+            return chunk.text
+        except ValueError:
+            return ''
+
+    def generate_stream(self, contents, estimated_tokens=0, model=None, on_text=None):
+        """동기 스트리밍 호출 - 응답 조각이 올 때마다 on_text(조각) 호출, 전체 응답 텍스트 반환"""
+        model = model or self.model
+        self.rate_limiter.acquire(estimated_tokens)
+        self._count_request()
+        started_at = time.perf_counter()
+        pieces = []
+        chunk = None
+        try:
+            for chunk in model.generate_content(contents, stream=True):
+                text = self._chunk_text(chunk)
+                if text:
+                    pieces.append(text)
+                    if on_text:
+                        on_text(text)
+        except Exception as e:
+            self.rate_limiter.record_failure(classify_error(e))
+            raise
+        self._record(chunk, estimated_tokens, model, started_at)  # 사용량은 마지막 조각에 있음
+        return ''.join(pieces)
+
+    async def generate_stream_async(self, contents, estimated_tokens=0, model=None, on_text=None):
+        """비동기 스트리밍 호출 - 조각을 받는 사이에도 다른 문서의 요청/후처리가 진행됨"""
+        model = model or self.model
+        await self.rate_limiter.acquire_async(estimated_tokens)
+        self._count_request()
+        started_at = time.perf_counter()
+        pieces = []
+        chunk = None
+        try:
+            async for chunk in await model.generate_content_async(contents, stream=True):
+                text = self._chunk_text(chunk)
+                if text:
+                    pieces.append(text)
+                    if on_text:
+                        on_text(text)
+        except Exception as e:
+            self.rate_limiter.record_failure(classify_error(e))
+            raise
+        self._record(chunk, estimated_tokens, model, started_at)
+        return ''.join(pieces)
+
+    def prompt_cache_stats(self):
+        """컨텍스트 캐시 통계 - 캐시로 대신한 입력 토큰 수와 캐시 유무별 평균 응답 지연"""
+        with self._lock:
+            counters = self.prompt_cache_counters
+            with_cache, without_cache = list(counters['with_cache']), list(counters['without_cache'])
+            stats = {
+                'enabled': self.prompt_cache is not None,
+                'input_tokens_saved': counters['cached_tokens'],
+                'requests_with_cache': with_cache[0],
+                'requests_without_cache': without_cache[0],
+            }
+        stats['avg_latency_ms_with_cache'] = round(with_cache[1] / with_cache[0], 1) if with_cache[0] else None
+        stats['avg_latency_ms_without_cache'] = \
+            round(without_cache[1] / without_cache[0], 1) if without_cache[0] else None
+        if with_cache[0] and without_cache[0]:
+            stats['latency_ms_difference'] = round(stats['avg_latency_ms_without_cache']
+                                                   - stats['avg_latency_ms_with_cache'], 1)
+        return stats
@@ -0,0 +1,52 @@
+import re
+
+# GEMINI_PROMPT 2단계의 사업소득 표 제목 (공백 유무와 관계없이 비교)
+TARGET_TABLE_HEADINGS = ['사업장별 수입금액']
+
+# GEMINI_PROMPT 1단계의 단일 값 필드 라벨 - 이 라벨이 있는 페이지도 함께 보냄
+# (성명/생년월일은 마스킹 대상이라 기준에서 제외)
+SUMMARY_FIELD_LABELS = [
+    '안내유형', '기장의무', '중간예납세액', '원천징수세액',
+    '국민연금보험료', '개인연금저축', '소기업소상공인공제부금',
+]
+
+# 표 행이 이어지는 페이지 판별용 (사업자 등록번호 / 6자리 업종 코드)
+BUSINESS_NUMBER_PATTERN = re.compile(r'(?<!\d)\d{3}-\d{2}-\d{5}(?!\d)')
+INDUSTRY_CODE_PATTERN = re.compile(r'(?<!\d)\d{6}(?!\d)')
+
+
+def _without_spaces(text):
+    return re.sub(r'\s+', '', text)
+
+
+def has_table_rows(text):
+    """사업소득 표의 행처럼 보이는 값이 있는지 (사업자 등록번호 또는 6자리 업종 코드)"""
+    return bool(BUSINESS_NUMBER_PATTERN.search(text) or INDUSTRY_CODE_PATTERN.search(text))
+
+
+def select_target_pages(doc):
+    """텍스트 레이어로 OCR 대상 페이지 번호 목록 결정
+
+    - 사업소득 표 제목이 있는 페이지와, 그 뒤로 표 행이 계속 이어지는 페이지 (제목 없는 연속 페이지)
+    - 단일 값 필드 라벨이 있는 페이지
+    텍스트 레이어가 없거나 (스캔본) 기준에 맞는 페이지가 하나도 없으면 기존처럼 첫 페이지만 사용
+    """
+    headings = [_without_spaces(heading) for heading in TARGET_TABLE_HEADINGS]
+    selected = []
+    in_table = False
+
+    for page in doc:
+        text = page.get_text()
+        compact_text = _without_spaces(text)
+        has_heading = any(heading in compact_text for heading in headings)
+        has_summary = any(label in compact_text for label in SUMMARY_FIELD_LABELS)
+
+        if has_heading:
+            in_table = True
+        elif in_table and not has_table_rows(text):
+            in_table = False
+
+        if has_heading or has_summary or in_table:
+            selected.append(page.number)
+
+    return selected or [0]
@@ -2,16 +2,340 @@ import fitz  # PyMuPDF
 import os
 import json
 import time
+import mmap
+import hashlib
 import logging
+import sqlite3
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime
 
+from batch_scheduler import AdaptiveBatchScheduler, current_rss_bytes, release_memory
+from folder_index import FolderIndex
+from mapping_index import MappingIndex, file_code
+from masking_journal import MaskingJournal, append_journal_entry
+from source_hashes import SourceHashIndex
+from masking_templates import DEFAULT_MASKING_ANCHORS, find_anchor_label, personal_value_areas, template_cache
+from page_selection import BUSINESS_NUMBER_PATTERN, select_target_pages
+
 logger = logging.getLogger(__name__)
 
+MASKING_MANIFEST_NAME = 'masking_manifest.json'
+MASKING_ANCHORS_NAME = 'masking_anchors.json'
+FILE_MAPPING_NAME = 'file_mapping.json'
+FILE_MAPPING_INDEX_NAME = 'file_mapping.sqlite3'
+MASKING_JOURNAL_NAME = 'masking_journal.jsonl'
+WATCH_JOURNAL_NAME = 'watch_journal.jsonl'
+WATCH_FLUSH_EVERY = 50  # 감시 모드에서 매니페스트/file_mapping.json 을 다시 쓰는 파일 수 간격
+SOURCE_HASHES_NAME = 'source_hashes.sqlite3'
+
+# 마스킹 결과 출력 형식별 확장자
+MASKED_OUTPUT_EXTENSIONS = {
+    'pdf': '.pdf',        # 벡터 PDF (기본)
+    'image-pdf': '.pdf',  # 흑백 래스터 이미지 한 장짜리 PDF
+    'png': '.png',
+    'jpeg': '.jpg',
+}
+
+def masked_filename(number, output_options=None):
+    """출력 형식에 맞는 마스킹 결과 파일명 (예: 3.pdf, 3.jpg)"""
+    output_format = (output_options or {}).get('output_format', 'pdf')
+    return f"{number}{MASKED_OUTPUT_EXTENSIONS[output_format]}"
+
+def is_masked_output(filename):
+    """masked-pdfs 폴더의 마스킹 결과 파일인지 확인 (매핑/매니페스트 JSON 제외)"""
+    return os.path.splitext(filename)[1].lower() in set(MASKED_OUTPUT_EXTENSIONS.values())
+
+@contextmanager
+def open_source_buffer(input_path):
+    """원본 PDF를 메모리 매핑해 memoryview로 제공 (파일을 통째로 복사해 읽지 않음)"""
+    with open(input_path, 'rb') as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # 빈 파일은 매핑할 수 없음 - PDF 열기 단계에서 오류 처리됨
+            yield b''
+            return
+        view = memoryview(mapped)
+        try:
+            yield view
+        finally:
+            view.release()
+            mapped.close()
+
+def resolve_page_areas(page, redaction_areas, output_options):
+    """페이지에 적용할 마스킹 영역 결정
+    
+    output_options['anchors'] 가 있으면 텍스트 라벨 기준으로 위치를 보정하고
+    (레이아웃별 템플릿 캐시 사용), 없으면 고정 좌표를 그대로 사용
+    """
+    anchors = output_options.get('anchors')
+    if not anchors:
+        return redaction_areas, 'fixed'
+    return template_cache.resolve(page, anchors)
+
+def mask_source(input_path, redaction_areas, output_options=None, output_path=None, source_sha256=None):
+    """원본 PDF를 마스킹해 output_path에 저장하거나 (없으면) 바이트로 반환
+    
+    output_options['compact'] 가 True 이면 마스킹 전에 대상 페이지만 남기고
+    사용하지 않는 객체/폰트/이미지를 정리하고 스트림을 압축해서 저장
+    output_options['page_selection'] 이 'target' 이면 텍스트 레이어로 찾은 대상 페이지를 모두 보냄
+    (개인정보 블록을 양식 좌표로 지우는 첫 페이지는 항상 포함)
+    source_sha256 을 주면 (원본 해시 색인에 있는 값) 원본 전체를 다시 읽어 해싱하지 않음
+    
+    반환값: {'data': 마스킹된 바이트 또는 None, 'source_size', 'source_sha256', 'layout',
+             'pages': 원본 기준 출력 페이지 번호 목록,
+             'stage_ms': 단계별 처리 시간 {'open', 'redact', 'insert', 'save'}}
+    """
+    output_options = output_options or {}
+    result = {'data': None, 'layout': None}
+    stage_ms = result['stage_ms'] = {'open': 0.0, 'redact': 0.0, 'insert': 0.0, 'save': 0.0}
+    stage_start = time.perf_counter()
+    
+    def end_stage(stage):
+        nonlocal stage_start
+        now = time.perf_counter()
+        stage_ms[stage] = round(stage_ms[stage] + (now - stage_start) * 1000, 2)
+        stage_start = now
+    
+    # 메모리 매핑된 원본 하나로 해시 계산과 PDF 열기를 같이 처리
+    with open_source_buffer(input_path) as source_data:
+        result['source_size'] = len(source_data)
+        result['source_sha256'] = source_sha256 or hashlib.sha256(source_data).hexdigest()
+        
+        # PDF 대상 페이지(기본: 첫 페이지)만 마스킹 처리
+        doc = fitz.open(stream=source_data, filetype='pdf')
+        try:
+            if len(doc) > 0:
+                # 사업소득 표/요약 필드가 있는 페이지만 보내거나 (target), 첫 페이지만 보냄
+                if output_options.get('page_selection') == 'target':
+                    source_pages = select_target_pages(doc)
+                    if 0 not in source_pages:
+                        source_pages = [0] + source_pages
+                else:
+                    source_pages = [0]
+                result['pages'] = source_pages
+                
+                if output_options.get('compact'):
+                    # 나머지 페이지를 먼저 버리고 대상 페이지만 마스킹
+                    doc.select(source_pages)
+                    page_numbers = list(range(len(source_pages)))
+                else:
+                    page_numbers = source_pages
+                end_stage('open')
+                
+                # 첫 페이지는 양식 좌표(또는 라벨 기준)로, 이어지는 페이지는 사업자 등록번호 패턴으로 마스킹하고,
+                # 모든 페이지에서 성명/생년월일 라벨 옆 값을 지움 (텍스트가 지워지기 전에 마스킹 영역 결정)
+                result['layout'] = 'pattern'
+                personal_anchors = output_options.get('anchors') or DEFAULT_MASKING_ANCHORS
+                for source_page, page_number in zip(source_pages, page_numbers):
+                    page = doc[page_number]
+                    page_areas = personal_value_areas(page, personal_anchors)
+                    if source_page == 0:
+                        form_areas, result['layout'] = resolve_page_areas(page, redaction_areas, output_options)
+                        page_areas = form_areas + page_areas
+                    else:
+                        redact_business_numbers(page)
+                    if page_areas:
+                        apply_redaction_areas(page, page_areas)
+                end_stage('redact')
+                
+                if output_options.get('output_format', 'pdf') != 'pdf':
+                    # 마스킹된 대상 페이지를 흑백 이미지로 렌더링
+                    raster_data = render_masked_pages(doc, page_numbers, output_options)
+                    end_stage('insert')
+                    if output_path:
+                        with open(output_path, 'wb') as f:
+                            f.write(raster_data)
+                    else:
+                        result['data'] = raster_data
+                    end_stage('save')
+                    return result
+                
+                if output_options.get('compact'):
+                    masked_doc = doc
+                    # 참조가 끊긴 객체 제거 + 스트림/이미지/폰트 압축 + 미사용 리소스 정리
+                    save_options = dict(garbage=4, deflate=True,
+                                        deflate_images=True, deflate_fonts=True, clean=True)
+                else:
+                    # 새 문서 생성 (대상 페이지만 복사)
+                    masked_doc = fitz.open()
+                    for page_number in page_numbers:
+                        masked_doc.insert_pdf(doc, from_page=page_number, to_page=page_number)
+                    save_options = {}
+                end_stage('insert')
+                
+                if output_path:
+                    masked_doc.save(output_path, **save_options)
+                else:
+                    result['data'] = masked_doc.tobytes(**save_options)
+                
+                if masked_doc is not doc:
+                    masked_doc.close()
+                end_stage('save')
+        finally:
+            doc.close()
+            # 문서가 매핑된 버퍼를 계속 참조하지 않도록 해제
+            doc.stream = None
+    
+    return result
+
+def render_masked_page(page, output_options):
+    """마스킹된 페이지를 지정 DPI의 흑백 이미지(PNG/JPEG) 또는 이미지 한 장짜리 PDF로 변환
+    
+    스캔본은 원본 해상도 이미지를 그대로 싣고 있어서 OCR 요청 바이트와
+    이미지 토큰을 줄이기 위해 사용
+    """
+    output_format = output_options.get('output_format', 'pdf')
+    pixmap = page.get_pixmap(dpi=output_options.get('raster_dpi', 150), colorspace=fitz.csGRAY, alpha=False)
+    
+    if output_format == 'png':
+        return pixmap.tobytes('png')
+    
+    image_data = pixmap.tobytes('jpg', jpg_quality=output_options.get('jpeg_quality', 80))
+    if output_format == 'jpeg':
+        return image_data
+    
+    # image-pdf: 원래 페이지 크기에 이미지 한 장만 배치
+    image_doc = fitz.open()
+    image_page = image_doc.new_page(width=page.rect.width, height=page.rect.height)
+    image_page.insert_image(image_page.rect, stream=image_data)
+    data = image_doc.tobytes(garbage=4, deflate=True)
+    image_doc.close()
+    return data
+
+def render_masked_pages(doc, page_numbers, output_options):
+    """마스킹된 대상 페이지들을 이미지 출력으로 변환
+    
+    image-pdf 는 페이지마다 이미지 한 장씩, png/jpeg 는 페이지를 세로로 이어 붙인 한 장으로 렌더링
+    """
+    if len(page_numbers) == 1:
+        return render_masked_page(doc[page_numbers[0]], output_options)
+    
+    if output_options.get('output_format') == 'image-pdf':
+        image_doc = fitz.open()
+        for page_number in page_numbers:
+            page = doc[page_number]
+            pixmap = page.get_pixmap(dpi=output_options.get('raster_dpi', 150), colorspace=fitz.csGRAY, alpha=False)
+            image_page = image_doc.new_page(width=page.rect.width, height=page.rect.height)
+            image_page.insert_image(image_page.rect,
+                                    stream=pixmap.tobytes('jpg', jpg_quality=output_options.get('jpeg_quality', 80)))
+        data = image_doc.tobytes(garbage=4, deflate=True)
+        image_doc.close()
+        return data
+    
+    sheet_doc = fitz.open()
+    sheet = sheet_doc.new_page(width=max(doc[number].rect.width for number in page_numbers),
+                               height=sum(doc[number].rect.height for number in page_numbers))
+    top = 0
+    for page_number in page_numbers:
+        rect = doc[page_number].rect
+        sheet.show_pdf_page(fitz.Rect(0, top, rect.width, top + rect.height), doc, page_number)
+        top += rect.height
+    data = render_masked_page(sheet, output_options)
+    sheet_doc.close()
+    return data
+
+def redact_single_file(input_path, output_path, filename, redaction_areas, output_options=None, source_sha256=None):
+    """PDF 한 개 마스킹 처리 - 첫 페이지만 추출 (실패 시 None 반환)"""
+    try:
+        start_time = time.perf_counter()
+        
+        masked = mask_source(input_path, redaction_areas, output_options, output_path, source_sha256)
+        
+        return {
+            'original_name': filename,
+            'masked_name': os.path.basename(output_path),
+            'size': os.path.getsize(output_path),
+            'source_size': masked['source_size'],
+            'source_sha256': masked['source_sha256'],
+            'layout': masked['layout'],
+            'pages': masked.get('pages', []),
+            'stage_ms': masked['stage_ms'],
+            'elapsed_ms': round((time.perf_counter() - start_time) * 1000, 1)
+        }
+        
+    except Exception as e:
+        logger.error(f"파일 {filename} 처리 오류: {e}")
+        return None
+
+def apply_redaction_areas(page, redaction_areas):
+    """페이지에 마스킹 영역 적용"""
+    for area in redaction_areas:
+        rect = fitz.Rect(area['x1'], area['y1'], area['x2'], area['y2'])
+        page.add_redact_annot(rect)
+    page.apply_redactions()
+
+def redact_business_numbers(page):
+    """첫 페이지 이후 표 연속 페이지의 사업자 등록번호를 텍스트 패턴으로 찾아 마스킹"""
+    found = False
+    for number in set(BUSINESS_NUMBER_PATTERN.findall(page.get_text())):
+        for rect in page.search_for(number):
+            page.add_redact_annot(rect)
+            found = True
+    if found:
+        page.apply_redactions()
+
+def redact_batch_worker(files_batch, redaction_areas, output_options=None, rss_budget=None, journal_path=None,
+                        source_hashes=None):
+    """프로세스 풀 워커 - 배치 하나를 마스킹하고 (결과 목록, 처리 전 RSS, 처리 후 RSS) 반환
+    
+    ProcessPoolExecutor로 전달되므로 pickle 가능한 모듈 최상위 함수여야 함.
+    journal_path 가 있으면 파일 하나가 끝날 때마다 저널에 바로 기록
+    source_hashes 는 배치 파일의 {파일명: sha256} (원본 해시 색인 값, 워커에서 다시 해싱하지 않음)
+    """
+    source_hashes = source_hashes or {}
+    rss_before = current_rss_bytes()
+    processed_files = []
+    for input_path, output_path, filename in files_batch:
+        result = redact_single_file(input_path, output_path, filename, redaction_areas, output_options,
+                                    source_hashes.get(filename))
+        if result:
+            if journal_path:
+                append_journal_entry(journal_path, {'type': 'file', **result})
+            processed_files.append(result)
+    return processed_files, rss_before, release_memory(rss_budget)
+
+def summarize_masking_sizes(processed_files):
+    """마스킹 전/후 크기와 파일당 처리 시간 요약"""
+    if not processed_files:
+        return {'source_bytes': 0, 'masked_bytes': 0, 'reduction_percent': 0.0, 'avg_ms_per_file': 0.0,
+                'layout_counts': {}}
+    
+    source_bytes = sum(item['source_size'] for item in processed_files)
+    masked_bytes = sum(item['size'] for item in processed_files)
+    
+    # 마스킹 영역 출처별 파일 수 (fixed / cached / searched / default)
+    layout_counts = {}
+    for item in processed_files:
+        layout_counts[item['layout']] = layout_counts.get(item['layout'], 0) + 1
+    
+    return {
+        'source_bytes': source_bytes,
+        'masked_bytes': masked_bytes,
+        'reduction_percent': round((1 - masked_bytes / source_bytes) * 100, 1) if source_bytes else 0.0,
+        'avg_ms_per_file': round(sum(item['elapsed_ms'] for item in processed_files) / len(processed_files), 1),
+        'layout_counts': layout_counts
+    }
+
 class PDFProcessor:
-    def __init__(self, source_folder, target_folder, batch_size=50):
+    def __init__(self, source_folder, target_folder, batch_size=50, max_workers=1, compact_output=False,
+                 masking_strategy='fixed', output_format='pdf', raster_dpi=150, rss_budget_mb=1024,
+                 page_selection='first'):
         self.source_folder = source_folder
         self.target_folder = target_folder
-        self.batch_size = batch_size
+        self.batch_size = batch_size  # 첫 배치 파일 수 (이후 RSS 측정값에 따라 조정)
+        self.max_workers = max_workers
+        self.rss_budget = rss_budget_mb * 1024 * 1024 if rss_budget_mb else None  # 전체 워커 합산 RSS 예산
+        self.compact_output = compact_output
+        self.masking_strategy = masking_strategy  # 'fixed': 고정 좌표, 'anchor': 텍스트 라벨 기준 보정
+        self.output_format = output_format  # 'pdf' | 'image-pdf' | 'png' | 'jpeg'
+        self.raster_dpi = raster_dpi
+        if output_format not in MASKED_OUTPUT_EXTENSIONS:
+            raise ValueError(f"지원하지 않는 출력 형식입니다: {output_format}")
+        self.page_selection = page_selection  # 'first': 첫 페이지만, 'target': 사업소득 표/요약 필드가 있는 페이지
+        if page_selection not in ('first', 'target'):
+            raise ValueError(f"지원하지 않는 페이지 선택 방식입니다: {page_selection}")
         
         # 기본 마스킹 좌표
         self.default_masking_areas = [
@@ -19,184 +343,541 @@ class PDFProcessor:
             {'x1': 430, 'y1': 122, 'x2': 510, 'y2': 135},  # 생년월일
             {'x1': 60, 'y1': 255, 'x2': 170, 'y2': 355},   # 사업자번호
         ]
+        
+        # 라벨 기준 마스킹 앵커 (보정된 설정이 있으면 그것을 사용)
+        self.masking_anchors = self._load_masking_anchors()
+        
+        # 폴더 인덱스 (스캔/상태 조회 시 매번 전체 디렉터리를 다시 읽지 않도록 캐시)
+        self.source_index = FolderIndex(source_folder, lambda f: f.lower().endswith('.pdf'), self.natural_sort_key)
+        self.masked_index = FolderIndex(target_folder, is_masked_output, self.natural_sort_key)
+        
+        # 번호 → 원본 파일명 → 코드 색인 (file_mapping.json 기준, 4단계 조회용)
+        self.mapping_index = MappingIndex(os.path.join(target_folder, FILE_MAPPING_INDEX_NAME),
+                                          os.path.join(target_folder, FILE_MAPPING_NAME))
+        
+        # 실행 중 파일 단위 완료 기록 (중단 시 resume 으로 이어서 처리)
+        self.journal = MaskingJournal(os.path.join(target_folder, MASKING_JOURNAL_NAME))
+        
+        # 감시 모드 상태 - 매니페스트/매핑을 메모리에 두고 파일마다 감시 저널에만 한 줄 추가
+        # (JSON 파일은 WATCH_FLUSH_EVERY 개마다, 그리고 종료 시 flush_watch_state 로 저장)
+        self.watch_journal_path = os.path.join(target_folder, WATCH_JOURNAL_NAME)
+        self._watch_state = None
+        
+        # 원본 내용 해시 색인 (중복 업로드/중복 원본 감지용)
+        # 원본 폴더에는 원본 PDF만 두기 위해 마스킹 폴더에 저장
+        self.source_hashes = SourceHashIndex(source_folder, os.path.join(target_folder, SOURCE_HASHES_NAME))
     
     def natural_sort_key(self, filename):
-        """파일명을 숫자 순서로 정렬하기 위한 키 함수"""
+        """파일명을 숫자 순서로 정렬하기 위한 키 함수
+        
+        숫자가 아닌 파일명끼리는 이름순으로 정렬해 os.listdir 순서와 무관하게
+        매번 같은 번호가 매겨지도록 함
+        """
         try:
-            # 파일명에서 .pdf 제거하고 숫자로 변환
-            number = int(filename.replace('.pdf', ''))
-            return number
+            # 파일명에서 확장자 제거하고 숫자로 변환
+            number = int(os.path.splitext(filename)[0])
+            return (number, filename)
         except ValueError:
             # 숫자가 아닌 파일명은 맨 뒤로
-            return 999999
+            return (999999, filename)
     
-    def scan_pdf_files(self):
-        """PDF 파일 스캔"""
-        if not os.path.exists(self.source_folder):
-            raise Exception(f"'{self.source_folder}' 폴더가 존재하지 않습니다.")
-        
-        pdf_files = [f for f in os.listdir(self.source_folder) if f.lower().endswith('.pdf')]
+    def _load_masking_anchors(self):
+        """보정된 앵커 설정 로드 (없으면 기본 앵커)"""
+        anchors_path = os.path.join(self.target_folder, MASKING_ANCHORS_NAME)
+        if os.path.exists(anchors_path):
+            try:
+                with open(anchors_path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning(f"앵커 설정을 읽을 수 없어 기본값을 사용합니다: {e}")
+        return [dict(anchor) for anchor in DEFAULT_MASKING_ANCHORS]
+    
+    def calibrate_masking_anchors(self, sample_path):
+        """기본 마스킹 좌표가 정확히 맞는 샘플 PDF에서 라벨 기준 위치를 측정해 저장"""
+        doc = fitz.open(sample_path)
+        try:
+            if len(doc) == 0:
+                raise Exception(f"'{sample_path}' 에 페이지가 없습니다.")
+            page = doc[0]
+            textpage = page.get_textpage()
+            
+            calibrated = []
+            for anchor in self.masking_anchors:
+                found = find_anchor_label(page, anchor, textpage)
+                if found is None:
+                    raise Exception(f"샘플에서 앵커 라벨 {anchor['labels']} 을 찾을 수 없습니다.")
+                _, rect = found
+                calibrated.append({**anchor, 'ref_x': round(rect.x0, 2), 'ref_y': round(rect.y0, 2)})
+        finally:
+            doc.close()
         
-        # 숫자 순서로 정렬
-        pdf_files.sort(key=self.natural_sort_key)
+        os.makedirs(self.target_folder, exist_ok=True)
+        with open(os.path.join(self.target_folder, MASKING_ANCHORS_NAME), 'w', encoding='utf-8') as f:
+            json.dump(calibrated, f, ensure_ascii=False, indent=2)
+        self.masking_anchors = calibrated
+        return calibrated
+    
+    def _output_options(self, compact=None):
+        """워커에 전달할 마스킹/출력 설정 (매니페스트 버전 계산에도 사용)"""
+        output_options = {
+            'compact': self.compact_output if compact is None else bool(compact)
+        }
+        if self.masking_strategy == 'anchor':
+            output_options['anchors'] = self.masking_anchors
+        if self.output_format != 'pdf':
+            output_options['output_format'] = self.output_format
+            output_options['raster_dpi'] = self.raster_dpi
+        if self.page_selection != 'first':
+            output_options['page_selection'] = self.page_selection
+        return output_options
+    
+    def masking_areas_version(self, output_options=None):
+        """마스킹 좌표/출력 설정의 버전 (설정이 바뀌면 전체 재마스킹 필요)"""
+        areas_json = json.dumps({
+            'areas': self.default_masking_areas,
+            'output': output_options or {}
+        }, sort_keys=True)
+        return hashlib.sha256(areas_json.encode('utf-8')).hexdigest()[:16]
+    
+    def _load_manifest(self):
+        """마스킹 매니페스트 로드 (없거나 깨졌으면 빈 매니페스트) - 아직 저장되지 않은 감시 저널 항목도 반영"""
+        manifest_path = os.path.join(self.target_folder, MASKING_MANIFEST_NAME)
+        manifest = {'areas_version': None, 'next_number': 1, 'files': {}}
+        if os.path.exists(manifest_path):
+            try:
+                with open(manifest_path, 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning(f"마스킹 매니페스트를 읽을 수 없어 새로 만듭니다: {e}")
+        for record in self._watch_journal_records():
+            manifest.setdefault('files', {})[record['original_name']] = record['manifest_entry']
+            manifest['next_number'] = max(manifest.get('next_number', 1), record['next_number'])
+            manifest['areas_version'] = record['areas_version']
+        return manifest
+    
+    def _watch_journal_records(self):
+        """감시 저널에 남은 파일 기록 (마지막 저장 이후 감시 모드가 마스킹한 파일, 쓰다 만 줄은 무시)"""
+        if not os.path.exists(self.watch_journal_path):
+            return []
+        records = []
+        with open(self.watch_journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+        return records
+    
+    def _save_manifest(self, areas_version, next_number, manifest_files):
+        """마스킹 매니페스트 저장 (임시 파일에 쓴 뒤 교체)"""
+        manifest_path = os.path.join(self.target_folder, MASKING_MANIFEST_NAME)
+        temp_path = manifest_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'areas_version': areas_version,
+                'next_number': next_number,
+                'files': manifest_files
+            }, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, manifest_path)
+    
+    def _plan_incremental(self, pdf_files, areas_version, output_options=None):
+        """매니페스트와 비교해 다시 마스킹할 파일 목록 작성
         
-        file_info = []
-        total_size = 0
+        크기/수정시간이 같으면 해시 없이 건너뛰고, 다르면 원본 해시 색인의 해시로 실제 변경 여부 확인.
+        변경되지 않은 파일과 변경된 파일 모두 기존 번호를 그대로 유지하고
+        새 파일만 다음 번호를 받음 (삭제된 파일의 번호는 재사용하지 않음)
+        """
+        manifest = self._load_manifest()
+        previous_files = manifest.get('files', {})
+        version_matches = manifest.get('areas_version') == areas_version
+        next_number = manifest.get('next_number', 1)
         
+        manifest_files = {}
+        files_to_mask = []
         for filename in pdf_files:
-            file_path = os.path.join(self.source_folder, filename)
-            file_size = os.path.getsize(file_path)
-            total_size += file_size
+            input_path = os.path.join(self.source_folder, filename)
+            stat = os.stat(input_path)
+            previous = previous_files.get(filename)
             
-            file_info.append({
-                'filename': filename,
-                'size': file_size
-            })
+            if previous:
+                number = previous['number']
+            else:
+                number = next_number
+                next_number += 1
+            
+            entry = {
+                'number': number,
+                'size': stat.st_size,
+                'mtime': stat.st_mtime,
+                'sha256': previous.get('sha256') if previous else None
+            }
+            manifest_files[filename] = entry
+            
+            output_path = os.path.join(self.target_folder, masked_filename(number, output_options))
+            unchanged = (
+                previous is not None
+                and version_matches
+                and previous.get('sha256')
+                and os.path.exists(output_path)
+            )
+            if unchanged and (previous.get('size') != stat.st_size or previous.get('mtime') != stat.st_mtime):
+                # 메타데이터가 달라졌으면 내용 해시로 최종 판단 (실행 시작 때 색인이 이미 계산한 값)
+                sha256 = self.source_hashes.hashes.get(filename) or self.source_hashes.sha256(filename)
+                unchanged = sha256 == previous['sha256']
+            
+            if not unchanged:
+                # 출력 형식이 바뀐 경우 같은 번호의 이전 형식 결과 제거
+                for extension in set(MASKED_OUTPUT_EXTENSIONS.values()):
+                    stale_path = os.path.join(self.target_folder, f"{number}{extension}")
+                    if stale_path != output_path and os.path.exists(stale_path):
+                        os.remove(stale_path)
+                files_to_mask.append((input_path, output_path, filename))
         
-        return {
-            'files': file_info,
-            'count': len(file_info),
-            'total_size': total_size
-        }
+        # 원본에서 삭제된 파일의 마스킹 결과 제거 (이전 출력 형식 포함)
+        for filename, previous in previous_files.items():
+            if filename not in manifest_files:
+                for extension in set(MASKED_OUTPUT_EXTENSIONS.values()):
+                    removed_path = os.path.join(self.target_folder, f"{previous['number']}{extension}")
+                    if os.path.exists(removed_path):
+                        os.remove(removed_path)
+        
+        return manifest_files, files_to_mask, next_number
     
-    def redact_pdf_batch(self, files_batch, redaction_areas, status_callback=None):
-        """PDF 배치 마스킹 처리 - 첫 페이지만 추출"""
+    def _write_file_mapping(self, file_mapping):
+        """file_mapping.json 저장 후 SQLite 색인도 같은 내용으로 교체"""
+        mapping_path = os.path.join(self.target_folder, FILE_MAPPING_NAME)
+        with open(mapping_path, 'w', encoding='utf-8') as f:
+            json.dump(file_mapping, f, ensure_ascii=False, indent=2)
+        try:
+            self.mapping_index.replace(file_mapping)
+        except sqlite3.Error as e:
+            # 색인은 JSON에서 다시 만들 수 있으므로 다음 조회 때 sync 로 복구됨
+            logger.warning(f"매핑 색인 갱신 실패: {e}")
+    
+    def _plan_resume(self, areas_version):
+        """중단된 실행의 저널로 남은 작업 계획 복원
+        
+        반환값: (manifest_files, 남은 파일 목록, next_number, 이미 완료된 저널 항목 목록)
+        계획에 있던 번호를 그대로 쓰므로 중간에 원본이 추가되어도 번호가 바뀌지 않음
+        (추가된 원본은 다음 증분 실행에서 처리)
+        """
+        plan, committed = self.journal.load()
+        if plan is None:
+            raise Exception('이어서 처리할 중단된 마스킹 작업이 없습니다.')
+        if plan['areas_version'] != areas_version:
+            raise Exception('마스킹 설정(영역/출력 형식)이 중단 당시와 달라 이어서 처리할 수 없습니다.')
+        
+        remaining_files = []
+        committed_files = []
+        for input_path, output_path, filename in plan['files']:
+            entry = committed.get(filename)
+            if entry and os.path.exists(output_path):
+                committed_files.append(entry)
+            else:
+                remaining_files.append((input_path, output_path, filename))
+        return plan['manifest_files'], remaining_files, plan['next_number'], committed_files
+    
+    def list_source_pdfs(self):
+        """원본 폴더의 PDF 파일명 목록 (숫자 순서 정렬)"""
+        return [entry['filename'] for entry in self.source_index.page()['files']]
+    
+    def list_unique_source_pdfs(self):
+        """내용이 같은 원본은 정렬 순서상 처음 것만 남긴 PDF 목록과 {중복 파일명: 원래 파일명}
+        
+        같은 고지서가 여러 번 들어와도 마스킹/OCR 은 한 번만 하도록 처리 대상에서 제외
+        """
+        os.makedirs(self.target_folder, exist_ok=True)
+        pdf_files, duplicates = self.source_hashes.dedupe(self.list_source_pdfs())
+        if duplicates:
+            logger.info(f"내용이 같은 원본 {len(duplicates)}개 제외: {duplicates}")
+        return pdf_files, duplicates
+    
+    def receive_upload(self, stream, filename):
+        """업로드 스트림을 원본 폴더에 저장 (해싱하면서 기록, 중복이면 DuplicateUpload)
+        
+        폴더 전체를 다시 해싱하지 않고 업로드 내용의 해시만 색인에서 찾은 뒤 새 파일 하나만 기록함.
+        손으로 복사해 둔 원본은 마스킹 실행 시 색인이 갱신되면서 중복 비교 대상이 됨
+        """
+        os.makedirs(self.target_folder, exist_ok=True)
+        os.makedirs(self.source_folder, exist_ok=True)
+        return self.source_hashes.receive(stream, filename)
+    
+    def scan_pdf_files(self, cursor=None, limit=None, sort='name', order='asc'):
+        """PDF 파일 스캔 (폴더 인덱스 기반, 커서 페이지네이션 지원)
+        
+        sort: 'name'(숫자 순서) | 'size' | 'mtime', order: 'asc' | 'desc'
+        limit=None 이면 전체 목록 반환
+        """
+        if not os.path.exists(self.source_folder):
+            raise Exception(f"'{self.source_folder}' 폴더가 존재하지 않습니다.")
+        
+        return self.source_index.page(cursor=cursor, limit=limit, sort=sort, order=order)
+    
+    def redact_pdf_batch(self, files_batch, redaction_areas, status_callback=None, output_options=None,
+                         journal_path=None):
+        """PDF 배치 마스킹 처리 - 첫 페이지만 추출 (journal_path 가 있으면 파일마다 저널에 기록)"""
         processed_files = []
         
         for i, (input_path, output_path, filename) in enumerate(files_batch):
-            try:
-                # PDF 첫 페이지만 마스킹 처리
-                doc = fitz.open(input_path)
-                
-                # 첫 페이지만 처리
-                if len(doc) > 0:
-                    first_page = doc[0]  # 첫 번째 페이지만
-                    
-                    # 마스킹 영역 적용
-                    for area in redaction_areas:
-                        rect = fitz.Rect(area['x1'], area['y1'], area['x2'], area['y2'])
-                        first_page.add_redact_annot(rect)
-                    first_page.apply_redactions()
-                    
-                    # 새 문서 생성 (첫 페이지만)
-                    new_doc = fitz.open()
-                    new_doc.insert_pdf(doc, from_page=0, to_page=0)  # 첫 페이지만 복사
-                    new_doc.save(output_path)
-                    new_doc.close()
-                
-                doc.close()
-                
-                processed_files.append({
-                    'original_name': filename,
-                    'masked_name': os.path.basename(output_path),
-                    'size': os.path.getsize(output_path)
-                })
-                
-                # 진행률 콜백
-                if status_callback:
-                    progress = ((i + 1) / len(files_batch)) * 100
-                    status_callback('running', progress, f'배치 처리 중: {i+1}/{len(files_batch)} (첫 페이지 추출)')
-                
-            except Exception as e:
-                logger.error(f"파일 {filename} 처리 오류: {e}")
+            result = redact_single_file(input_path, output_path, filename, redaction_areas, output_options,
+                                        self.source_hashes.hashes.get(filename))
+            if result is None:
                 continue
+            
+            if journal_path:
+                append_journal_entry(journal_path, {'type': 'file', **result})
+            processed_files.append(result)
+            
+            # 진행률 콜백
+            if status_callback:
+                progress = ((i + 1) / len(files_batch)) * 100
+                status_callback('running', progress, f'배치 처리 중: {i+1}/{len(files_batch)} (첫 페이지 추출)')
         
         return processed_files
     
-    def process_masking(self, status_callback=None):
-        """전체 마스킹 처리 프로세스"""
-        try:
+    def _process_batches_sequential(self, scheduler, status_callback=None, output_options=None, journal_path=None):
+        """배치를 현재 프로세스에서 순차 처리 - 배치마다 RSS를 측정해서 다음 배치 크기 조정"""
+        total_files = scheduler.remaining()
+        processed_count = 0
+        all_processed_files = []
+        
+        while True:
+            next_batch = scheduler.next_batch()
+            if next_batch is None:
+                break
+            batch, estimated = next_batch
+            
             if status_callback:
-                status_callback('running', 0, 'PDF 파일 스캔 중...')
+                status_callback('running', 
+                              10 + (processed_count / total_files) * 80,
+                              f'배치 {scheduler.batch_count} 처리 중 ({len(batch)}개 파일)')
             
-            # PDF 파일 찾기
-            pdf_files = [f for f in os.listdir(self.source_folder) if f.lower().endswith('.pdf')]
+            rss_before = current_rss_bytes()
+            batch_result = self.redact_pdf_batch(batch, self.default_masking_areas, status_callback, output_options,
+                                                 journal_path)
+            scheduler.record(batch, estimated, rss_before, release_memory(scheduler.process_budget))
+            all_processed_files.extend(batch_result)
+            processed_count += len(batch)
             
-            # 숫자 순서로 정렬 (중요!)
-            pdf_files.sort(key=self.natural_sort_key)
+            # 진행률 업데이트
+            if status_callback:
+                overall_progress = 10 + (processed_count / total_files) * 80
+                status_callback('running', overall_progress, 
+                              f'처리 완료: {processed_count}/{total_files} (첫 페이지 추출)')
+        
+        return all_processed_files
+    
+    def _process_batches_parallel(self, scheduler, status_callback=None, output_options=None, journal_path=None):
+        """배치를 프로세스 풀에 분산 처리 - 워커별 진행률을 하나의 콜백으로 합산
+        
+        배치를 미리 전부 제출하지 않고 워커 수만큼만 실행 중으로 유지하면서,
+        끝난 배치의 RSS 측정값을 반영해 다음 배치를 만듦
+        """
+        total_files = scheduler.remaining()
+        worker_count = scheduler.workers
+        processed_count = 0
+        batch_results = {}
+        
+        if status_callback:
+            status_callback('running', 10, f'{worker_count}개 프로세스로 {total_files}개 파일 병렬 처리 시작')
+        
+        with ProcessPoolExecutor(max_workers=worker_count) as executor:
+            pending = {}
             
-            if not pdf_files:
-                raise Exception(f"'{self.source_folder}' 폴더에 PDF 파일이 없습니다.")
+            def submit_next():
+                next_batch = scheduler.next_batch()
+                if next_batch is None:
+                    return False
+                batch, estimated = next_batch
+                # 실행 시작 때 색인에서 얻은 해시를 배치 파일 것만 넘김 (워커가 원본을 다시 해싱하지 않도록)
+                batch_hashes = {filename: self.source_hashes.hashes.get(filename) for _, _, filename in batch}
+                future = executor.submit(redact_batch_worker, batch, self.default_masking_areas, output_options,
+                                         scheduler.process_budget, journal_path, batch_hashes)
+                pending[future] = (scheduler.batch_count, batch, estimated)
+                return True
             
-            # 타겟 폴더 정리
-            if os.path.exists(self.target_folder):
-                for file in os.listdir(self.target_folder):
-                    if file.endswith('.pdf'):
-                        os.remove(os.path.join(self.target_folder, file))
-            else:
-                os.makedirs(self.target_folder, exist_ok=True)
+            while len(pending) < worker_count and submit_next():
+                pass
             
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    batch_idx, batch, estimated = pending.pop(future)
+                    try:
+                        batch_result, rss_before, rss_after = future.result()
+                        batch_results[batch_idx] = batch_result
+                        scheduler.record(batch, estimated, rss_before, rss_after)
+                    except Exception as e:
+                        # 워커 프로세스 자체가 죽은 경우 - 해당 배치는 누락 처리
+                        logger.error(f"배치 {batch_idx} 처리 오류: {e}")
+                    processed_count += len(batch)
+                    
+                    if status_callback:
+                        overall_progress = 10 + (processed_count / total_files) * 80
+                        status_callback('running', overall_progress,
+                                      f'처리 완료: {processed_count}/{total_files} (첫 페이지 추출, {worker_count}개 프로세스)')
+                
+                while len(pending) < worker_count and submit_next():
+                    pass
+        
+        # 결과는 배치 순서(= 파일 번호 순서)대로 합침
+        return [item for batch_idx in sorted(batch_results) for item in batch_results[batch_idx]]
+    
+    def process_masking(self, status_callback=None, incremental=False, compact=None, resume=False):
+        """전체 마스킹 처리 프로세스
+        
+        incremental=True 이면 masked-pdfs를 비우지 않고 새로 추가되거나
+        변경된 원본만 다시 마스킹함 (기존 파일 번호 유지)
+        compact 를 지정하지 않으면 생성 시 설정한 compact_output 을 따름
+        resume=True 이면 중단된 실행의 저널을 읽어 아직 기록되지 않은 파일부터 이어서 처리
+        """
+        try:
             if status_callback:
-                status_callback('running', 5, f'{len(pdf_files)}개 파일 발견. 마스킹 처리 시작...')
+                status_callback('running', 0, 'PDF 파일 스캔 중...')
             
-            # 파일을 배치로 나누기
-            batches = [pdf_files[i:i + self.batch_size] for i in range(0, len(pdf_files), self.batch_size)]
-            total_files = len(pdf_files)
-            processed_count = 0
-            all_processed_files = []
-            file_mapping = []
+            # PDF 파일 찾기 (숫자 순서로 정렬 - 중요!)
+            # 폴더 인덱스는 디렉터리 mtime/유효 시간으로 캐시되므로 마스킹 실행 시작 시에는 반드시 다시 스캔
+            # (같은 초 안에 바뀐 파일이나 mtime 해상도가 낮은 파일 시스템에서 목록이 빠지지 않도록)
+            self.source_index.refresh(force=True)
+            if not self.list_source_pdfs():
+                raise Exception(f"'{self.source_folder}' 폴더에 PDF 파일이 없습니다.")
+            
+            pdf_files, duplicates = self.list_unique_source_pdfs()
             
-            # 각 배치를 순차 처리
-            for batch_idx, batch in enumerate(batches):
-                if status_callback:
-                    status_callback('running', 
-                                  10 + (batch_idx / len(batches)) * 80,
-                                  f'배치 {batch_idx + 1}/{len(batches)} 처리 중')
+            output_options = self._output_options(compact)
+            areas_version = self.masking_areas_version(output_options)
+            
+            committed_files = []
+            if resume:
+                manifest_files, numbered_files, next_number, committed_files = self._plan_resume(areas_version)
+            elif incremental:
+                os.makedirs(self.target_folder, exist_ok=True)
+                manifest_files, numbered_files, next_number = self._plan_incremental(pdf_files, areas_version,
+                                                                                     output_options)
+            else:
+                # 타겟 폴더 정리
+                if os.path.exists(self.target_folder):
+                    for file in os.listdir(self.target_folder):
+                        if is_masked_output(file):
+                            os.remove(os.path.join(self.target_folder, file))
+                else:
+                    os.makedirs(self.target_folder, exist_ok=True)
+                # 이전 매니페스트/매핑도 바로 무효화 - 전체 실행이 중간에 끝나도 다음 증분 실행이
+                # 지워진 결과의 번호/해시를 믿고 N.pdf 를 다른 원본에 매핑하지 않도록
+                for state_path in (os.path.join(self.target_folder, MASKING_MANIFEST_NAME), self.watch_journal_path):
+                    if os.path.exists(state_path):
+                        os.remove(state_path)
+                self._write_file_mapping([])
                 
-                # 배치용 파일 경로 준비
-                batch_files = []
-                for filename in batch:
-                    file_number = processed_count + len(batch_files) + 1
+                # 파일 번호는 정렬 순서로 미리 확정 (병렬 처리 완료 순서와 무관하게 결정적)
+                manifest_files = {}
+                numbered_files = []
+                for file_number, filename in enumerate(pdf_files, 1):
                     input_path = os.path.join(self.source_folder, filename)
-                    output_filename = f"{file_number}.pdf"
-                    output_path = os.path.join(self.target_folder, output_filename)
-                    batch_files.append((input_path, output_path, filename))
-                
-                # 배치 처리
-                def batch_status_callback(status, progress, message):
-                    if status_callback:
-                        status_callback(status, progress, message)
-                
-                batch_result = self.redact_pdf_batch(
-                    batch_files, 
-                    self.default_masking_areas, 
-                    batch_status_callback
-                )
-                all_processed_files.extend(batch_result)
-                
-                # 매핑 정보 생성
-                for i, filename in enumerate(batch):
-                    file_number = processed_count + i + 1
-                    file_mapping.append({
+                    stat = os.stat(input_path)
+                    manifest_files[filename] = {
                         'number': file_number,
+                        'size': stat.st_size,
+                        'mtime': stat.st_mtime,
+                        'sha256': None
+                    }
+                    numbered_files.append((
+                        input_path,
+                        os.path.join(self.target_folder, masked_filename(file_number, output_options)),
+                        filename
+                    ))
+                next_number = len(pdf_files) + 1
+            
+            if not resume:
+                # 처리 계획을 저널 첫 줄로 먼저 기록 (이후 파일마다 완료 항목이 추가됨)
+                self.journal.start({
+                    'areas_version': areas_version,
+                    'next_number': next_number,
+                    'manifest_files': manifest_files,
+                    'files': numbered_files
+                })
+            
+            planned_count = len(manifest_files) if resume else len(pdf_files)
+            skipped_count = planned_count - len(numbered_files)
+            if status_callback:
+                if resume:
+                    status_callback('running', 5, f'중단된 작업 이어서 처리: {len(committed_files)}개 완료됨, '
+                                                  f'{len(numbered_files)}개 남음. 마스킹 처리 시작...')
+                elif incremental:
+                    status_callback('running', 5, f'{len(pdf_files)}개 파일 중 {len(numbered_files)}개 변경/추가됨 '
+                                                  f'({skipped_count}개 변경 없음). 마스킹 처리 시작...')
+                else:
+                    status_callback('running', 5, f'{len(pdf_files)}개 파일 발견. 마스킹 처리 시작...')
+            
+            # 원본 크기/페이지 수와 RSS 예산으로 배치 크기를 정하는 스케줄러
+            # (파일이 첫 배치 하나에 다 들어가면 프로세스 풀 없이 처리)
+            parallel = self.max_workers > 1 and len(numbered_files) > self.batch_size
+            scheduler = AdaptiveBatchScheduler(numbered_files, self.rss_budget, self.batch_size,
+                                               self.max_workers if parallel else 1)
+            
+            journal_path = self.journal.journal_path
+            if parallel:
+                all_processed_files = self._process_batches_parallel(scheduler, status_callback, output_options,
+                                                                     journal_path)
+            else:
+                all_processed_files = self._process_batches_sequential(scheduler, status_callback, output_options,
+                                                                       journal_path)
+            logger.info(f"배치 스케줄러 요약: {scheduler.stats()}")
+            
+            # 마스킹 전/후 크기 및 처리 시간 요약
+            size_stats = summarize_masking_sizes(all_processed_files)
+            logger.info(f"마스킹 크기 요약 (compact={output_options['compact']}): "
+                        f"{size_stats['source_bytes']:,} → {size_stats['masked_bytes']:,} bytes "
+                        f"({size_stats['reduction_percent']}% 감소), 평균 {size_stats['avg_ms_per_file']}ms/파일, "
+                        f"마스킹 영역 출처: {size_stats['layout_counts']}")
+            
+            # 마스킹에 성공한 파일만 해시 기록 (실패한 파일은 다음 실행에서 다시 시도)
+            for (_, _, filename) in numbered_files:
+                manifest_files[filename]['sha256'] = None
+            for processed in committed_files + all_processed_files:
+                manifest_files[processed['original_name']]['sha256'] = processed['source_sha256']
+            self._save_manifest(areas_version, next_number, manifest_files)
+            
+            # 매핑 정보 생성 (번호 순)
+            file_mapping = sorted(
+                (
+                    {
+                        'number': entry['number'],
                         'original_name': filename,
-                        'masked_name': f"{file_number}.pdf"
-                    })
-                
-                processed_count += len(batch)
-                
-                # 진행률 업데이트
-                if status_callback:
-                    overall_progress = 10 + (processed_count / total_files) * 80
-                    status_callback('running', overall_progress, 
-                                  f'처리 완료: {processed_count}/{total_files} (첫 페이지 추출)')
-                
-                # 메모리 정리를 위한 잠시 대기
-                time.sleep(0.1)
+                        'masked_name': masked_filename(entry['number'], output_options)
+                    }
+                    for filename, entry in manifest_files.items()
+                ),
+                key=lambda mapping: mapping['number']
+            )
             
-            # 매핑 정보 저장
-            mapping_path = os.path.join(self.target_folder, 'file_mapping.json')
-            with open(mapping_path, 'w', encoding='utf-8') as f:
-                json.dump(file_mapping, f, ensure_ascii=False, indent=2)
+            # 매핑 정보 저장 - 매니페스트와 매핑이 모두 기록된 뒤에 저널 삭제
+            self._write_file_mapping(file_mapping)
+            self.journal.finish()
             
             if status_callback:
-                status_callback('completed', 100, 
-                              f'마스킹 완료: {len(all_processed_files)}개 파일 처리됨 (첫 페이지만)')
+                if resume:
+                    status_callback('completed', 100,
+                                  f'이어서 마스킹 완료: {len(all_processed_files)}개 파일 처리됨, '
+                                  f'{len(committed_files)}개는 이전 실행에서 완료 (첫 페이지만)')
+                elif incremental:
+                    status_callback('completed', 100, 
+                                  f'증분 마스킹 완료: {len(all_processed_files)}개 파일 처리됨, '
+                                  f'{skipped_count}개 변경 없음 (첫 페이지만)')
+                else:
+                    status_callback('completed', 100, 
+                                  f'마스킹 완료: {len(all_processed_files)}개 파일 처리됨 (첫 페이지만)')
             
             return {
                 'processed_files': all_processed_files,
                 'file_mapping': file_mapping,
                 'total_processed': len(all_processed_files),
+                'skipped_unchanged': skipped_count,
+                'resumed_committed': len(committed_files),
+                'duplicates': duplicates,
+                'size_stats': size_stats,
+                'batch_stats': scheduler.stats(),
+                'compact': output_options['compact'],
                 'target_folder': self.target_folder
             }
             
@@ -205,61 +886,261 @@ class PDFProcessor:
                 status_callback('failed', 0, str(e))
             raise
     
-    def extract_personal_info(self):
-        """파일명에서 앞 4글자 코드만 추출 - 마스킹 매핑 정보를 기반으로 순서 결정"""
-        if not os.path.exists(self.source_folder):
-            raise Exception(f"'{self.source_folder}' 폴더가 존재하지 않습니다.")
+    def iter_masked_documents(self, write_to_disk=False, compact=None):
+        """마스킹 결과를 디스크를 거치지 않고 메모리에서 바로 넘겨주는 제너레이터
         
-        # 마스킹 매핑 정보 로드
-        mapping_path = os.path.join(self.target_folder, 'file_mapping.json')
-        if os.path.exists(mapping_path):
-            # 매핑 정보가 있으면 그 순서를 따름 (OCR 처리 순서와 동일)
-            with open(mapping_path, 'r', encoding='utf-8') as f:
-                file_mapping = json.load(f)
-            
-            personal_info = []
-            for mapping in file_mapping:
-                filename = mapping['original_name']
-                order = mapping['number']  # 마스킹된 파일 번호 = OCR 처리 순서
-                
-                # 파일명에서 .pdf 제거
-                file_base = filename.replace('.pdf', '')
-                
-                # 앞 4글자 추출 (파일명이 4글자보다 짧으면 전체)
-                code = file_base[:4] if len(file_base) >= 4 else file_base
-                
-                # 코드가 비어있지 않으면 추가
-                if code.strip():
-                    personal_info.append({
-                        'order': order,  # 마스킹 순서 = OCR 처리 순서
-                        'code': code,    # 앞 4글자 코드
-                        'original_filename': filename
-                    })
-            
-            # 순서대로 정렬
-            personal_info.sort(key=lambda x: x['order'])
-            return personal_info
+        OCR 스크립트가 masked-pdfs 폴더를 다시 읽지 않도록 파일 번호 순서대로
+        {'number', 'original_name', 'masked_name', 'data'} 를 하나씩 반환함.
+        번호는 증분 마스킹과 같이 매니페스트를 따름 (기존 파일은 같은 번호, 새 파일은 다음 번호).
+        새 번호는 매니페스트에 먼저 저장하고, file_mapping.json 은 4단계(개인정보 엑셀)에서
+        쓰이므로 시작 시점에 미리 저장함.
+        write_to_disk=True 이면 masked-pdfs/N.pdf (이미지 출력이면 N.png/N.jpg) 도 함께 기록하고
+        삭제된 원본의 결과를 지움. 기록하지 않으면 masked-pdfs 는 건드리지 않고, 새 파일은
+        해시 없이 매니페스트에 올려 다음 증분 실행에서 같은 번호로 마스킹되게 함
+        """
+        self.source_index.refresh(force=True)
+        pdf_files, _ = self.list_unique_source_pdfs()
+        
+        output_options = self._output_options(compact)
+        areas_version = self.masking_areas_version(output_options)
+        os.makedirs(self.target_folder, exist_ok=True)
         
+        manifest = self._load_manifest()
+        previous_files = manifest.get('files', {})
+        next_number = manifest.get('next_number', 1)
+        manifest_files = {}
+        for filename in pdf_files:
+            stat = os.stat(os.path.join(self.source_folder, filename))
+            previous = previous_files.get(filename)
+            if previous:
+                number = previous['number']
+            else:
+                number = next_number
+                next_number += 1
+            manifest_files[filename] = {
+                'number': number,
+                'size': stat.st_size,
+                'mtime': stat.st_mtime,
+                # 디스크에 기록하지 않으면 기존 결과는 그대로이고, 새 파일은 아직 마스킹 결과가 없음
+                'sha256': None if write_to_disk or not previous else previous.get('sha256')
+            }
+        
+        if write_to_disk:
+            # 삭제된 원본의 결과와 같은 번호의 다른 출력 형식 결과 제거
+            current_outputs = {masked_filename(entry['number'], output_options) for entry in manifest_files.values()}
+            for file in os.listdir(self.target_folder):
+                if is_masked_output(file) and file not in current_outputs:
+                    os.remove(os.path.join(self.target_folder, file))
+            saved_version = areas_version
         else:
-            # 매핑 정보가 없으면 기존 방식 (파일명 순서)
-            pdf_files = [f for f in os.listdir(self.source_folder) if f.lower().endswith('.pdf')]
-            pdf_files.sort(key=self.natural_sort_key)
-            
-            personal_info = []
+            # 삭제된 원본 항목은 남겨 두어 다음 증분 실행에서 결과가 정리되게 함
+            for filename, previous in previous_files.items():
+                manifest_files.setdefault(filename, previous)
+            saved_version = manifest.get('areas_version')
+        self._save_manifest(saved_version, next_number, manifest_files)
+        
+        file_mapping = sorted(
+            (
+                {
+                    'number': manifest_files[filename]['number'],
+                    'original_name': filename,
+                    'masked_name': masked_filename(manifest_files[filename]['number'], output_options)
+                }
+                for filename in pdf_files
+            ),
+            key=lambda mapping: mapping['number']
+        )
+        self._write_file_mapping(file_mapping)
+        
+        for mapping in file_mapping:
+            input_path = os.path.join(self.source_folder, mapping['original_name'])
+            try:
+                masked = mask_source(input_path, self.default_masking_areas, output_options,
+                                     source_sha256=self.source_hashes.hashes.get(mapping['original_name']))
+                masked_data = masked['data']
+            except Exception as e:
+                logger.error(f"파일 {mapping['original_name']} 처리 오류: {e}")
+                masked_data = None
             
-            for i, filename in enumerate(pdf_files, 1):
-                # 파일명에서 .pdf 제거
-                file_base = filename.replace('.pdf', '')
-                
-                # 앞 4글자 추출 (파일명이 4글자보다 짧으면 전체)
-                code = file_base[:4] if len(file_base) >= 4 else file_base
-                
-                # 코드가 비어있지 않으면 추가
-                if code.strip():
-                    personal_info.append({
-                        'order': i,
-                        'code': code,    # 앞 4글자 코드
-                        'original_filename': filename
-                    })
+            if masked_data is not None and write_to_disk:
+                with open(os.path.join(self.target_folder, mapping['masked_name']), 'wb') as f:
+                    f.write(masked_data)
+                # 기록에 성공한 파일만 해시 기록 (실패한 파일은 다음 증분 실행에서 다시 마스킹)
+                manifest_files[mapping['original_name']]['sha256'] = masked['source_sha256']
+                self._save_manifest(saved_version, next_number, manifest_files)
             
-            return personal_info
\ No newline at end of file
+            yield {**mapping, 'data': masked_data}
+
+    def _load_file_mapping(self):
+        """file_mapping.json 로드 (없거나 깨졌으면 빈 목록) - 아직 저장되지 않은 감시 저널 항목도 반영"""
+        mapping_path = os.path.join(self.target_folder, FILE_MAPPING_NAME)
+        try:
+            with open(mapping_path, 'r', encoding='utf-8') as f:
+                file_mapping = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            file_mapping = []
+        records = self._watch_journal_records()
+        if not records:
+            return file_mapping
+        by_name = {mapping['original_name']: mapping for mapping in file_mapping}
+        for record in records:
+            by_name[record['original_name']] = record['mapping']
+        return sorted(by_name.values(), key=lambda mapping: mapping['number'])
+    
+    def _load_watch_state(self):
+        """감시 모드용 매니페스트/매핑을 처음 한 번만 읽어 메모리에 유지
+        
+        감시 모드가 도는 동안 다른 실행이 매니페스트를 바꾸는 경우는 고려하지 않음
+        (증분/전체 마스킹은 감시 모드를 멈춘 뒤 실행)
+        """
+        if self._watch_state is None:
+            manifest = self._load_manifest()
+            file_mapping = {mapping['original_name']: mapping for mapping in self._load_file_mapping()}
+            manifest['next_number'] = max([manifest.get('next_number', 1)]
+                                          + [mapping['number'] + 1 for mapping in file_mapping.values()])
+            self._watch_state = {'manifest': manifest, 'file_mapping': file_mapping, 'pending': 0}
+        return self._watch_state
+    
+    def flush_watch_state(self):
+        """감시 모드에서 쌓인 변경을 매니페스트/file_mapping.json 에 저장하고 감시 저널 삭제 (종료 시에도 호출)"""
+        state = self._watch_state
+        if state is None or not state['pending']:
+            return
+        manifest = state['manifest']
+        self._save_manifest(manifest['areas_version'], manifest['next_number'], manifest['files'])
+        self._write_file_mapping(sorted(state['file_mapping'].values(), key=lambda mapping: mapping['number']))
+        if os.path.exists(self.watch_journal_path):
+            os.remove(self.watch_journal_path)
+        state['pending'] = 0
+
+    def mask_new_source(self, filename):
+        """감시 모드용 - 원본 하나를 바로 마스킹해서 masked-pdfs 에 기록하고 매니페스트/매핑에 반영
+        
+        파일마다 감시 저널 한 줄과 매핑 색인(SQLite) 한 건만 기록하고, 매니페스트와 file_mapping.json 은
+        WATCH_FLUSH_EVERY 개마다 한 번 저장함 (원본 수와 관계없이 파일당 처리 비용 일정)
+
+        매니페스트에 있던 파일(내용 변경)은 기존 번호를, 새 파일은 다음 번호를 받음
+        (증분 마스킹과 같은 번호 체계라 이후 증분 실행에서 다시 마스킹하지 않음).
+        내용이 같은 원본이 이미 있으면 마스킹하지 않고 'duplicate_of' 만 채워서 반환.
+        같은 파일이 내용 그대로 다시 쓰인 경우(매니페스트 해시와 같고 결과 파일도 있음)는
+        이미 처리한 내용이므로 'unchanged' 만 True 로 채워서 반환 (시트에 같은 행이 두 번 들어가지 않도록)
+        반환값: {'number', 'original_name', 'masked_name', 'data', 'duplicate_of', 'unchanged', 'pages', 'stage_ms'}
+        """
+        os.makedirs(self.target_folder, exist_ok=True)
+        input_path = os.path.join(self.source_folder, filename)
+        output_options = self._output_options()
+
+        # 크기/수정 시각이 그대로면 색인에 저장된 해시 재사용 (새/변경 파일만 한 번 해싱)
+        sha256 = self.source_hashes.sha256(filename)
+        duplicate_of = self.source_hashes.find(sha256, exclude=filename)
+        if duplicate_of:
+            return {'original_name': filename, 'duplicate_of': duplicate_of, 'unchanged': False}
+
+        state = self._load_watch_state()
+        manifest = state['manifest']
+        manifest_files = manifest.setdefault('files', {})
+        previous = manifest_files.get(filename)
+        if (previous and previous.get('sha256') == sha256
+                and os.path.exists(os.path.join(self.target_folder, masked_filename(previous['number'], output_options)))):
+            # 수정 시각만 바뀐 경우 - 해시 색인은 위에서 이미 현재 크기/수정 시각으로 갱신됨
+            return {'original_name': filename, 'number': previous['number'], 'duplicate_of': None, 'unchanged': True}
+        next_number = manifest['next_number']
+        if previous:
+            number = previous['number']
+        else:
+            number = next_number
+            next_number += 1
+
+        masked_name = masked_filename(number, output_options)
+        output_path = os.path.join(self.target_folder, masked_name)
+        for extension in set(MASKED_OUTPUT_EXTENSIONS.values()):
+            stale_path = os.path.join(self.target_folder, f"{number}{extension}")
+            if stale_path != output_path and os.path.exists(stale_path):
+                os.remove(stale_path)
+
+        masked = mask_source(input_path, self.default_masking_areas, output_options, source_sha256=sha256)
+        if masked['data'] is None:
+            raise ValueError(f"페이지가 없는 PDF입니다: {filename}")
+        with open(output_path, 'wb') as f:
+            f.write(masked['data'])
+
+        # 매니페스트에 다른 설정으로 만든 파일이 있으면 그 버전을 유지 (다음 증분 실행에서 전체 재마스킹)
+        stat = os.stat(input_path)
+        manifest_entry = {
+            'number': number,
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+            'sha256': masked['source_sha256']
+        }
+        areas_version = manifest.get('areas_version') if manifest_files else None
+        manifest['areas_version'] = areas_version or self.masking_areas_version(output_options)
+        manifest['next_number'] = next_number
+        manifest_files[filename] = manifest_entry
+        mapping = {'number': number, 'original_name': filename, 'masked_name': masked_name}
+        state['file_mapping'][filename] = mapping
+
+        # 파일 단위 기록은 저널 한 줄 (중간에 죽어도 다음 로드 때 매니페스트/매핑에 반영됨)
+        append_journal_entry(self.watch_journal_path, {
+            'original_name': filename,
+            'manifest_entry': manifest_entry,
+            'mapping': mapping,
+            'next_number': next_number,
+            'areas_version': manifest['areas_version']
+        })
+        try:
+            self.mapping_index.upsert(mapping)
+        except sqlite3.Error as e:
+            logger.warning(f"매핑 색인 갱신 실패: {e}")
+        state['pending'] += 1
+        if state['pending'] >= WATCH_FLUSH_EVERY:
+            self.flush_watch_state()
+
+        return {
+            **mapping,
+            'data': masked['data'],
+            'duplicate_of': None,
+            'unchanged': False,
+            'pages': masked.get('pages', []),
+            'stage_ms': masked['stage_ms']
+        }
+
+    def extract_personal_info(self, after=None, limit=None, code=None, number=None):
+        """파일명에서 앞 4글자 코드만 추출 - 마스킹 매핑 정보를 기반으로 순서 결정
+        
+        매핑 정보는 SQLite 색인에서 번호 순으로 페이지 단위 조회 (after 이후 번호부터 limit 개).
+        code 또는 number 를 주면 해당 코드/번호 항목만 반환
+        반환값: {'personal_info': [{'order', 'code', 'original_filename'}, ...], 'total', 'next_after'}
+        """
+        if not os.path.exists(self.source_folder):
+            raise Exception(f"'{self.source_folder}' 폴더가 존재하지 않습니다.")
+        
+        # 매핑 정보가 있으면 그 순서를 따름 (OCR 처리 순서와 동일)
+        if self.mapping_index.sync():
+            return self.mapping_index.page(after=after, limit=limit, code=code, number=number)
+        
+        # 매핑 정보가 없으면 기존 방식 (파일명 순서)
+        personal_info = []
+        for i, filename in enumerate(self.list_source_pdfs(), 1):
+            file_code_value = file_code(filename)
+            if file_code_value is None:
+                continue
+            if code is not None and file_code_value != code:
+                continue
+            if number is not None and i != number:
+                continue
+            personal_info.append({
+                'order': i,
+                'code': file_code_value,    # 앞 4글자 코드
+                'original_filename': filename
+            })
+        
+        total = len(personal_info)
+        if after is not None:
+            personal_info = [item for item in personal_info if item['order'] > after]
+        has_more = limit is not None and len(personal_info) > limit
+        personal_info = personal_info[:limit]
+        return {
+            'personal_info': personal_info,
+            'total': total,
+            'next_after': personal_info[-1]['order'] if personal_info and has_more else None
+        }
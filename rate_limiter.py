@@ -0,0 +1,270 @@
+import re
+import time
+import json
+import random
+import asyncio
+import threading
+
+# 오류 종류별 재시도 정책 (최대 시도 수, 지수 백오프 기준/상한 초)
+# - quota: 429 / ResourceExhausted - 길게 기다리고 여러 번 재시도, Retry-After 가 있으면 그 이상 대기
+# - server: 5xx / 연결 끊김 / 시간 초과 - 짧게 시작해서 점점 길게
+# - parse: 응답은 왔지만 JSON 추출 실패 - 엔드포인트 문제가 아니므로 바로 다시 요청
+# - other: 그 밖의 오류 (기존 동작: 5초 간격 3회)
+RETRY_POLICIES = {
+    'quota': {'max_attempts': 6, 'base_delay': 10.0, 'max_delay': 120.0},
+    'server': {'max_attempts': 5, 'base_delay': 2.0, 'max_delay': 60.0},
+    'parse': {'max_attempts': 3, 'base_delay': 1.0, 'max_delay': 5.0},
+    'other': {'max_attempts': 3, 'base_delay': 5.0, 'max_delay': 5.0},
+}
+
+# 회로 차단기: quota/server 오류가 연속 이만큼 나면 모든 요청을 멈추고 cooldown 동안 대기
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_COOLDOWN_SECONDS = 30.0
+BREAKER_MAX_COOLDOWN_SECONDS = 300.0
+
+# 요청 토큰 추정치 (Gemini 는 PDF/이미지 한 페이지를 258 토큰으로 계산)
+DOCUMENT_PAGE_TOKENS = 258
+PROMPT_CHARS_PER_TOKEN = 2     # 한글 위주 프롬프트 기준 대략값
+OUTPUT_TOKENS_ESTIMATE = 2000  # 응답 JSON 배열 (실제 사용량으로 나중에 보정)
+
+PDF_PAGE_PATTERN = re.compile(rb'/Type\s*/Page(?![a-zA-Z])')
+RETRY_DELAY_PATTERN = re.compile(r'retry in ([\d.]+)\s*s', re.IGNORECASE)
+
+QUOTA_STATUS_CODES = {429}
+SERVER_STATUS_CODES = {500, 502, 503, 504}
+
+
+class ResponseParseError(ValueError):
+    """응답은 받았지만 JSON 배열을 추출하지 못함"""
+
+
+def classify_error(error):
+    """재시도 정책 선택용 오류 분류 - 'quota' | 'server' | 'parse' | 'other'"""
+    if isinstance(error, (ResponseParseError, json.JSONDecodeError)):
+        return 'parse'
+    code = getattr(error, 'code', None)
+    code = getattr(code, 'value', code)  # grpc.StatusCode 는 (번호, 이름) 튜플 값
+    if isinstance(code, tuple):
+        code = code[0]
+    name = type(error).__name__
+    if code in QUOTA_STATUS_CODES or name in ('ResourceExhausted', 'TooManyRequests'):
+        return 'quota'
+    if (code in SERVER_STATUS_CODES
+            or name in ('InternalServerError', 'ServiceUnavailable', 'DeadlineExceeded', 'BadGateway',
+                        'GatewayTimeout', 'ServerError')
+            or isinstance(error, (ConnectionError, TimeoutError, asyncio.TimeoutError))):
+        return 'server'
+    return 'other'
+
+
+def retry_after_seconds(error):
+    """서버가 알려준 재시도 대기 시간 (초) - Retry-After 헤더, gRPC RetryInfo, 오류 메시지 순으로 확인"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    value = headers.get('Retry-After') if hasattr(headers, 'get') else None
+    if value:
+        try:
+            return float(value)
+        except ValueError:
+            pass
+    for detail in getattr(error, 'details', None) or []:
+        delay = getattr(detail, 'retry_delay', None)
+        if delay is not None:
+            return delay.seconds + delay.nanos / 1e9
+    match = RETRY_DELAY_PATTERN.search(str(error))
+    return float(match.group(1)) if match else None
+
+
+def estimate_request_tokens(file_data, mime_type, prompt):
+    """요청 하나의 토큰 추정치 (문서 페이지 수 × 258 + 프롬프트 + 응답 예상치)"""
+    pages = 1
+    if mime_type == 'application/pdf':
+        pages = max(1, len(PDF_PAGE_PATTERN.findall(file_data)))
+    return pages * DOCUMENT_PAGE_TOKENS + len(prompt) // PROMPT_CHARS_PER_TOKEN + OUTPUT_TOKENS_ESTIMATE
+
+
+class TokenBucket:
+    """분당 한도를 초 단위로 채우는 토큰 버킷 (스레드/이벤트 루프 공용)
+
+    reserve 는 토큰을 먼저 빼고(음수 허용) 그만큼 기다려야 하는 시간을 돌려주므로
+    동시에 요청한 순서대로 대기 시간이 쌓임. per_minute 가 0 이하이면 제한 없음
+    """
+
+    def __init__(self, per_minute, capacity=None):
+        self.per_minute = per_minute
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def reserve(self, amount=1):
+        """amount 만큼 예약하고 기다려야 하는 시간(초) 반환"""
+        if self.per_minute <= 0:
+            return 0.0
+        with self._lock:
+            self._refill(time.monotonic())
+            # 한도보다 큰 요청도 언젠가는 나갈 수 있게 한 번에 최대 capacity 만큼만 차감
+            self.tokens -= min(amount, self.capacity)
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def adjust(self, amount):
+        """추정치와 실제 사용량의 차이 반영 (양수: 더 씀, 음수: 돌려받음)"""
+        if self.per_minute <= 0:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class CircuitBreaker:
+    """엔드포인트가 계속 실패하면 모든 작업자의 요청을 잠시 멈추는 회로 차단기
+
+    closed: 정상 / open: cooldown 이 끝날 때까지 요청 금지 /
+    half_open: cooldown 이 끝난 뒤 요청 하나만 보내 보고, 성공하면 closed, 실패하면 cooldown 을 두 배로 늘려 open
+    """
+
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD, cooldown=BREAKER_COOLDOWN_SECONDS,
+                 max_cooldown=BREAKER_MAX_COOLDOWN_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.state = 'closed'
+        self.failures = 0
+        self.cooldown = cooldown
+        self.open_until = 0.0
+        self.open_count = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def wait_time(self):
+        """지금 요청을 보내도 되면 0, 아니면 기다릴 시간(초) - 0을 받은 호출자는 바로 요청해야 함"""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == 'open':
+                if now < self.open_until:
+                    return self.open_until - now
+                self.state = 'half_open'
+                self._probe_in_flight = False
+            if self.state == 'half_open':
+                if self._probe_in_flight:
+                    return 1.0
+                self._probe_in_flight = True
+            return 0.0
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self.cooldown = self.base_cooldown
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        """quota/server 오류 기록 - 차단기가 열리면 True"""
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open':
+                self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+            elif self.state == 'open' or self.failures < self.failure_threshold:
+                return False
+            self.state = 'open'
+            self.open_until = time.monotonic() + self.cooldown
+            self.open_count += 1
+            self._probe_in_flight = False
+            return True
+
+
+class RateLimiter:
+    """모든 OCR 작업자(asyncio 작업, 감시 모드 스레드)가 함께 쓰는 요청 제한
+
+    분당 요청 수(RPM)와 분당 토큰 수(TPM) 버킷을 모두 통과하고 회로 차단기가 닫혀 있어야
+    요청을 보냄. 실패하면 오류 종류별 정책으로 지수 백오프 + 지터 대기 시간을 정함
+    """
+
+    def __init__(self, requests_per_minute=60, tokens_per_minute=0, policies=None, breaker=None):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.policies = policies or RETRY_POLICIES
+        self.breaker = breaker or CircuitBreaker()
+        self.counters = {'requests': 0, 'throttled_seconds': 0.0, 'breaker_wait_seconds': 0.0,
+                         'failures': {kind: 0 for kind in self.policies}}
+        self._lock = threading.Lock()
+
+    def _count(self, key, value):
+        with self._lock:
+            self.counters[key] += value
+
+    def _reserve(self, tokens):
+        """버킷 두 개를 예약하고 기다릴 시간(초) 반환"""
+        self._count('requests', 1)
+        delay = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+        self._count('throttled_seconds', delay)
+        return delay
+
+    def acquire(self, tokens=0):
+        """요청을 보내도 될 때까지 대기 (동기)"""
+        while True:
+            wait = self.breaker.wait_time()
+            if not wait:
+                break
+            self._count('breaker_wait_seconds', wait)
+            time.sleep(wait)
+        delay = self._reserve(tokens)
+        if delay:
+            time.sleep(delay)
+
+    async def acquire_async(self, tokens=0):
+        """요청을 보내도 될 때까지 대기 (이벤트 루프를 막지 않음)"""
+        while True:
+            wait = self.breaker.wait_time()
+            if not wait:
+                break
+            self._count('breaker_wait_seconds', wait)
+            await asyncio.sleep(wait)
+        delay = self._reserve(tokens)
+        if delay:
+            await asyncio.sleep(delay)
+
+    def record_success(self, estimated_tokens=0, actual_tokens=None):
+        """응답 수신 - 차단기를 닫고 실제 토큰 사용량으로 TPM 버킷 보정"""
+        self.breaker.record_success()
+        if actual_tokens:
+            self.tokens.adjust(actual_tokens - estimated_tokens)
+
+    def record_failure(self, kind):
+        """요청 실패 기록 - quota/server 오류만 차단기에 반영. 차단기가 열리면 True"""
+        with self._lock:
+            self.counters['failures'][kind] = self.counters['failures'].get(kind, 0) + 1
+        if kind in ('quota', 'server'):
+            return self.breaker.record_failure()
+        # 엔드포인트는 응답한 것이므로 (half_open 시험 요청이었다면) 차단기를 닫음
+        self.breaker.record_success()
+        return False
+
+    def retry_delay(self, kind, attempt, error=None):
+        """attempt 번째 시도가 kind 오류로 실패했을 때 다음 시도까지 대기 시간 (더 시도하지 않으면 None)
+
+        정책 상한 안에서 full jitter 지수 백오프, 서버가 Retry-After 를 주면 그보다 짧게 기다리지 않음
+        """
+        policy = self.policies.get(kind, self.policies['other'])
+        if attempt >= policy['max_attempts']:
+            return None
+        delay = random.uniform(policy['base_delay'] / 2,
+                               min(policy['max_delay'], policy['base_delay'] * 2 ** (attempt - 1)))
+        retry_after = retry_after_seconds(error) if error is not None else None
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters, failures=dict(self.counters['failures']))
+        counters['throttled_seconds'] = round(counters['throttled_seconds'], 1)
+        counters['breaker_wait_seconds'] = round(counters['breaker_wait_seconds'], 1)
+        counters['breaker_state'] = self.breaker.state
+        counters['breaker_opened'] = self.breaker.open_count
+        return counters
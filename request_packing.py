@@ -0,0 +1,64 @@
+from vertexai.generative_models import GenerationConfig
+
+from ocr_client import build_response_schema
+
+# 묶음 응답에서 문서를 구분하는 필드 (문서 번호는 묶음 안에서 1부터)
+PACK_NUMBER_FIELD = '문서번호'
+PACK_ROWS_FIELD = '행'
+
+
+def document_delimiter(number):
+    """묶음 요청에서 각 문서 앞에 넣는 구분 텍스트"""
+    return f"=== 문서 {number} ==="
+
+
+def build_pack_schema(fields):
+    """묶음 응답 스키마 - 문서마다 {문서번호, 행: 단일 문서 응답과 같은 항목 배열} 객체 하나"""
+    return {
+        'type': 'ARRAY',
+        'items': {
+            'type': 'OBJECT',
+            'properties': {
+                PACK_NUMBER_FIELD: {'type': 'INTEGER'},
+                PACK_ROWS_FIELD: build_response_schema(fields)
+            },
+            'required': [PACK_NUMBER_FIELD, PACK_ROWS_FIELD]
+        }
+    }
+
+
+def pack_generation_config(fields):
+    return GenerationConfig(response_mime_type='application/json', response_schema=build_pack_schema(fields))
+
+
+def build_pack_instruction(count):
+    """프롬프트 뒤에 붙이는 묶음 요청 지시 (출력 형식을 문서별 객체 배열로 바꿈)"""
+    return (
+        f"\n## 여러 문서 처리\n"
+        f"이 요청에는 '{document_delimiter('N')}' 표시로 구분된 문서 {count}개가 들어 있습니다.\n"
+        f"위 지침을 문서마다 따로 적용하고, 한 문서의 값을 다른 문서의 결과에 섞지 마세요.\n"
+        f"결과는 문서마다 {{\"{PACK_NUMBER_FIELD}\": N, \"{PACK_ROWS_FIELD}\": [위 형식의 JSON 객체들]}} 하나씩, "
+        f"문서 번호 순서대로 JSON 배열로만 응답하세요."
+    )
+
+
+def split_pack_response(items, count):
+    """묶음 응답 항목을 {문서 번호: 행 목록} 으로 나눔
+
+    번호가 없거나 범위를 벗어난 항목, 행이 객체 배열이 아닌 항목, 같은 번호의 두 번째 항목은 버리므로
+    결과에 없는 번호의 문서는 개별 요청으로 다시 처리하면 됨
+    """
+    results = {}
+    for item in items or []:
+        if not isinstance(item, dict):
+            continue
+        rows = item.get(PACK_ROWS_FIELD)
+        try:
+            number = int(item.get(PACK_NUMBER_FIELD))
+        except (TypeError, ValueError):
+            continue
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            continue
+        if 1 <= number <= count and number not in results:
+            results[number] = rows
+    return results
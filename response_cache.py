@@ -0,0 +1,127 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from contextlib import closing
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    document_sha256 TEXT NOT NULL,
+    prompt_sha256 TEXT NOT NULL,
+    model TEXT NOT NULL,
+    config_sha256 TEXT NOT NULL,
+    response_text TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL,
+    PRIMARY KEY (document_sha256, prompt_sha256, model, config_sha256)
+);
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used_at);
+"""
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def config_sha256(generation_config):
+    """생성 설정(GenerationConfig 또는 dict, 없으면 None)의 해시 - 스키마/temperature 가 바뀌면 다른 키가 됨"""
+    if generation_config is not None and hasattr(generation_config, 'to_dict'):
+        generation_config = generation_config.to_dict()
+    serialized = json.dumps(generation_config, sort_keys=True, ensure_ascii=False, default=str)
+    return _sha256(serialized.encode('utf-8'))
+
+
+class ResponseCache:
+    """Vertex AI 응답 텍스트 디스크 캐시 (마스킹 문서 해시 + 프롬프트 해시 + 모델 + 생성 설정 해시 → 응답)
+
+    문서와 프롬프트, 모델, 생성 설정(응답 스키마 등)이 그대로면 다시 실행해도 같은 응답을 재사용하므로
+    시트 기록 실패나 검증 로직 수정 뒤 재실행할 때 API 호출 없이 바로 처리됨.
+    프롬프트나 모델, 생성 설정을 바꾸면 키가 달라져 자연히 새로 요청함.
+    전체 크기가 max_bytes 를 넘으면 가장 오래 사용하지 않은 응답부터 삭제 (LRU)
+    """
+
+    def __init__(self, db_path, max_bytes):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.counters = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+        self._prompt_hashes = {}
+        self._lock = threading.Lock()
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _connect(self):
+        connection = sqlite3.connect(self.db_path)
+        columns = {row[1] for row in connection.execute('PRAGMA table_info(responses)')}
+        if columns and 'config_sha256' not in columns:
+            # 생성 설정 해시가 없던 예전 형식 - 어떤 설정으로 받은 응답인지 알 수 없으므로 비움
+            connection.execute('DROP TABLE responses')
+        connection.executescript(SCHEMA)
+        return connection
+
+    def _count(self, key, value=1):
+        with self._lock:
+            self.counters[key] += value
+
+    def key(self, file_data, prompt, model, generation_config=None):
+        """캐시 키 (문서 SHA-256, 프롬프트 SHA-256, 모델 이름, 생성 설정 SHA-256)"""
+        prompt_sha256 = self._prompt_hashes.get(prompt)
+        if prompt_sha256 is None:
+            prompt_sha256 = self._prompt_hashes[prompt] = _sha256(prompt.encode('utf-8'))
+        return _sha256(file_data), prompt_sha256, model, config_sha256(generation_config)
+
+    def get(self, key):
+        """저장된 응답 텍스트 (없으면 None) - 찾으면 마지막 사용 시각 갱신"""
+        with self._lock, closing(self._connect()) as connection, connection:
+            row = connection.execute(
+                'SELECT response_text FROM responses '
+                'WHERE document_sha256 = ? AND prompt_sha256 = ? AND model = ? AND config_sha256 = ?', key).fetchone()
+            if row:
+                connection.execute(
+                    'UPDATE responses SET last_used_at = ? '
+                    'WHERE document_sha256 = ? AND prompt_sha256 = ? AND model = ? AND config_sha256 = ?',
+                    (time.time(), *key))
+            self.counters['hits' if row else 'misses'] += 1
+        return row[0] if row else None
+
+    def put(self, key, response_text):
+        """응답 저장 (JSON 추출에 성공한 응답만 저장해야 함) 후 크기 한도를 넘으면 LRU 삭제"""
+        size = len(response_text.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock, closing(self._connect()) as connection, connection:
+            connection.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                               (*key, response_text, size, now, now))
+            self.counters['stores'] += 1
+            self._evict(connection)
+
+    def _evict(self, connection):
+        total = connection.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = []
+        for document_sha256, prompt_sha256, model, generation_sha256, size in connection.execute(
+                'SELECT document_sha256, prompt_sha256, model, config_sha256, size FROM responses '
+                'ORDER BY last_used_at'):
+            if total <= self.max_bytes:
+                break
+            evicted.append((document_sha256, prompt_sha256, model, generation_sha256))
+            total -= size
+        connection.executemany(
+            'DELETE FROM responses '
+            'WHERE document_sha256 = ? AND prompt_sha256 = ? AND model = ? AND config_sha256 = ?', evicted)
+        self.counters['evictions'] += len(evicted)
+
+    def stats(self):
+        with self._lock, closing(self._connect()) as connection:
+            entries, total = connection.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone()
+            counters = dict(self.counters)
+        lookups = counters['hits'] + counters['misses']
+        counters['hit_rate'] = round(counters['hits'] / lookups, 3) if lookups else None
+        counters['entries'] = entries
+        counters['size_kb'] = round(total / 1024, 1)
+        return counters
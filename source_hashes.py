@@ -0,0 +1,186 @@
+import os
+import uuid
+import hashlib
+import sqlite3
+import threading
+from contextlib import closing
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hashes (
+    filename TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS hashes_sha256 ON hashes (sha256);
+"""
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(file_path, chunk_size=1024 * 1024):
+    """파일 내용의 SHA-256 해시 계산 (큰 파일도 청크 단위로 읽음)"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DuplicateUpload(Exception):
+    """이미 같은 내용의 원본이 있는 업로드"""
+
+    def __init__(self, duplicate_of, sha256, size):
+        super().__init__(f"'{duplicate_of}' 와 내용이 같은 파일입니다.")
+        self.duplicate_of = duplicate_of
+        self.sha256 = sha256
+        self.size = size
+
+
+class SourceHashIndex:
+    """원본 폴더 파일의 내용 해시 색인 (파일명 → 크기/수정 시각/SHA-256)
+
+    크기와 수정 시각이 그대로인 파일은 저장된 해시를 재사용하므로
+    폴더 전체를 다시 해싱하는 것은 처음 한 번뿐임
+    """
+
+    def __init__(self, folder, db_path):
+        self.folder = folder
+        self.db_path = db_path
+        self.hashes = {}  # 마지막 refresh 결과 {파일명: sha256} - 같은 실행 안에서 다시 해싱하지 않도록 재사용
+        self._lock = threading.RLock()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.db_path)
+        connection.executescript(SCHEMA)
+        return connection
+
+    def refresh(self, filenames):
+        """filenames 의 해시를 최신으로 맞추고 목록에 없는 항목은 삭제 - {파일명: sha256} 반환"""
+        with self._lock, closing(self._connect()) as connection, connection:
+            known = {
+                row[0]: row[1:]
+                for row in connection.execute('SELECT filename, size, mtime_ns, sha256 FROM hashes')
+            }
+            hashes = {}
+            for filename in filenames:
+                file_path = os.path.join(self.folder, filename)
+                try:
+                    stat = os.stat(file_path)
+                except FileNotFoundError:
+                    continue
+                previous = known.pop(filename, None)
+                if previous and previous[0] == stat.st_size and previous[1] == stat.st_mtime_ns:
+                    hashes[filename] = previous[2]
+                    continue
+                hashes[filename] = file_sha256(file_path)
+                connection.execute('INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?)',
+                                   (filename, stat.st_size, stat.st_mtime_ns, hashes[filename]))
+            connection.executemany('DELETE FROM hashes WHERE filename = ?', [(name,) for name in known])
+            self.hashes = hashes
+        return hashes
+
+    def sha256(self, filename):
+        """파일 하나의 해시 - 크기/수정 시각이 그대로면 저장된 해시를, 아니면 새로 계산해서 기록 후 반환"""
+        file_path = os.path.join(self.folder, filename)
+        stat = os.stat(file_path)
+        with self._lock:
+            with closing(self._connect()) as connection:
+                row = connection.execute('SELECT size, mtime_ns, sha256 FROM hashes WHERE filename = ?',
+                                         (filename,)).fetchone()
+            if row and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+                return row[2]
+            sha256 = file_sha256(file_path)
+            with closing(self._connect()) as connection, connection:
+                connection.execute('INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?)',
+                                   (filename, stat.st_size, stat.st_mtime_ns, sha256))
+            self.hashes[filename] = sha256
+            return sha256
+
+    def find(self, sha256, exclude=None):
+        """같은 해시의 원본 파일명 (파일이 그대로 있는 경우만, exclude 파일명은 제외, 없으면 None)"""
+        with closing(self._connect()) as connection:
+            rows = connection.execute('SELECT filename, size, mtime_ns FROM hashes WHERE sha256 = ?',
+                                      (sha256,)).fetchall()
+        for filename, size, mtime_ns in rows:
+            if filename == exclude:
+                continue
+            try:
+                stat = os.stat(os.path.join(self.folder, filename))
+            except FileNotFoundError:
+                continue
+            if stat.st_size == size and stat.st_mtime_ns == mtime_ns:
+                return filename
+        return None
+
+    def record(self, filename, sha256):
+        """원본 폴더에 있는 파일 하나의 해시 기록 (현재 크기/수정 시각 기준)"""
+        stat = os.stat(os.path.join(self.folder, filename))
+        with self._lock, closing(self._connect()) as connection, connection:
+            connection.execute('INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?)',
+                               (filename, stat.st_size, stat.st_mtime_ns, sha256))
+
+    def dedupe(self, filenames):
+        """정렬된 파일 목록에서 내용이 같은 파일은 처음 것만 남김
+
+        반환값: (중복을 뺀 파일 목록, {중복 파일명: 먼저 나온 같은 내용의 파일명})
+        """
+        hashes = self.refresh(filenames)
+        first_by_hash = {}
+        unique = []
+        duplicates = {}
+        for filename in filenames:
+            sha256 = hashes.get(filename)
+            if sha256 is None:
+                continue
+            if sha256 in first_by_hash:
+                duplicates[filename] = first_by_hash[sha256]
+                continue
+            first_by_hash[sha256] = filename
+            unique.append(filename)
+        return unique, duplicates
+
+    def receive(self, stream, filename, chunk_size=UPLOAD_CHUNK_SIZE):
+        """업로드 스트림을 해싱하면서 바로 디스크에 기록하고 원본 폴더로 옮김
+
+        내용이 같은 원본이 이미 있으면 DuplicateUpload 를 발생시키고 업로드 파일은 버림.
+        반환값: {'filename', 'size', 'sha256'}
+        """
+        if os.path.basename(filename) != filename or filename.startswith('.'):
+            raise ValueError(f'잘못된 파일명입니다: {filename}')
+        if not filename.lower().endswith('.pdf'):
+            raise ValueError('PDF 파일만 업로드할 수 있습니다.')
+
+        os.makedirs(self.folder, exist_ok=True)
+        part_path = os.path.join(self.folder, f'.upload-{uuid.uuid4().hex}.part')
+        digest = hashlib.sha256()
+        header = b''
+        size = 0
+        try:
+            with open(part_path, 'wb') as f:
+                for chunk in iter(lambda: stream.read(chunk_size), b''):
+                    if len(header) < 5:
+                        header += chunk[:5 - len(header)]
+                        if len(header) == 5 and header != b'%PDF-':
+                            raise ValueError('PDF 형식이 아닙니다.')
+                    digest.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+            if header != b'%PDF-':
+                raise ValueError('PDF 형식이 아닙니다.' if size else '빈 파일입니다.')
+            sha256 = digest.hexdigest()
+
+            # 중복 확인과 이동은 한 번에 (동시에 올라온 같은 파일이 둘 다 통과하지 않도록)
+            with self._lock:
+                duplicate_of = self.find(sha256)
+                if duplicate_of:
+                    raise DuplicateUpload(duplicate_of, sha256, size)
+                target_path = os.path.join(self.folder, filename)
+                if os.path.exists(target_path):
+                    raise FileExistsError(f"같은 이름의 다른 파일이 이미 있습니다: {filename}")
+                os.replace(part_path, target_path)
+                self.record(filename, sha256)
+            return {'filename': filename, 'size': size, 'sha256': sha256}
+        finally:
+            if os.path.exists(part_path):
+                os.remove(part_path)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 저장소 루트의 평면 모듈(json_stream, pdf_processor 등)을 바로 import 할 수 있도록
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
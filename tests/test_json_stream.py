@@ -0,0 +1,40 @@
+from json_stream import JsonArrayStreamParser, safe_extract_json
+
+
+def test_schema_response_is_decoded_as_is():
+    assert safe_extract_json('[{"a": "1"}, {"a": "2"}]') == [{'a': '1'}, {'a': '2'}]
+
+
+def test_code_fence_body_is_used():
+    text = 'Note [see below]:\n```json\n[{"a": "1"}, {"a": "2"}]\n```'
+    assert safe_extract_json(text) == [{'a': '1'}, {'a': '2'}]
+
+
+def test_trailing_comma_array_is_rejected():
+    assert safe_extract_json('[{"a":"1"},{"a":"2"},]') is None
+
+
+def test_malformed_array_is_rejected_instead_of_returning_inner_object():
+    assert safe_extract_json('[{"a": "1"} {"a": "2"}]') is None
+    assert safe_extract_json('결과: [{"a": "1"}, oops]') is None
+
+
+def test_truncated_array_is_rejected():
+    assert safe_extract_json('[{"a": "1"}, {"a": "2') is None
+
+
+def test_single_object_without_array():
+    assert safe_extract_json('설명 {"a": "1"}') == [{'a': '1'}]
+
+
+def test_no_json():
+    assert safe_extract_json('응답 없음') is None
+
+
+def test_stream_parser_yields_items_across_chunks():
+    parser = JsonArrayStreamParser()
+    items = []
+    for chunk in ['```json\n[{"a": "x', '\\"y"}, {"b"', ': [1, 2]}]', '\n```']:
+        items += parser.feed(chunk)
+    assert items == [{'a': 'x"y'}, {'b': [1, 2]}]
+    assert parser.finished
@@ -0,0 +1,53 @@
+import fitz
+
+from pdf_processor import mask_source
+
+# 기본 앵커 기준 양식 좌표: 성명 라벨 (140, 122), 생년월일 라벨 (370, 122)
+REDACTION_AREAS = [{'x1': 190, 'y1': 122, 'x2': 270, 'y2': 135}]
+
+
+def _write_notice(path, personal_page):
+    doc = fitz.open()
+    for number in range(3):
+        page = doc.new_page(width=595, height=842)
+        page.insert_text((72, 60), f'종합소득세 안내문 {number + 1}쪽', fontname='korea', fontsize=10)
+        if number == personal_page:
+            page.insert_text((140, 132), '성명', fontname='korea', fontsize=10)
+            page.insert_text((200, 132), '홍길동', fontname='korea', fontsize=10)
+            page.insert_text((370, 132), '생년월일', fontname='korea', fontsize=10)
+            page.insert_text((440, 132), '1980.01.01', fontname='korea', fontsize=10)
+            page.insert_text((60, 250), '사업장별 수입금액', fontname='korea', fontsize=10)
+            page.insert_text((60, 270), '123-45-67890 940909', fontname='korea', fontsize=10)
+    doc.save(path)
+    doc.close()
+
+
+def _masked_text(data):
+    with fitz.open(stream=data, filetype='pdf') as doc:
+        return ''.join(page.get_text() for page in doc)
+
+
+def test_personal_block_on_later_page_is_masked(tmp_path):
+    source = tmp_path / 'notice.pdf'
+    _write_notice(str(source), personal_page=1)
+
+    masked = mask_source(str(source), REDACTION_AREAS, {'page_selection': 'target'})
+
+    assert masked['pages'] == [0, 1]
+    text = _masked_text(masked['data'])
+    assert '사업장별' in text
+    assert '홍길동' not in text
+    assert '1980.01.01' not in text
+    assert '123-45-67890' not in text
+
+
+def test_first_page_personal_block_is_masked_with_anchors(tmp_path):
+    source = tmp_path / 'notice.pdf'
+    _write_notice(str(source), personal_page=0)
+
+    masked = mask_source(str(source), REDACTION_AREAS)
+
+    assert masked['pages'] == [0]
+    text = _masked_text(masked['data'])
+    assert '홍길동' not in text
+    assert '1980.01.01' not in text
@@ -227,7 +227,7 @@ function displayResults() {
     const personalTable = document.getElementById('personalInfoTable');
     const maxPersonalShow = 20;
     const showPersonalData = personalInfoData.slice(0, maxPersonalShow);
-    const remainingPersonalCount = personalInfoData.length - maxPersonalShow;
+    const remainingPersonalCount = personalInfoTotal - showPersonalData.length;
     
     personalTable.innerHTML = `
         <table class="preview-table">
@@ -304,11 +304,34 @@ async function downloadMaskedFiles() {
     }
 }
 
-function downloadExcel() {
-    if (personalInfoData.length === 0) return;
+async function fetchAllPersonalInfo() {
+    // 서버 색인에서 번호 순으로 페이지 단위 조회
+    const items = [];
+    let after = null;
+    do {
+        const result = await APIClient.extractInfo({ after, limit: 5000 });
+        if (!result.success) {
+            throw new Error(result.error || '정보 추출 실패');
+        }
+        items.push(...result.personal_info);
+        after = result.next_after;
+    } while (after !== null && after !== undefined);
+    return items;
+}
+
+async function downloadExcel() {
+    if (personalInfoTotal === 0) return;
+    
+    let allPersonalInfo;
+    try {
+        allPersonalInfo = await fetchAllPersonalInfo();
+    } catch (error) {
+        UIController.showStepMessage(4, `엑셀 생성 중 오류: ${error.message}`, 'error');
+        return;
+    }
     
     // 앞 4글자 코드로 엑셀 데이터 구성
-    const excelData = personalInfoData.map(item => ({
+    const excelData = allPersonalInfo.map(item => ({
         '순서': item.order,
         '코드': item.code,
         '원본파일명': item.original_filename
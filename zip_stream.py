@@ -0,0 +1,94 @@
+import os
+import glob
+import uuid
+import hashlib
+import zipfile
+
+
+class _ChunkWriter:
+    """ZipFile 이 쓰는 바이트를 모아두는 쓰기 전용 스트림 (seek/tell 없음 → 스트리밍 모드로 동작)"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def archive_manifest_key(files):
+    """압축할 파일들의 (이름, 크기, 수정 시각) 목록으로 캐시 키 생성 - 하나라도 바뀌면 키가 바뀜"""
+    digest = hashlib.sha256()
+    for arcname, file_path in files:
+        stat = os.stat(file_path)
+        digest.update(f'{arcname}\0{stat.st_size}\0{stat.st_mtime_ns}\n'.encode('utf-8'))
+    return digest.hexdigest()[:32]
+
+
+def iter_zip(files):
+    """[(압축 안 이름, 파일 경로), ...] 를 무압축(ZIP_STORED) ZIP으로 만들면서 조각 단위로 반환
+
+    임시 파일 없이 파일 하나를 추가할 때마다 그만큼의 바이트를 바로 내보냄.
+    PDF/JPEG는 이미 압축되어 있어서 deflate 는 CPU만 쓰고 크기는 거의 줄지 않음
+    """
+    writer = _ChunkWriter()
+    with zipfile.ZipFile(writer, 'w', zipfile.ZIP_STORED, allowZip64=True) as zipf:
+        for arcname, file_path in files:
+            zipf.write(file_path, arcname)
+            yield writer.drain()
+    # 중앙 디렉터리 (ZipFile 을 닫을 때 기록됨)
+    yield writer.drain()
+
+
+class ZipArchiveCache:
+    """같은 파일 구성으로 만든 ZIP을 한 개만 보관하는 디스크 캐시
+
+    스트리밍으로 내보내는 바이트를 그대로 .part 파일에 같이 기록하고, 끝까지 전송된
+    경우에만 캐시 파일로 확정함. 새 아카이브가 확정되면 이전 아카이브는 삭제
+    """
+
+    def __init__(self, cache_folder, prefix='masked'):
+        self.cache_folder = cache_folder
+        self.prefix = prefix
+
+    def path_for(self, key):
+        return os.path.abspath(os.path.join(self.cache_folder, f'{self.prefix}_{key}.zip'))
+
+    def get(self, key):
+        """캐시된 아카이브 경로 (없으면 None)"""
+        path = self.path_for(key)
+        return path if os.path.exists(path) else None
+
+    def stream(self, key, files):
+        """ZIP 조각을 반환하면서 캐시 파일에도 기록 (중간에 끊기면 기록하던 파일은 삭제)"""
+        os.makedirs(self.cache_folder, exist_ok=True)
+        part_path = f'{self.path_for(key)}.{uuid.uuid4().hex}.part'
+        completed = False
+        try:
+            with open(part_path, 'wb') as cache_file:
+                for chunk in iter_zip(files):
+                    cache_file.write(chunk)
+                    yield chunk
+            os.replace(part_path, self.path_for(key))
+            completed = True
+            self._prune(keep=key)
+        finally:
+            if not completed and os.path.exists(part_path):
+                os.remove(part_path)
+
+    def _prune(self, keep):
+        """확정된 아카이브 중 keep 이외의 것 삭제 (진행 중인 .part 는 건드리지 않음)"""
+        for path in glob.glob(os.path.join(os.path.abspath(self.cache_folder), f'{self.prefix}_*.zip')):
+            if path != self.path_for(keep):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass